@@ -0,0 +1,114 @@
+"""
+Micro-benchmark for the shared diff parser on multi-megabyte generated patches.
+
+    python -m benchmarks.bench_diff_parser [--megabytes 8] [--repeat 5]
+
+Compares `diff_parser.chunk_diff` (eager legacy dict shape), `diff_parser.parse_patch`
+(compact records only) and the previous per-line implementation.
+"""
+import argparse
+import random
+import re
+import time
+import tracemalloc
+
+from server.diff_parser import chunk_diff, parse_patch
+
+
+def legacy_chunk_diff(patch):
+    """The parser previously duplicated in utils/chunker.py and server/utils.py."""
+    added_chunks, removed_chunks = [], []
+    if not patch:
+        return added_chunks, removed_chunks
+    added_chunk, removed_chunk, added_lines, removed_lines = [], [], [], []
+    old_line = new_line = 0
+    for line in patch.split('\n'):
+        if line.startswith('@@'):
+            if added_chunk:
+                added_chunks.append({"lines": added_lines, "code": "\n".join(added_chunk)})
+                added_chunk, added_lines = [], []
+            if removed_chunk:
+                removed_chunks.append({"lines": removed_lines, "code": "\n".join(removed_chunk)})
+                removed_chunk, removed_lines = [], []
+            match = re.match(r"@@ -(\d+),?\d* \+(\d+),?\d* @@", line)
+            if match:
+                old_line, new_line = int(match.group(1)), int(match.group(2))
+        elif line.startswith('+') and not line.startswith('+++'):
+            added_chunk.append(line[1:])
+            added_lines.append(new_line)
+            new_line += 1
+        elif line.startswith('-') and not line.startswith('---'):
+            removed_chunk.append(line[1:])
+            removed_lines.append(old_line)
+            old_line += 1
+        else:
+            if added_chunk:
+                added_chunks.append({"lines": added_lines, "code": "\n".join(added_chunk)})
+                added_chunk, added_lines = [], []
+            if removed_chunk:
+                removed_chunks.append({"lines": removed_lines, "code": "\n".join(removed_chunk)})
+                removed_chunk, removed_lines = [], []
+            old_line += 1
+            new_line += 1
+    if added_chunk:
+        added_chunks.append({"lines": added_lines, "code": "\n".join(added_chunk)})
+    if removed_chunk:
+        removed_chunks.append({"lines": removed_lines, "code": "\n".join(removed_chunk)})
+    return added_chunks, removed_chunks
+
+
+def generate_patch(target_bytes: int, seed: int = 0) -> str:
+    """Builds a generated-code style patch: many hunks with long added/removed runs."""
+    rng = random.Random(seed)
+    out, size, old_line, new_line = [], 0, 1, 1
+    while size < target_bytes:
+        context, removed, added = rng.randint(1, 6), rng.randint(0, 40), rng.randint(1, 120)
+        header = f"@@ -{old_line},{context + removed} +{new_line},{context + added} @@ def generated_{old_line}():"
+        body = [f" context_{old_line + i} = {i}" for i in range(context)]
+        body += [f"-    removed_value_{i} = compute({i}, '{rng.random():.6f}')" for i in range(removed)]
+        body += [f"+    added_value_{i} = compute({i}, '{rng.random():.6f}')" for i in range(added)]
+        out.append(header)
+        out.extend(body)
+        size += len(header) + sum(len(line) + 1 for line in body)
+        old_line += context + removed + rng.randint(5, 50)
+        new_line += context + added + rng.randint(5, 50)
+    return "\n".join(out)
+
+
+def measure(label, func, patch, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(patch)
+        timings.append(time.perf_counter() - started)
+        del result
+    tracemalloc.start()
+    result = func(patch)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    best = min(timings)
+    print(f"{label:<28} best {best * 1000:8.1f} ms   {len(patch) / best / 1e6:7.1f} MB/s   "
+          f"peak {peak / 1e6:7.1f} MB   retained {retained / 1e6:7.1f} MB")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megabytes", type=float, default=8.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    patch = generate_patch(int(args.megabytes * 1024 * 1024))
+    print(f"Patch: {len(patch) / 1e6:.1f} MB, {patch.count(chr(10)) + 1} lines")
+
+    assert chunk_diff(patch) == legacy_chunk_diff(patch), "parser output diverged from the legacy shape"
+
+    legacy = measure("legacy chunk_diff", legacy_chunk_diff, patch, args.repeat)
+    measure("chunk_diff (dict shape)", chunk_diff, patch, args.repeat)
+    compact = measure("parse_patch (compact)", parse_patch, patch, args.repeat)
+    print(f"parse_patch speedup vs legacy: {legacy / compact:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional
+
+from .result_cache import ResultCache, stable_hash
+from .repo_context_cache import task_fingerprint, task_model_name
+
+AGENT_CACHE_ENABLED = os.getenv("AGENT_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+AGENT_CACHE_TTL = float(os.getenv("AGENT_CACHE_TTL", str(7 * 24 * 3600)))
+# Bump to invalidate every memoized agent output after a change the task fingerprint would not catch
+AGENT_CACHE_VERSION = os.getenv("AGENT_CACHE_VERSION", "1")
+
+# CrewAI interpolates `{name}` placeholders of the task description and expected output
+_PLACEHOLDER_RE = re.compile(r"\{([A-Za-z_][A-Za-z0-9_]*)\}")
+
+
+def task_input_names(task) -> List[str]:
+    """The crew inputs a task's prompt actually interpolates."""
+    text = f"{getattr(task, 'description', '')}\n{getattr(task, 'expected_output', '')}"
+    return sorted(set(_PLACEHOLDER_RE.findall(text)))
+
+
+def agent_input_hash(task, inputs: Dict[str, Any]) -> str:
+    """
+    Key for one memoized agent output: the model, the task definition and the exact
+    values of the inputs its prompt uses. Inputs the prompt ignores do not affect it.
+    """
+    used = {name: inputs.get(name) for name in task_input_names(task)}
+    return stable_hash(AGENT_CACHE_VERSION, task_model_name(task), task_fingerprint(task), used)
+
+
+class AgentOutputCache:
+    """
+    Raw crew outputs memoized by `agent_input_hash`, with hit/miss counters per agent.
+    Groups are repositories, like the other review caches.
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = AGENT_CACHE_TTL):
+        self._cache = ResultCache("agent_outputs", ttl_seconds=ttl_seconds)
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, agent_name: str, outcome: str):
+        with self._lock:
+            counters = self._counters.setdefault(agent_name, {"hits": 0, "misses": 0})
+            counters[outcome] += 1
+
+    def get(self, agent_name: str, group: str, key: str) -> Optional[str]:
+        raw = self._cache.get(group, key)
+        self._count(agent_name, "misses" if raw is None else "hits")
+        return raw
+
+    def put(self, group: str, key: str, raw: str):
+        self._cache.put(group, key, raw)
+
+    def invalidate_group(self, group: str) -> int:
+        return self._cache.invalidate_group(group)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            agents = {
+                name: {**c, "hit_rate": round(c["hits"] / (c["hits"] + c["misses"]), 3) if c["hits"] + c["misses"] else 0.0}
+                for name, c in self._counters.items()
+            }
+        return {**self._cache.stats(), "agents": agents}
+
+
+_cache: Optional[AgentOutputCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_agent_cache() -> Optional[AgentOutputCache]:
+    """
+    Returns the process-wide agent output cache, or None when AGENT_CACHE_ENABLED is off.
+    """
+    global _cache
+    if not AGENT_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AgentOutputCache()
+    return _cache
@@ -0,0 +1,189 @@
+import os
+import hashlib
+import threading
+import concurrent.futures
+from collections import OrderedDict
+from typing import Callable, Dict, Any, Optional
+
+BLOB_CACHE_DIR = os.getenv("BLOB_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "codesense", "blobs"))
+BLOB_CACHE_MEMORY_BYTES = int(os.getenv("BLOB_CACHE_MEMORY_BYTES", str(64 * 1024 * 1024)))
+BLOB_CACHE_DISK_BYTES = int(os.getenv("BLOB_CACHE_DISK_BYTES", str(1024 * 1024 * 1024)))
+
+
+def git_blob_sha(data: bytes) -> str:
+    """
+    Computes the git object id of `data` (sha1 over the "blob <size>\\0" header and content).
+    """
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+class BlobStore:
+    """
+    Content-addressed cache of file contents keyed by git blob SHA.
+
+    Blobs are immutable, so entries never need revalidation: a memory tier serves hot
+    blobs, a disk tier (`<dir>/<sha[:2]>/<sha>`) survives restarts, and each tier evicts
+    its least recently used blobs once its byte limit is exceeded. Concurrent requests
+    for the same missing blob share a single download.
+    """
+
+    def __init__(self, directory: str = BLOB_CACHE_DIR, memory_bytes: int = BLOB_CACHE_MEMORY_BYTES,
+                 disk_bytes: int = BLOB_CACHE_DISK_BYTES):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_total = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_total = 0
+        self._in_flight: Dict[str, concurrent.futures.Future] = {}
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self._load_disk_index()
+
+    def _load_disk_index(self):
+        entries = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith(".tmp"):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, name, stat.st_size))
+        for _, sha, size in sorted(entries):
+            self._disk[sha] = size
+            self._disk_total += size
+
+    def _path(self, sha: str) -> str:
+        return os.path.join(self.directory, sha[:2], sha)
+
+    def _remember_locked(self, sha: str, data: bytes):
+        if len(data) > self.memory_bytes:
+            return
+        self._memory_total -= len(self._memory.pop(sha, b""))
+        self._memory[sha] = data
+        self._memory_total += len(data)
+        while self._memory_total > self.memory_bytes and self._memory:
+            _, old = self._memory.popitem(last=False)
+            self._memory_total -= len(old)
+            self.evictions += 1
+
+    def get(self, sha: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._memory.get(sha)
+            if data is not None:
+                self._memory.move_to_end(sha)
+                self.memory_hits += 1
+                return data
+            on_disk = sha in self._disk
+        if not on_disk:
+            return None
+        try:
+            with open(self._path(sha), "rb") as f:
+                data = f.read()
+        except OSError:
+            with self._lock:
+                self._disk_total -= self._disk.pop(sha, 0)
+            return None
+        with self._lock:
+            if sha in self._disk:
+                self._disk.move_to_end(sha)
+            self._remember_locked(sha, data)
+            self.disk_hits += 1
+        return data
+
+    def put(self, sha: str, data: bytes):
+        if git_blob_sha(data) != sha:
+            print(f"Warning: Content for blob {sha} does not match its SHA; not caching it")
+            return
+        with self._lock:
+            self._remember_locked(sha, data)
+            already_on_disk = sha in self._disk
+        if already_on_disk or len(data) > self.disk_bytes:
+            return
+        path = self._path(sha)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Warning: Could not write blob {sha} to disk cache: {e}")
+            return
+        evicted = []
+        with self._lock:
+            self._disk[sha] = len(data)
+            self._disk_total += len(data)
+            while self._disk_total > self.disk_bytes and self._disk:
+                old_sha, size = self._disk.popitem(last=False)
+                self._disk_total -= size
+                self.evictions += 1
+                evicted.append(old_sha)
+        for old_sha in evicted:
+            try:
+                os.remove(self._path(old_sha))
+            except OSError:
+                pass
+
+    def get_or_fetch(self, sha: str, fetch: Callable[[], bytes]) -> bytes:
+        """
+        Returns the blob from the cache, or calls `fetch` once (per process) to download it.
+        """
+        data = self.get(sha)
+        if data is not None:
+            return data
+        with self._lock:
+            future = self._in_flight.get(sha)
+            owner = future is None
+            if owner:
+                future = concurrent.futures.Future()
+                self._in_flight[sha] = future
+                self.misses += 1
+        if not owner:
+            return future.result()
+        try:
+            data = fetch()
+            self.put(sha, data)
+            future.set_result(data)
+            return data
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(sha, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_total,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_total,
+            }
+
+
+_store: Optional[BlobStore] = None
+_store_lock = threading.Lock()
+
+
+def get_blob_store() -> BlobStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = BlobStore()
+    return _store
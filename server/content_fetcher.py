@@ -0,0 +1,77 @@
+import os
+import time
+import concurrent.futures
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+# Maximum number of base-file downloads in flight for a single review.
+CONTENT_FETCH_CONCURRENCY = int(os.getenv("CONTENT_FETCH_CONCURRENCY", "8"))
+
+
+@dataclass
+class FileContentResult:
+    """
+    Outcome of fetching one file's content. `error` is set instead of raising,
+    so one unreadable file never aborts the rest of the batch.
+    """
+    path: str
+    content: str = ""
+    error: Optional[str] = None
+    elapsed: float = 0.0
+
+
+class BaseContentFetcher:
+    """
+    Downloads file contents on a bounded pool of worker threads.
+    Paths can be submitted one at a time (e.g. while the file listing is still being
+    read); `results()` always returns them in submission order.
+    """
+
+    def __init__(self, loader: Callable[[str], str], max_concurrency: Optional[int] = None):
+        self._loader = loader
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(1, max_concurrency or CONTENT_FETCH_CONCURRENCY),
+            thread_name_prefix="content-fetch",
+        )
+        self._futures: List[concurrent.futures.Future] = []
+
+    def _load(self, path: str) -> FileContentResult:
+        started = time.perf_counter()
+        try:
+            content = self._loader(path)
+            return FileContentResult(path=path, content=content, elapsed=time.perf_counter() - started)
+        except Exception as e:
+            return FileContentResult(path=path, error=str(e), elapsed=time.perf_counter() - started)
+
+    def submit(self, path: str) -> concurrent.futures.Future:
+        future = self._executor.submit(self._load, path)
+        self._futures.append(future)
+        return future
+
+    def results(self) -> List[FileContentResult]:
+        return [future.result() for future in self._futures]
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            for future in self._futures:
+                future.cancel()
+        self.close()
+
+
+def log_slowest_fetches(results: List[FileContentResult], top: int = 5):
+    """
+    Prints the files that dominated content ingestion.
+    """
+    if not results:
+        return
+    total = sum(r.elapsed for r in results)
+    print(f"📥 Fetched {len(results)} base file(s), {total:.2f}s cumulative fetch time")
+    for r in sorted(results, key=lambda r: r.elapsed, reverse=True)[:top]:
+        status = f"error: {r.error}" if r.error else f"{len(r.content)} chars"
+        print(f"   {r.elapsed:6.2f}s  {r.path} ({status})")
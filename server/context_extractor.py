@@ -0,0 +1,197 @@
+import os
+import ast
+from typing import Iterable, List, Optional, Tuple
+
+from .token_counter import estimate_tokens
+
+# "scoped" sends the functions/classes enclosing each change; "full" sends whole base files
+CONTEXT_EXTRACTION_MODE = os.getenv("CONTEXT_EXTRACTION_MODE", "scoped").lower()
+# Per-file token budget for the extracted base content; smaller files are sent whole
+CONTEXT_FILE_TOKEN_BUDGET = int(os.getenv("CONTEXT_FILE_TOKEN_BUDGET", "2000"))
+# Lines kept around a change that is not inside any function or class
+CONTEXT_LINES_AROUND = int(os.getenv("CONTEXT_LINES_AROUND", "10"))
+
+PYTHON_EXTENSIONS = (".py", ".pyi")
+BRACE_EXTENSIONS = (
+    ".js", ".jsx", ".mjs", ".cjs", ".ts", ".tsx", ".java", ".kt", ".scala", ".c", ".h",
+    ".cc", ".cpp", ".hpp", ".cs", ".go", ".rs", ".swift", ".php", ".dart",
+)
+
+Span = Tuple[int, int]  # 1-based, inclusive line range
+
+
+def _python_scopes(source: str) -> Optional[Tuple[List[Span], List[Span]]]:
+    """
+    Returns (function/class spans, top-level import spans), or None if `source` does not parse.
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return None
+    scopes = []
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+            scopes.append((start, node.end_lineno))
+    imports = [(node.lineno, node.end_lineno) for node in tree.body
+               if isinstance(node, (ast.Import, ast.ImportFrom))]
+    return scopes, imports
+
+
+def _innermost_scope(scopes: Iterable[Span], span: Span) -> Optional[Span]:
+    containing = [s for s in scopes if s[0] <= span[0] and span[1] <= s[1]]
+    return min(containing, key=lambda s: s[1] - s[0]) if containing else None
+
+
+def _brace_scopes(lines: List[str], span: Span) -> List[Span]:
+    """
+    Heuristic enclosing blocks for brace languages, innermost first: every `{` ... `}`
+    pair that contains the change. Braces in strings and comments are not recognised,
+    which only makes a block a little larger or smaller.
+    """
+    depth_before = []
+    depth = 0
+    for line in lines:
+        depth_before.append(depth)
+        depth += line.count("{") - line.count("}")
+    first, last = span[0] - 1, min(span[1], len(lines)) - 1
+    inner = min(depth_before[first:last + 1] or [0])
+    scopes = []
+    for level in range(inner, 0, -1):
+        start = first
+        while start > 0 and depth_before[start] >= level:
+            start -= 1
+        # Include the signature lines above a lone "{" and any annotations/comments
+        while start > 0 and lines[start - 1].strip() and not lines[start - 1].rstrip().endswith((";", "}", "{")):
+            start -= 1
+        end = last
+        while end < len(lines) - 1 and depth_before[end + 1] >= level:
+            end += 1
+        scopes.append((start + 1, end + 1))
+    return scopes
+
+
+def _indent_of(line: str) -> int:
+    return len(line) - len(line.lstrip())
+
+
+def _indentation_scope(lines: List[str], span: Span) -> Optional[Span]:
+    """
+    Heuristic enclosing block for indentation-structured code (and Python that does not parse).
+    """
+    changed = [lines[i] for i in range(span[0] - 1, min(span[1], len(lines))) if lines[i].strip()]
+    if not changed:
+        return None
+    inner = min(_indent_of(line) for line in changed)
+    if inner == 0:
+        return None
+    start = span[0] - 1
+    while start > 0 and (not lines[start].strip() or _indent_of(lines[start]) >= inner):
+        start -= 1
+    header_indent = _indent_of(lines[start])
+    end = min(span[1], len(lines)) - 1
+    while end < len(lines) - 1 and (not lines[end + 1].strip() or _indent_of(lines[end + 1]) > header_indent):
+        end += 1
+    while end > start and not lines[end].strip():
+        end -= 1
+    return start + 1, end + 1
+
+
+def _merge_spans(spans: Iterable[Span]) -> List[Span]:
+    merged: List[Span] = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _span_tokens(lines: List[str], span: Span) -> int:
+    return estimate_tokens("\n".join(lines[span[0] - 1:span[1]]))
+
+
+def _around(span: Span, line_count: int, padding: int = CONTEXT_LINES_AROUND) -> Span:
+    return max(1, span[0] - padding), min(line_count, span[1] + padding)
+
+
+def render_excerpt(lines: List[str], spans: List[Span]) -> str:
+    """
+    Joins the selected line spans, marking every omitted region with its line numbers
+    so line references stay meaningful.
+    """
+    parts = []
+    previous_end = 0
+    for start, end in spans:
+        if start > previous_end + 1:
+            parts.append(f"... (lines {previous_end + 1}-{start - 1} omitted) ...")
+        parts.extend(lines[start - 1:end])
+        previous_end = end
+    if previous_end < len(lines):
+        parts.append(f"... (lines {previous_end + 1}-{len(lines)} omitted) ...")
+    return "\n".join(parts)
+
+
+def _fit_budget(lines: List[str], spans: List[Span], token_budget: int) -> Tuple[List[Span], int]:
+    """
+    Keeps spans in order until `token_budget` is spent; the span that overflows is cut to its head.
+    Returns (kept spans, tokens used).
+    """
+    selected: List[Span] = []
+    used = 0
+    for span in spans:
+        cost = _span_tokens(lines, span)
+        if used + cost > token_budget:
+            keep = int((token_budget - used) * (span[1] - span[0] + 1) / max(1, cost))
+            if keep > 0:
+                selected.append((span[0], span[0] + keep - 1))
+                used += _span_tokens(lines, selected[-1])
+            break
+        selected.append(span)
+        used += cost
+    return selected, used
+
+
+def extract_context(filename: str, content: str, changed_spans: Iterable[Span],
+                    token_budget: int = CONTEXT_FILE_TOKEN_BUDGET) -> str:
+    """
+    Returns the parts of a base file a reviewer needs to understand the changes at
+    `changed_spans` (base-file line ranges): the innermost function or class around each
+    change, found with `ast` for Python and indentation or brace heuristics otherwise.
+    Files within `token_budget` are returned whole. Scopes that do not fit the budget are
+    narrowed to the lines around the change, and the excerpt is cut off once the budget
+    is spent.
+    """
+    if not content or estimate_tokens(content) <= token_budget:
+        return content
+    lines = content.split("\n")
+    changed = [(max(1, s), min(e, len(lines))) for s, e in changed_spans if s <= len(lines)]
+    if not changed:
+        return render_excerpt(lines, _fit_budget(lines, [(1, len(lines))], token_budget)[0])
+
+    python_scopes = _python_scopes(content) if filename.endswith(PYTHON_EXTENSIONS) else None
+    span_budget = token_budget // len(changed)
+    spans: List[Span] = []
+    for span in changed:
+        if python_scopes is not None:
+            scope = _innermost_scope(python_scopes[0], span)
+        elif filename.endswith(BRACE_EXTENSIONS):
+            # The outermost block that fits: usually the function rather than an `if` inside it
+            fitting = [s for s in _brace_scopes(lines, span) if _span_tokens(lines, s) <= span_budget]
+            scope = fitting[-1] if fitting else None
+        else:
+            scope = None
+            candidate = _indentation_scope(lines, span)
+            while candidate is not None and _span_tokens(lines, candidate) <= span_budget:
+                scope = candidate
+                candidate = _indentation_scope(lines, (candidate[0], candidate[0]))
+        if scope is None or _span_tokens(lines, scope) > span_budget:
+            scope = _around(span, len(lines))
+        spans.append(scope)
+
+    selected, used = _fit_budget(lines, _merge_spans(spans), token_budget)
+    if python_scopes is not None:
+        # Imports are cheap and tell the reviewer where names come from; added if they fit
+        imports, _ = _fit_budget(lines, python_scopes[1], token_budget - used)
+        selected = _merge_spans(selected + imports)
+    return render_excerpt(lines, selected)
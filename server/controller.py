@@ -1,27 +1,45 @@
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, List, Optional
 import json
 import asyncio
-import concurrent.futures
 from pydantic import ValidationError
 
 from crewai import Crew
-from models import (
+from .models import (
     RepoContextAgentOutput, 
     BugDetectionAgentOutput, 
     CodeQualityAgentOutput, 
     SecurityAgentOutput, 
     AlignmentAgentOutput,
     PullRequestReviewReport,
-    PullReport  # Add this import
+    PullReport,  # Add this import
+    CommitterFeedbackOutput
 )
-from utils import prepare_agent_inputs_from_pr_url
-from crew_agents import (
+from .utils import add_ingestion_nodes, prepare_incremental_agent_inputs, initial_pr_message, parse_github_pr_url
+from .pipeline import Pipeline
+from .repo_context_cache import (
+    get_repo_context_cache, repo_context_cache_key,
+    task_fingerprint, task_model_name, REPO_CONTEXT_PROMPT_VERSION
+)
+from .fanout import (
+    plan_review_groups, alignment_inputs, FANOUT_MAX_PARALLEL,
+    merge_bug_outputs, merge_code_quality_outputs, merge_security_outputs
+)
+from .llm_executor import run_llm_call
+from .agent_cache import get_agent_cache, agent_input_hash
+from .report_cache import review_fingerprint
+from .report_renderer import REPORT_RENDERER, REPORT_LLM_FEEDBACK, compute_verdict, render_report
+from .incremental import (
+    load_review_state, save_review_state, push_changes_by_previous_path,
+    carry_forward_bug_output, carry_forward_code_quality_output, carry_forward_security_output
+)
+from .crew_agents import (
     RepoContextAgent, RepoContextAgent_task,
     BugDetectionAgent, BugDetectionAgent_task,
     CodeQualityAgent, CodeQualityAgent_task,
     SecurityAgent, SecurityAgent_task,
     AlignmentAgent, AlignmentAgent_task,
-    ReportCompilerAgent, ReportCompilerAgent_task
+    ReportCompilerAgent, ReportCompilerAgent_task,
+    CommitterFeedbackAgent_task
 )
 
 # Enhance the clean_agent_output function
@@ -55,227 +73,431 @@ def clean_agent_output(output: str) -> str:
     
     return output
 
-async def run_pr_review_crew(pr_url: str) -> Dict[str, Any]:
+def parse_agent_output(result_raw, model, agent_name: str, fallback, unparsed: Optional[List[str]] = None):
+    """
+    Cleans and parses one crew's raw output into `model`; on failure logs the error,
+    records `agent_name` in `unparsed` and returns `fallback()`.
+    """
+    try:
+        return model.parse_raw(clean_agent_output(result_raw.raw))
+    except (ValidationError, json.JSONDecodeError, AttributeError) as e:
+        print(f"Error parsing {agent_name} output: {e}")
+        if unparsed is not None and agent_name not in unparsed:
+            unparsed.append(agent_name)
+        # Create a fallback object
+        return fallback()
+
+# Called as `on_progress(stage, data)` when a stage of the review completes: "fetched" and
+# "repo_context" in whichever order they resolve, then "code_quality", "bug_detection",
+# "security" and "alignment" as each finishes, "report", and finally "pipeline" with the
+# graph of the run and its timings (see pipeline.py).
+ProgressCallback = Callable[[str, Dict[str, Any]], None]
+
+def fresh_crew(agent, task) -> Crew:
+    """
+    A one-task crew built from copies of `agent` and `task`. The module-level Task and Agent
+    objects keep per-run state, and every review's crews share one executor, so no kickoff
+    may run the originals.
+    """
+    return Crew(agents=[agent], tasks=[task], verbose=True, full_output=True).copy()
+
+class CachedCrewOutput:
+    """Stands in for a crew result replayed from the agent cache (only `.raw` is read)."""
+    def __init__(self, raw: str):
+        self.raw = raw
+
+def output_parses(task, result_raw) -> bool:
+    """Whether a crew's raw output parses into its task's output model, i.e. is worth memoizing."""
+    try:
+        task.output_pydantic.parse_raw(clean_agent_output(result_raw.raw))
+        return True
+    except (ValidationError, json.JSONDecodeError, AttributeError):
+        return False
+
+async def memoized_kickoff(agent_name: str, task, crew_inputs: Dict[str, Any], group: str, kickoff_fn):
+    """
+    Runs `kickoff_fn()` on the shared crew executor unless the agent already produced an
+    output for exactly these prompt inputs, model and task definition (see agent_cache.py).
+    Only outputs that parse are memoized.
+    """
+    agent_cache = get_agent_cache()
+    key = agent_input_hash(task, crew_inputs) if agent_cache is not None else None
+    if agent_cache is not None:
+        cached_raw = agent_cache.get(agent_name, group, key)
+        if cached_raw is not None:
+            print(f"⚡ {agent_name} inputs unchanged, reusing its memoized output")
+            return CachedCrewOutput(cached_raw)
+    result_raw = await run_llm_call(task_model_name(task), kickoff_fn)
+    if agent_cache is not None and output_parses(task, result_raw):
+        agent_cache.put(group, key, result_raw.raw)
+    return result_raw
+
+def reviewed_line_count(pr_files: List[Dict[str, Any]]) -> int:
+    return sum(len(run["lines"]) for f in pr_files for run in f["added"] + f["removed"])
+
+async def run_repo_context_crew(repo_full_name: str, repo_snapshot: Dict[str, Any], pr_message: str) -> RepoContextAgentOutput:
+    """
+    Crew 1: RepoContextAgent over the repository snapshot at the base commit and the PR
+    message, unless this snapshot was already analyzed. It needs neither the diffs nor
+    the changed files' base contents.
+    """
+    repo_context_inputs = {
+        'repository_structure': json.dumps(repo_snapshot["repository_structure"]),
+        'repository_contents': json.dumps(repo_snapshot["repository_contents"]),
+        'pr_conversation_initial_message': pr_message
+    }
+    base_tree_sha = repo_snapshot["tree_sha"]
+
+    repo_context_cache = get_repo_context_cache()
+    repo_context_key = repo_context_cache_key(
+        base_tree_sha,
+        task_model_name(RepoContextAgent_task),
+        f"{REPO_CONTEXT_PROMPT_VERSION}:{task_fingerprint(RepoContextAgent_task)}",
+        pr_message
+    )
+    if repo_context_cache is not None and base_tree_sha:
+        cached_repo_context = repo_context_cache.get(repo_full_name, repo_context_key)
+        if cached_repo_context is not None:
+            print("⚡ Repo context cache hit, skipping Crew 1")
+            return RepoContextAgentOutput.parse_obj(cached_repo_context)
+
+    print("🚀 Running Crew 1: Repo Context Agent")
+    crew_1 = fresh_crew(RepoContextAgent, RepoContextAgent_task)
+
+    # CrewAI's kickoff method is not async-compatible, so run it on the shared crew executor
+    result_1_raw = await run_llm_call(
+        task_model_name(RepoContextAgent_task), lambda: crew_1.kickoff(inputs=repo_context_inputs)
+    )
+
+    # Handle potential non-Pydantic output from kickoff
+    repo_context_result: RepoContextAgentOutput
+    repo_context_parsed = False
+    try:
+        repo_context_result = RepoContextAgentOutput.parse_raw(result_1_raw.raw)
+        repo_context_parsed = True
+    except ValidationError as e:
+        print(f"Warning: RepoContextAgent did not return a valid Pydantic model directly. Attempting conversion from string. Error: {e}")
+        try:
+            # If it's a string, try loading as JSON and then parsing
+            repo_context_result = RepoContextAgentOutput.parse_obj(json.loads(result_1_raw.raw))
+            repo_context_parsed = True
+        except (json.JSONDecodeError, ValidationError) as e:
+            print(f"Error parsing RepoContextAgent output: {e}. Falling back to default.")
+            repo_context_result = RepoContextAgentOutput(
+                repo_purpose_summary=str(result_1_raw.raw),
+                key_modules_concerns_goals=[],
+                technologies_used=[],
+                common_patterns_conventions=[],
+                pr_message_context_summary=pr_message
+            )
+
+    if repo_context_parsed and repo_context_cache is not None and base_tree_sha:
+        repo_context_cache.put(repo_full_name, repo_context_key, repo_context_result.model_dump())
+    return repo_context_result
+
+def review_results_inputs(repo_context: RepoContextAgentOutput, code_quality: CodeQualityAgentOutput,
+                          bug_detection: BugDetectionAgentOutput, security: SecurityAgentOutput,
+                          alignment: AlignmentAgentOutput, pr_message: str) -> Dict[str, Any]:
+    """Every agent's result as crew inputs of the report compiler and the committer feedback."""
+    return {
+        "repo_context_result": repo_context.model_dump_json(),
+        "bug_detection_result": bug_detection.model_dump_json(),
+        "code_quality_result": code_quality.model_dump_json(),
+        "security_result": security.model_dump_json(),
+        "alignment_result": alignment.model_dump_json(),
+        "pr_conversation_initial_message": pr_message
+    }
+
+async def run_report_compiler_crew(repo_full_name: str, crew_6_inputs: Dict[str, Any]) -> Optional[str]:
+    """
+    Crew 6: ReportCompilerAgent writes the whole Markdown report (REPORT_RENDERER=llm).
+    Returns None when its output cannot be parsed, so the template report is used instead.
+    """
+    print("🚀 Running Crew 6: Report Compiler Agent")
+    crew_6 = fresh_crew(ReportCompilerAgent, ReportCompilerAgent_task)
+
+    # Run on the shared crew executor, unless every result it compiles is unchanged
+    final_report_raw = await memoized_kickoff(
+        "ReportCompilerAgent", ReportCompilerAgent_task, crew_6_inputs, repo_full_name,
+        lambda: crew_6.kickoff(inputs=crew_6_inputs)
+    )
+
+    # Debug the raw output
+    print("\n==== RAW FINAL REPORT ====")
+    print(final_report_raw.raw)
+    print("==== END RAW FINAL REPORT ====\n")
+
+    pull_report = parse_agent_output(final_report_raw, PullReport, "ReportCompilerAgent", lambda: None)
+    return pull_report.report if pull_report is not None else None
+
+async def run_committer_feedback_crew(repo_full_name: str, results_inputs: Dict[str, Any],
+                                      verdict: str, verdict_reason: str) -> Optional[str]:
+    """
+    Has ReportCompilerAgent write only the committer-feedback paragraph of a template
+    report (REPORT_LLM_FEEDBACK). Returns None when its output cannot be parsed.
+    """
+    print("🚀 Running the committer feedback crew")
+    crew_inputs = {**results_inputs, "overall_verdict": verdict, "verdict_reason": verdict_reason}
+    crew = fresh_crew(ReportCompilerAgent, CommitterFeedbackAgent_task)
+    feedback_raw = await memoized_kickoff(
+        "CommitterFeedbackAgent", CommitterFeedbackAgent_task, crew_inputs, repo_full_name,
+        lambda: crew.kickoff(inputs=crew_inputs)
+    )
+    feedback = parse_agent_output(feedback_raw, CommitterFeedbackOutput, "CommitterFeedbackAgent", lambda: None)
+    return feedback.committer_feedback if feedback is not None else None
+
+async def run_pr_review_crew(pr_url: str, on_progress: Optional[ProgressCallback] = None,
+                             incremental: bool = False, pr_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """
     Orchestrates the entire PR review process using CrewAI.
     Fetches PR data, runs agents, and compiles a final report.
+    Every fetch and crew is a node of a dependency graph (see pipeline.py) started as soon
+    as its inputs resolve, so Crew 1 runs while the changed files are still downloading.
+    `on_progress` receives each stage's result as soon as it is available.
+    With `incremental`, only what was pushed since the PR's last review goes through the
+    level-2 agents; the stored findings are carried over to the new head (see incremental.py).
+    The whole PR is reviewed when there is no usable previous review.
+    `pr_data` is the PR object when the caller already has it (it is fetched otherwise);
+    the review reads the head and base commits it names.
     """
     print(f"Starting PR review for URL: {pr_url}")
 
-    try:
-        # Step 1: Prepare all inputs from the PR URL
-        inputs = await prepare_agent_inputs_from_pr_url(pr_url)
-        
-        repo_context_inputs = {
-            'repository_structure': inputs['repository_structure'],
-            'repository_contents': inputs['repository_contents'],
-            'pr_conversation_initial_message': inputs['pr_conversation_initial_message']
-        }
-
-        level_2_base_inputs = {
-            'all_pr_diffs': inputs['all_pr_diffs'],
-            'all_original_pr_files': inputs['all_original_pr_files'],
-            'pr_conversation_initial_message': inputs['pr_conversation_initial_message']
-        }
-
-        # Step 2: Run Crew 1: RepoContextAgent
-        print("🚀 Running Crew 1: Repo Context Agent")
-        crew_1 = Crew(
-            agents=[RepoContextAgent],
-            tasks=[RepoContextAgent_task],
-            verbose=True,
-            full_output=True # Get full output to parse pydantic
-        )
-        
-        # CrewAI's kickoff method is not async-compatible, so run it in a thread pool
-        import concurrent.futures
-        with concurrent.futures.ThreadPoolExecutor() as pool:
-            result_1_raw = await asyncio.get_event_loop().run_in_executor(
-                pool, lambda: crew_1.kickoff(inputs=repo_context_inputs)
-            )
-        
-        # Handle potential non-Pydantic output from kickoff
-        repo_context_result: RepoContextAgentOutput
-        try:
-            repo_context_result = RepoContextAgentOutput.parse_raw(result_1_raw.raw)
-        except ValidationError as e:
-            print(f"Warning: RepoContextAgent did not return a valid Pydantic model directly. Attempting conversion from string. Error: {e}")
+    def report_progress(stage: str, data: Dict[str, Any]):
+        if on_progress is not None:
             try:
-                # If it's a string, try loading as JSON and then parsing
-                repo_context_result = RepoContextAgentOutput.parse_obj(json.loads(result_1_raw.raw))
-            except (json.JSONDecodeError, ValidationError) as e:
-                print(f"Error parsing RepoContextAgent output: {e}. Falling back to default.")
-                repo_context_result = RepoContextAgentOutput(
-                    repo_purpose_summary=str(result_1_raw.raw),
-                    key_modules_concerns_goals=[],
-                    technologies_used=[],
-                    common_patterns_conventions=[],
-                    pr_message_context_summary=inputs['pr_conversation_initial_message']
-                )
-
-        print(f"✅ Crew 1 Result (Repo Context): {repo_context_result.model_dump_json()}")
-
-        # Step 3: Prepare inputs for Level 2 agents with repo context
-        enhanced_level_2_inputs = {
-            **level_2_base_inputs,
-            'repo_context': repo_context_result.model_dump_json()
-        }
-
-        # Step 4: Run Level 2 agents in parallel
-        print("🚀 Running Level 2 Crews (Bug, Quality, Security, Alignment) in parallel")
-
-        crew_2 = Crew(agents=[CodeQualityAgent], tasks=[CodeQualityAgent_task], verbose=True, full_output=True)
-        crew_3 = Crew(agents=[BugDetectionAgent], tasks=[BugDetectionAgent_task], verbose=True, full_output=True)
-        crew_4 = Crew(agents=[SecurityAgent], tasks=[SecurityAgent_task], verbose=True, full_output=True)
-        crew_5 = Crew(agents=[AlignmentAgent], tasks=[AlignmentAgent_task], verbose=True, full_output=True)
-
-        # Run them in thread pool since CrewAI doesn't support native async
-        with concurrent.futures.ThreadPoolExecutor() as pool:
-            tasks = [
-                asyncio.get_event_loop().run_in_executor(pool, lambda: crew_2.kickoff(inputs=enhanced_level_2_inputs)),
-                asyncio.get_event_loop().run_in_executor(pool, lambda: crew_3.kickoff(inputs=enhanced_level_2_inputs)),
-                asyncio.get_event_loop().run_in_executor(pool, lambda: crew_4.kickoff(inputs=enhanced_level_2_inputs)),
-                asyncio.get_event_loop().run_in_executor(pool, lambda: crew_5.kickoff(inputs=enhanced_level_2_inputs))
-            ]
-            results = await asyncio.gather(*tasks)
-            result_2_raw, result_3_raw, result_4_raw, result_5_raw = results
-
-        # Parse Pydantic outputs with robust error handling
-        result_2_parsed = None
-        result_3_parsed = None
-        result_4_parsed = None
-        result_5_parsed = None
+                on_progress(stage, data)
+            except Exception as e:
+                # A broken listener must not fail the review
+                print(f"Warning: progress callback failed for stage '{stage}': {e}")
 
-        try:
-            # Clean and parse result_2_raw (CodeQualityAgent)
-            cleaned_output = clean_agent_output(result_2_raw.raw)
-            result_2_parsed = CodeQualityAgentOutput.parse_raw(cleaned_output)
-        except (ValidationError, json.JSONDecodeError, AttributeError) as e:
-            print(f"Error parsing CodeQualityAgent output: {e}")
-            # Create a fallback object
-            result_2_parsed = CodeQualityAgentOutput(
-                has_code_quality_issues=False,
-                findings=[],
-                overall_code_quality_assessment="Unable to parse code quality assessment"
-            )
+    try:
+        repo_owner, repo_name, pr_number = parse_github_pr_url(pr_url)
+        repo_full_name = f"{repo_owner}/{repo_name}"
 
-        try:
-            # Clean and parse result_3_raw (BugDetectionAgent)
-            cleaned_output = clean_agent_output(result_3_raw.raw)
-            result_3_parsed = BugDetectionAgentOutput.parse_raw(cleaned_output)
-        except (ValidationError, json.JSONDecodeError, AttributeError) as e:
-            print(f"Error parsing BugDetectionAgent output: {e}")
-            # Create a fallback object
-            result_3_parsed = BugDetectionAgentOutput(
-                has_bugs=False,
-                findings=[],
-                overall_assessment="Unable to parse bug detection assessment"
-            )
+        # Step 1: Inputs of the push since the last review, when there is one to build on
+        incremental_inputs = None
+        previous_review = None
+        if incremental:
+            previous_review = load_review_state(repo_full_name, pr_number)
+            if previous_review is not None and previous_review.get("review_fingerprint") == review_fingerprint():
+                incremental_inputs = await prepare_incremental_agent_inputs(pr_url, previous_review["head_sha"], pr_data)
+            if incremental_inputs is not None and incremental_inputs['pr_conversation_initial_message'] != previous_review.get("pr_message"):
+                print("Note: The PR description changed since the last review")
+                incremental_inputs = None
+            if incremental_inputs is None:
+                print("Note: No previous review to build on, reviewing the whole PR")
+                previous_review = None
 
-        try:
-            # Clean and parse result_4_raw (SecurityAgent) 
-            cleaned_output = clean_agent_output(result_4_raw.raw)
-            result_4_parsed = SecurityAgentOutput.parse_raw(cleaned_output)
-        except (ValidationError, json.JSONDecodeError, AttributeError) as e:
-            print(f"Error parsing SecurityAgent output: {e}")
-            # Create a fallback object
-            result_4_parsed = SecurityAgentOutput(
-                has_security_vulnerabilities=False,
-                findings=[],
-                overall_security_assessment="Unable to parse security assessment"
-            )
+        pipeline = Pipeline(f"review {repo_full_name}#{pr_number}")
 
-        try:
-            # Clean and parse result_5_raw (AlignmentAgent)
-            cleaned_output = clean_agent_output(result_5_raw.raw)
-            result_5_parsed = AlignmentAgentOutput.parse_raw(cleaned_output)
-        except (ValidationError, json.JSONDecodeError, AttributeError) as e:
-            print(f"Error parsing AlignmentAgent output: {e}")
-            # Create a fallback object
-            result_5_parsed = AlignmentAgentOutput(
-                alignment_score=50,
-                pr_nature_classification="Core Improvement",
-                justification="Unable to parse alignment assessment",
-                potential_misalignment_risks=[]
-            )
+        # Step 2: Ingestion nodes; "inputs" resolves once everything the agents read is fetched
+        if incremental_inputs is None:
+            add_ingestion_nodes(pipeline, pr_url, pr_data)
+        else:
+            async def inputs():
+                return incremental_inputs
+            pipeline.add("inputs", inputs)
 
-        # Step 5: Run Crew 6: ReportCompilerAgent
-        print("🚀 Running Crew 6: Report Compiler Agent")
-        crew_6_inputs = {
-            "repo_context_result": repo_context_result.model_dump_json(),
-            "bug_detection_result": result_3_parsed.model_dump_json(),
-            "code_quality_result": result_2_parsed.model_dump_json(), 
-            "security_result": result_4_parsed.model_dump_json(),
-            "alignment_result": result_5_parsed.model_dump_json(),
-            "pr_conversation_initial_message": inputs['pr_conversation_initial_message']
-        }
-        
-        crew_6 = Crew(
-            agents=[ReportCompilerAgent],
-            tasks=[ReportCompilerAgent_task],
-            verbose=True,
-            full_output=True
-        )
-        
-        # Run in thread pool
-        with concurrent.futures.ThreadPoolExecutor() as pool:
-            final_report_raw = await asyncio.get_event_loop().run_in_executor(
-                pool, lambda: crew_6.kickoff(inputs=crew_6_inputs)
+        async def fetched(inputs):
+            report_progress("fetched", {
+                "repo_full_name": inputs['repo_full_name'],
+                "pr_number": inputs['pr_number'],
+                "head_sha": inputs['head_sha'],
+                "incremental_since": inputs.get('previous_head_sha'),
+                "reviewed_files": [f["file"] for f in inputs['pr_files']],
+                "skipped_files": inputs['skipped_pr_files'],
+            })
+
+        pipeline.add("fetched", fetched, deps=["inputs"])
+
+        # Step 3: Crew 1 needs only the repository snapshot and the PR message; incremental
+        # reviews keep the repo context of the previous one
+        async def repo_context(pr_conversation=None, repo_snapshot=None):
+            if previous_review is not None:
+                result = RepoContextAgentOutput.parse_obj(previous_review["repo_context"])
+            else:
+                result = await run_repo_context_crew(repo_full_name, repo_snapshot, initial_pr_message(pr_conversation))
+            print(f"✅ Crew 1 Result (Repo Context): {result.model_dump_json()}")
+            report_progress("repo_context", result.model_dump())
+            return result
+
+        pipeline.add("repo_context", repo_context,
+                     deps=[] if previous_review is not None else ["pr_conversation", "repo_snapshot"])
+
+        # Step 4: Run Level 2 agents in parallel once the payload and the repo context are there
+        async def level_2(inputs, repo_context):
+            repo_context_result = repo_context
+            enhanced_level_2_inputs = {
+                'all_pr_diffs': inputs['all_pr_diffs'],
+                'all_original_pr_files': inputs['all_original_pr_files'],
+                'pr_payload_format': inputs['pr_payload_format'],
+                'skipped_pr_files': inputs['skipped_pr_files'],
+                'pr_conversation_initial_message': inputs['pr_conversation_initial_message'],
+                'repo_context': repo_context_result.model_dump_json()
+            }
+
+            # Bug, Quality and Security fan out over groups of related files that each fit the
+            # prompt token budget, so latency follows the largest group rather than the PR size;
+            # Alignment judges the PR as a whole, from the file list and the diffs that fit its
+            # budget. Files dropped by triage are not in any group; when nothing is left
+            # (dependency bumps, generated code) only the Alignment crew runs.
+            review_groups = plan_review_groups(inputs['pr_files'])
+            group_inputs = [group.to_inputs() for group in review_groups]
+            group_weights = [group.tokens for group in review_groups]
+            print(f"🚀 Running Level 2 Crews (Bug, Quality, Security, Alignment) in parallel over {len(group_inputs)} file group(s)")
+            if not review_groups:
+                print("✂️ No reviewable files left after triage; skipping the Bug, Quality and Security crews")
+            if len(review_groups) > 1:
+                for group in review_groups:
+                    print(f"   • ~{group.tokens} tokens: {', '.join(group.files)}")
+
+            def kickoff(agent, task, crew_inputs):
+                return fresh_crew(agent, task).kickoff(inputs=crew_inputs)
+
+            # Run them on the shared crew executor since CrewAI doesn't support native async.
+            # The process-wide LLM limiter caps calls across reviews; the semaphore keeps one
+            # large PR from taking every slot.
+            review_slots = asyncio.Semaphore(FANOUT_MAX_PARALLEL)
+
+            # Each (agent, group) run is memoized on its exact inputs, so after a follow-up
+            # commit only the groups whose files changed are reviewed again
+            async def run(agent_name, agent, task, extra_inputs):
+                crew_inputs = {**enhanced_level_2_inputs, **extra_inputs}
+                async with review_slots:
+                    return await memoized_kickoff(agent_name, task, crew_inputs, inputs['repo_full_name'],
+                                                  lambda: kickoff(agent, task, crew_inputs))
+
+            # Parse Pydantic outputs with robust error handling, then merge the per-group findings.
+            # Agents whose output could not be parsed keep the verdict from approving the PR.
+            unparsed_agents = []
+
+            def parse_code_quality(raws):
+                return merge_code_quality_outputs([
+                    parse_agent_output(raw, CodeQualityAgentOutput, "CodeQualityAgent", lambda: CodeQualityAgentOutput(
+                        code_quality_score=50,
+                        suggestions=[],
+                        summary_comment="Unable to parse code quality assessment"
+                    ), unparsed_agents) for raw in raws
+                ], weights=group_weights)
+
+            def parse_bug_detection(raws):
+                return merge_bug_outputs([
+                    parse_agent_output(raw, BugDetectionAgentOutput, "BugDetectionAgent", lambda: BugDetectionAgentOutput(
+                        has_bugs=False,
+                        findings=[],
+                        overall_assessment="Unable to parse bug detection assessment"
+                    ), unparsed_agents) for raw in raws
+                ])
+
+            def parse_security(raws):
+                return merge_security_outputs([
+                    parse_agent_output(raw, SecurityAgentOutput, "SecurityAgent", lambda: SecurityAgentOutput(
+                        has_security_vulnerabilities=False,
+                        findings=[],
+                        overall_security_assessment="Unable to parse security assessment"
+                    ), unparsed_agents) for raw in raws
+                ])
+
+            def parse_alignment(raws):
+                return parse_agent_output(raws[0], AlignmentAgentOutput, "AlignmentAgent", lambda: AlignmentAgentOutput(
+                    alignment_score=50,
+                    pr_nature_classification="Core Improvement",
+                    justification="Unable to parse alignment assessment",
+                    potential_misalignment_risks=[]
+                ), unparsed_agents)
+
+            # Incremental reviews merge the push's findings into the previous head's, carried
+            # over to the new line numbers; the quality score is weighted by lines reviewed
+            if previous_review is not None:
+                push_changes = push_changes_by_previous_path(inputs['file_changes'])
+                push_weights = [previous_review["reviewed_lines"], max(1, reviewed_line_count(inputs['pr_files']))]
+                parse_code_quality_push, parse_bug_detection_push, parse_security_push = parse_code_quality, parse_bug_detection, parse_security
+
+                def with_previous(stage, parse_push, carry_forward, model, merge):
+                    def parse(raws):
+                        carried = carry_forward(model.parse_obj(previous_review[stage]), push_changes)
+                        return merge([carried, parse_push(raws)]) if raws else carried
+                    return parse
+
+                parse_code_quality = with_previous("code_quality", parse_code_quality_push, carry_forward_code_quality_output,
+                                                   CodeQualityAgentOutput, lambda outputs: merge_code_quality_outputs(outputs, weights=push_weights))
+                parse_bug_detection = with_previous("bug_detection", parse_bug_detection_push, carry_forward_bug_output,
+                                                    BugDetectionAgentOutput, merge_bug_outputs)
+                parse_security = with_previous("security", parse_security_push, carry_forward_security_output,
+                                               SecurityAgentOutput, merge_security_outputs)
+
+            async def level_2_stage(stage, runs, parse):
+                # Each agent's result is reported as soon as all of its groups are done
+                result = parse(await asyncio.gather(*runs))
+                report_progress(stage, result.model_dump())
+                return result
+
+            # Alignment judges the PR as a whole, so an incremental review keeps the previous verdict
+            if previous_review is not None:
+                alignment_stage = level_2_stage("alignment", [], lambda raws: AlignmentAgentOutput.parse_obj(previous_review["alignment"]))
+            else:
+                alignment_stage = level_2_stage("alignment", [run("AlignmentAgent", AlignmentAgent, AlignmentAgent_task, alignment_inputs(inputs['pr_files']))], parse_alignment)
+
+            result_2_parsed, result_3_parsed, result_4_parsed, result_5_parsed = await asyncio.gather(
+                level_2_stage("code_quality", [run("CodeQualityAgent", CodeQualityAgent, CodeQualityAgent_task, g) for g in group_inputs], parse_code_quality),
+                level_2_stage("bug_detection", [run("BugDetectionAgent", BugDetectionAgent, BugDetectionAgent_task, g) for g in group_inputs], parse_bug_detection),
+                level_2_stage("security", [run("SecurityAgent", SecurityAgent, SecurityAgent_task, g) for g in group_inputs], parse_security),
+                alignment_stage,
             )
 
-        # Debug the raw output
-        print("\n==== RAW FINAL REPORT ====")
-        print(final_report_raw.raw)
-        print("==== END RAW FINAL REPORT ====\n")
+            # The next incremental review builds on this head and these findings. A run with an
+            # unparsed agent output is not a baseline: its files would never get a real review,
+            # so the next incremental review starts from the last complete one instead.
+            if unparsed_agents:
+                print(f"Note: Not saving this review as a baseline, {', '.join(unparsed_agents)} output could not be parsed")
+            else:
+                reviewed_lines = reviewed_line_count(inputs['pr_files'])
+                if previous_review is not None:
+                    reviewed_lines += previous_review["reviewed_lines"]
+                save_review_state(inputs['repo_full_name'], inputs['pr_number'], {
+                    "head_sha": inputs['head_sha'],
+                    "review_fingerprint": review_fingerprint(),
+                    "pr_message": inputs['pr_conversation_initial_message'],
+                    "reviewed_lines": reviewed_lines,
+                    "repo_context": repo_context_result.model_dump(),
+                    "code_quality": result_2_parsed.model_dump(),
+                    "bug_detection": result_3_parsed.model_dump(),
+                    "security": result_4_parsed.model_dump(),
+                    "alignment": result_5_parsed.model_dump(),
+                })
 
-        # Update the final report parsing section
+            return result_2_parsed, result_3_parsed, result_4_parsed, result_5_parsed, unparsed_agents
 
-        # After running crew_6.kickoff():
-        try:
-            # Clean the final report output
-            cleaned_final_report = clean_agent_output(final_report_raw.raw)
-            
-            # Debug the cleaned output
-            print("\n==== CLEANED FINAL REPORT ====")
-            print(cleaned_final_report)
-            print("==== END CLEANED FINAL REPORT ====\n")
-            
-            # Parse as PullReport
-            pull_report = PullReport.parse_raw(cleaned_final_report)
-            
-            # Return just the content as the report
-            return {"report": pull_report.report}
-        except (ValidationError, json.JSONDecodeError) as e:
-            print(f"Error parsing final report: {e}")
-            # Create a fallback markdown report
-            fallback_markdown = """# Pull Request Review
-
-## Overall Verdict
-**Needs More Review**
-
-## Executive Summary
-An error occurred during the report generation. The system was unable to fully analyze the pull request.
-
-## Bug Risk Assessment
-Unable to generate bug risk summary due to parsing error.
-
-## Code Quality Assessment
-Unable to generate code quality assessment due to parsing error.
-
-## Security Assessment
-Unable to generate security assessment due to parsing error.
-
-## Alignment Assessment
-Unable to generate alignment assessment due to parsing error.
-
-## Feedback for Committer
-We apologize, but an error occurred during report generation. Please try again or contact support if the issue persists.
-
-## Actionable Next Steps
-- Please try rerunning the review or check individual agent outputs
-"""
-    
-            return {"report": fallback_markdown}
+        pipeline.add("level_2", level_2, deps=["inputs", "repo_context"])
+
+        # Step 5: The final report, rendered from the agents' outputs (see report_renderer.py)
+        # or, with REPORT_RENDERER=llm, compiled by Crew 6
+        async def report(inputs, repo_context, level_2):
+            result_2_parsed, result_3_parsed, result_4_parsed, result_5_parsed, unparsed_agents = level_2
+            crew_inputs = review_results_inputs(repo_context, result_2_parsed, result_3_parsed, result_4_parsed,
+                                                result_5_parsed, inputs['pr_conversation_initial_message'])
+            markdown = None
+            if REPORT_RENDERER == "llm":
+                markdown = await run_report_compiler_crew(repo_full_name, crew_inputs)
+            if markdown is None:
+                feedback = None
+                if REPORT_LLM_FEEDBACK:
+                    verdict, verdict_reason = compute_verdict(result_3_parsed, result_2_parsed, result_4_parsed,
+                                                              result_5_parsed, unparsed_agents)
+                    feedback = await run_committer_feedback_crew(repo_full_name, crew_inputs, verdict, verdict_reason)
+                print("📝 Rendering the report from the agents' outputs")
+                markdown = render_report(repo_context, result_3_parsed, result_2_parsed, result_4_parsed,
+                                         result_5_parsed, committer_feedback=feedback, unparsed_agents=unparsed_agents)
+            report_progress("report", {"report": markdown})
+            return {"report": markdown}
+
+        pipeline.add("report", report, deps=["inputs", "repo_context", "level_2"])
+
+        results = await pipeline.run()
+        graph = pipeline.graph()
+        print(f"⏱️ Review took {graph['total_seconds']}s; critical path: {' → '.join(graph['critical_path'])}")
+        report_progress("pipeline", graph)
+        return results["report"]
     except Exception as e:
         print(f"❌ An error occurred during PR review: {e}")
         raise
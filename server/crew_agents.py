@@ -5,14 +5,15 @@ from typing import List, Dict, Any, Optional
 import json
 
 # Import Pydantic models from your models.py
-from models import (
+from .models import (
     RepoContextAgentOutput,
     BugDetectionAgentOutput, BugFinding,
     CodeQualityAgentOutput, CodeQualitySuggestion,
     SecurityAgentOutput, SecurityFinding,
     AlignmentAgentOutput,
     PullRequestReviewReport,
-    PullReport
+    PullReport,
+    CommitterFeedbackOutput
 )
 
 load_dotenv()
@@ -125,11 +126,30 @@ RepoContextAgent_task = Task(
     # output_file="output/repo_context_agent_output.json", # Remove output_file for API use
 )
 
+# The PR payload itself, appended to the level-2 task descriptions. CrewAI only fills in
+# kickoff inputs that a description names as `{placeholder}`, so a task that merely mentions
+# `all_pr_diffs` in backticks never sees the diffs. Its encoding is configurable (see
+# payload_encoding.py), so the prompt carries the format description too.
+PR_DIFFS_SECTION = (
+    "\n\nThe pull request payload is encoded as follows: {pr_payload_format}\n\n"
+    "`all_pr_diffs`:\n{all_pr_diffs}\n\n"
+    "Changed files left out of the review (generated, vendored, lockfiles, binaries; only summarized here):\n{skipped_pr_files}"
+)
+PR_PAYLOAD_SECTION = PR_DIFFS_SECTION + "\n\n`all_original_pr_files`:\n{all_original_pr_files}"
+# Alignment reads the whole PR, so it gets every file name but only as many diffs as fit
+# its token budget (see fanout.alignment_inputs) instead of the full payload
+ALIGNMENT_PAYLOAD_SECTION = (
+    "\n\nChanged files, with the number of lines added/removed:\n{alignment_pr_files}\n\n"
+    "The diffs are encoded as follows: {pr_payload_format}\n\n"
+    "`all_pr_diffs` (the files marked \"diff not shown\" are left out to keep the prompt within budget):\n{alignment_pr_diffs}\n\n"
+    "Changed files left out of the review (generated, vendored, lockfiles, binaries; only summarized here):\n{skipped_pr_files}"
+)
+
 # BugDetectionAgent_task - Updated for whole-PR analysis
 BugDetectionAgent_task = Task(
     description=(
-        "Analyze the **entire pull request**, which consists of `all_pr_diffs` (a JSON string representing an array of changes for multiple files) "
-        "and `all_original_pr_files` (a JSON string representing an object mapping filenames to their original content before the changes). "
+        "Analyze the **entire pull request**, which consists of `all_pr_diffs` (the changes of every file in the PR) "
+        "and `all_original_pr_files` (each file's original content before the changes; for large files only the functions and classes around the changes are included, with omitted line ranges marked). "
         "Your goal is to identify any potential bugs, logical errors, edge case failures, or bad practices that could lead to "
         "runtime issues across the *entire scope of the pull request*.\n\n"
         "**Crucially, use the `{repo_context}` provided by the 'Software Architecture Investigator' to understand "
@@ -156,7 +176,7 @@ BugDetectionAgent_task = Task(
         "6. A `suggested_fix` that is concrete and actionable.\n\n"
         "If no bugs are found, set `has_bugs` to `False` and `findings` as an empty list, and provide an `overall_assessment` that confirms a low bug risk for the pull request.\n"
         "Your output must adhere to the `BugDetectionAgentOutput` Pydantic model."
-    ),
+    ) + PR_PAYLOAD_SECTION,
     output_pydantic=BugDetectionAgentOutput,
     expected_output=BugDetectionAgentOutput.schema_json(),
     agent=BugDetectionAgent,
@@ -166,7 +186,7 @@ BugDetectionAgent_task = Task(
 # CodeQualityAgent_task - Updated for whole-PR analysis
 CodeQualityAgent_task = Task(
     description=(
-        "Review the **entire pull request**, analyzing `all_pr_diffs` (a JSON string of changes) and `all_original_pr_files` (a JSON string of original contents) for code quality issues. "
+        "Review the **entire pull request**, analyzing `all_pr_diffs` (the changes) and `all_original_pr_files` (the original contents, trimmed to the code around the changes for large files) for code quality issues. "
         "**Refer to the `{repo_context}` provided by the 'Software Architecture Investigator', "
         "especially `technologies_used` and `common_patterns_conventions`, to ensure your suggestions are relevant to the project's ecosystem.** "
         "Also, consider the `{pr_conversation_initial_message}` to understand the committer's intent, "
@@ -182,7 +202,7 @@ CodeQualityAgent_task = Task(
         "For each suggestion, specify the `file`, `line_numbers`, `code_block`, `description`, `suggestion` (actionable advice), and `category`.\n"
         "Summarize the overall code quality assessment in `summary_comment`.\n"
         "Your output must adhere to the `CodeQualityAgentOutput` Pydantic model."
-    ),
+    ) + PR_PAYLOAD_SECTION,
     output_pydantic=CodeQualityAgentOutput,
     expected_output=CodeQualityAgentOutput.schema_json(),
     agent=CodeQualityAgent,
@@ -192,7 +212,7 @@ CodeQualityAgent_task = Task(
 # SecurityAgent_task - Updated for whole-PR analysis
 SecurityAgent_task = Task(
     description=(
-        "Analyze the **entire pull request**, considering `all_pr_diffs` (a JSON string of changes) and `all_original_pr_files` (a JSON string of original contents) for any security vulnerabilities or risks. "
+        "Analyze the **entire pull request**, considering `all_pr_diffs` (the changes) and `all_original_pr_files` (the original contents, trimmed to the code around the changes for large files) for any security vulnerabilities or risks. "
         "**Use the `{repo_context}` to understand the project's technologies (`technologies_used`) and typical data flows, "
         "which can help identify common security pitfalls relevant to this codebase.** "
         "Consider the `{pr_conversation_initial_message}` to see if the changes impact any security-sensitive areas as described by the committer, and look for inter-file security implications.\n\n"
@@ -209,7 +229,7 @@ SecurityAgent_task = Task(
         "For each finding, provide the `file`, `line_numbers`, `code_snippet`, `title`, `explanation`, `risk_level` (Critical, High, Medium, Low, Informational), and `recommended_mitigation`.\n"
         "If no vulnerabilities are found, set `has_security_vulnerabilities` to `False` and `findings` as an empty list, and provide an `overall_security_assessment` that confirms a low security risk for the pull request.\n"
         "Your output must adhere to the `SecurityAgentOutput` Pydantic model."
-    ),
+    ) + PR_PAYLOAD_SECTION,
     output_pydantic=SecurityAgentOutput,
     expected_output=SecurityAgentOutput.schema_json(),
     agent=SecurityAgent,
@@ -219,7 +239,7 @@ SecurityAgent_task = Task(
 # AlignmentAgent_task - Updated for whole-PR analysis
 AlignmentAgent_task = Task(
     description=(
-        "Evaluate the **entire pull request**, considering `all_pr_diffs` (a JSON string of changes) and, critically, "
+        "Evaluate the **entire pull request**, considering the list of changed files, `all_pr_diffs` (the changes) and, critically, "
         "the `{pr_conversation_initial_message}` against the `{repo_context}` provided by "
         "the 'Software Architecture Investigator'.\n\n"
         "1. **Determine the `alignment_score` (0-100)**: How well do these changes (and their stated purpose) fit with the repository purpose and key modules/goals as described in the repo context? Consider the holistic impact of all changes.\n"
@@ -228,7 +248,7 @@ AlignmentAgent_task = Task(
         "Explain how the *combined changes* contribute to or detract from the project's overall vision.\n"
         "4. **Identify `potential_misalignment_risks`**: Are there any long-term risks if this type of change is frequently introduced? Does it set a precedent that could lead to architectural debt or scope creep, considering the entire scope of the PR?\n\n"
         "Your output must strictly follow the `AlignmentAgentOutput` Pydantic model."
-    ),
+    ) + ALIGNMENT_PAYLOAD_SECTION,
     output_pydantic=AlignmentAgentOutput,
     expected_output=AlignmentAgentOutput.schema_json(),
     agent=AlignmentAgent,
@@ -316,3 +336,24 @@ ReportCompilerAgent_task = Task(
     output_pydantic=PullReport,
     expected_output=PullReport.schema_json()
 )
+
+# CommitterFeedbackAgent_task: the only prose the template renderer (report_renderer.py)
+# asks a model for; every other report section is rendered from the agents' outputs
+CommitterFeedbackAgent_task = Task(
+    description=(
+        "The review of a pull request is complete and its verdict is **{overall_verdict}** ({verdict_reason}). "
+        "Using the `{repo_context_result}`, `{bug_detection_result}`, `{code_quality_result}`, `{security_result}` "
+        "and `{alignment_result}`, and the committer's own description of the PR, `{pr_conversation_initial_message}`, "
+        "write the **Feedback for Committer** part of the review:\n"
+        "- CRITICAL: Craft a human-like, empathetic, and constructive comment addressed to the committer\n"
+        "- Start with positive feedback where appropriate\n"
+        "- Clearly but kindly explain the most important issues, referencing specific findings\n"
+        "- Reference the committer's stated goal from the PR description\n\n"
+        "Write one or two short paragraphs of Markdown prose: no headings and no full list of findings, "
+        "since the rest of the report already lists them.\n"
+        "Your output must adhere to the `CommitterFeedbackOutput` Pydantic model."
+    ),
+    agent=ReportCompilerAgent,
+    output_pydantic=CommitterFeedbackOutput,
+    expected_output=CommitterFeedbackOutput.schema_json()
+)
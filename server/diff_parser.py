@@ -0,0 +1,405 @@
+import re
+import codecs
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+# "@@ -old_start[,old_count] +new_start[,new_count] @@ [section]"
+HUNK_HEADER_RE = re.compile(r"@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class LineRun:
+    """
+    A run of consecutive added (or removed) lines.
+    Nothing is copied per line: the run is a (`start`, `count`) range of line numbers and
+    the `begin:end_offset` slice of `text` holding its diff lines as-is (with their `+`/`-`
+    prefix). `text` is the parsed patch itself, shared by all of its runs, so the lines
+    and their prefix-stripped `code` are only built when requested.
+    """
+    __slots__ = ("start", "count", "text", "begin", "end_offset")
+
+    def __init__(self, start: int, text: str, begin: int = 0, end_offset: Optional[int] = None, count: int = 0):
+        self.start = start
+        self.count = count
+        self.text = text
+        self.begin = begin
+        self.end_offset = len(text) if end_offset is None else end_offset
+
+    @property
+    def end(self) -> int:
+        """Last line number of the run (inclusive)."""
+        return self.start + self.count - 1
+
+    @property
+    def line_numbers(self) -> range:
+        return range(self.start, self.start + self.count)
+
+    @property
+    def raw_lines(self) -> List[str]:
+        if not self.count:
+            return []
+        return self.text[self.begin:self.end_offset].split("\n")
+
+    @property
+    def code_lines(self) -> List[str]:
+        return [line[1:] for line in self.raw_lines]
+
+    @property
+    def code(self) -> str:
+        if not self.count:
+            return ""
+        raw = self.text[self.begin:self.end_offset]
+        # Every line of the run starts with the same prefix
+        return raw[1:].replace("\n" + raw[0], "\n")
+
+    def extend(self, text: str, begin: int, end: int):
+        """
+        Adds the diff line `text[begin:end]` to the run. Lines that directly follow the
+        run in the same text only move `end_offset`; anything else (a `+` line after a
+        `-` line inside an open added run) is copied into a text of the run's own.
+        """
+        if self.text is not text or self.end_offset != begin - 1:
+            self.text = self.text[self.begin:self.end_offset] + "\n" + text[begin:end]
+            self.begin = 0
+            end = len(self.text)
+        self.end_offset = end
+        self.count += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The legacy chunk shape: {"lines": [...], "code": "..."}."""
+        return {"lines": list(self.line_numbers), "code": self.code}
+
+    def __repr__(self):
+        return f"LineRun({self.start}-{self.end})"
+
+
+class Hunk:
+    """
+    One `@@` hunk of a unified diff with its added and removed line runs.
+    """
+    __slots__ = ("old_start", "old_count", "new_start", "new_count", "section", "added", "removed")
+
+    def __init__(self, old_start: int, old_count: int, new_start: int, new_count: int, section: str = ""):
+        self.old_start = old_start
+        self.old_count = old_count
+        self.new_start = new_start
+        self.new_count = new_count
+        self.section = section
+        self.added: List[LineRun] = []
+        self.removed: List[LineRun] = []
+
+    def __repr__(self):
+        return f"Hunk(-{self.old_start},{self.old_count} +{self.new_start},{self.new_count})"
+
+
+class ParsedPatch:
+    __slots__ = ("hunks",)
+
+    def __init__(self, hunks: List[Hunk]):
+        self.hunks = hunks
+
+    def added_runs(self) -> Iterator[LineRun]:
+        for hunk in self.hunks:
+            yield from hunk.added
+
+    def removed_runs(self) -> Iterator[LineRun]:
+        for hunk in self.hunks:
+            yield from hunk.removed
+
+    def base_spans(self) -> List[Tuple[int, int]]:
+        """
+        The (first, last) base-file lines each hunk covers (context included). Pure
+        insertions are anchored on the line they follow; hunks of new files are skipped.
+        """
+        return [(hunk.old_start, max(hunk.old_start, hunk.old_start + hunk.old_count - 1))
+                for hunk in self.hunks if hunk.old_start > 0]
+
+    def to_chunks(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Converts to the (added_chunks, removed_chunks) dicts `chunk_diff` returns."""
+        return [run.to_dict() for run in self.added_runs()], [run.to_dict() for run in self.removed_runs()]
+
+
+def parse_hunk_header(line: str) -> Optional[Hunk]:
+    match = HUNK_HEADER_RE.match(line)
+    if not match:
+        return None
+    old_start, old_count, new_start, new_count = match.groups()
+    return Hunk(
+        int(old_start), 1 if old_count is None else int(old_count),
+        int(new_start), 1 if new_count is None else int(new_count),
+        line[match.end():].strip(),
+    )
+
+
+class HunkBuilder:
+    """
+    Incremental single-pass hunk parser: feed it the lines of one file's diff body with
+    `feed()`; every completed hunk is returned by `feed()`/`finish()`.
+    Lines before the first `@@` (file headers) are ignored and `\\ No newline at end of file`
+    markers are skipped without affecting line numbers.
+    """
+    __slots__ = ("hunk", "old_line", "new_line", "added", "removed")
+
+    def __init__(self):
+        self.hunk: Optional[Hunk] = None
+        self.old_line = self.new_line = 0
+        # (first line number, lines) of the open runs; streamed lines share no patch text,
+        # so each run's lines are joined into one string when it closes
+        self.added: Optional[Tuple[int, List[str]]] = None
+        self.removed: Optional[Tuple[int, List[str]]] = None
+
+    def _flush_runs(self):
+        if self.added is not None:
+            start, lines = self.added
+            self.hunk.added.append(LineRun(start, "\n".join(lines), count=len(lines)))
+            self.added = None
+        if self.removed is not None:
+            start, lines = self.removed
+            self.hunk.removed.append(LineRun(start, "\n".join(lines), count=len(lines)))
+            self.removed = None
+
+    def feed(self, line: str) -> Optional[Hunk]:
+        first = line[:1]
+        if first == "@":
+            if line.startswith("@@"):
+                finished = self.finish()
+                self.hunk = parse_hunk_header(line)
+                if self.hunk is not None:
+                    self.old_line = self.hunk.old_start
+                    self.new_line = self.hunk.new_start
+                return finished
+        if self.hunk is None:
+            return None
+        if first == "+":
+            if self.added is None:
+                self.added = (self.new_line, [])
+            self.added[1].append(line)
+            self.new_line += 1
+        elif first == "-":
+            if self.removed is None:
+                self.removed = (self.old_line, [])
+            self.removed[1].append(line)
+            self.old_line += 1
+        elif first == "\\":
+            pass  # "\ No newline at end of file"
+        else:
+            # Context line
+            self._flush_runs()
+            self.old_line += 1
+            self.new_line += 1
+        return None
+
+    def finish(self) -> Optional[Hunk]:
+        if self.hunk is None:
+            return None
+        self._flush_runs()
+        hunk, self.hunk = self.hunk, None
+        return hunk
+
+
+def parse_patch(patch: Optional[str]) -> ParsedPatch:
+    """
+    Parses a unified diff patch (such as GitHub's `patch` field) into compact hunk records
+    whose runs point into `patch` instead of copying its lines.
+    Same rules as `HunkBuilder`, inlined into one loop because this is the hot path for
+    large generated-code PRs.
+    """
+    hunks: List[Hunk] = []
+    if not patch:
+        return ParsedPatch(hunks)
+
+    hunk: Optional[Hunk] = None
+    added: Optional[LineRun] = None
+    removed: Optional[LineRun] = None
+    old_line = new_line = 0
+    pos = 0  # offset of `line` in `patch`
+
+    for line in patch.split("\n"):
+        end = pos + len(line)
+        first = line[:1]
+        if first == "+":
+            if hunk is not None:
+                if added is None:
+                    added = LineRun(new_line, patch, pos, end, 1)
+                    hunk.added.append(added)
+                elif added.end_offset == pos - 1 and added.text is patch:
+                    added.end_offset = end
+                    added.count += 1
+                else:
+                    added.extend(patch, pos, end)
+                new_line += 1
+        elif first == "-":
+            if hunk is not None:
+                if removed is None:
+                    removed = LineRun(old_line, patch, pos, end, 1)
+                    hunk.removed.append(removed)
+                elif removed.end_offset == pos - 1 and removed.text is patch:
+                    removed.end_offset = end
+                    removed.count += 1
+                else:
+                    removed.extend(patch, pos, end)
+                old_line += 1
+        elif first == "@" and line.startswith("@@"):
+            hunk = parse_hunk_header(line)
+            added = removed = None
+            if hunk is not None:
+                hunks.append(hunk)
+                old_line = hunk.old_start
+                new_line = hunk.new_start
+        elif first == "\\":
+            pass  # "\ No newline at end of file"
+        elif hunk is not None:
+            # Context line
+            added = removed = None
+            old_line += 1
+            new_line += 1
+        pos = end + 1
+    return ParsedPatch(hunks)
+
+
+def chunk_diff(patch: Optional[str]):
+    """
+    Extracts both added and removed lines from a unified diff patch.
+    Returns two lists: added_chunks and removed_chunks
+    """
+    return parse_patch(patch).to_chunks()
+
+
+# --- Streaming over raw `.diff` output (git diff / GitHub's diff media type) ---
+class FileDiffHeader:
+    """
+    File-level metadata of one `diff --git` section.
+    """
+    __slots__ = ("old_path", "new_path", "status", "is_binary")
+
+    def __init__(self, old_path: Optional[str], new_path: Optional[str]):
+        self.old_path = old_path
+        self.new_path = new_path
+        self.status = "modified"
+        self.is_binary = False
+
+    @property
+    def path(self) -> Optional[str]:
+        """The path the file has after the change (the old path for deletions)."""
+        return self.new_path or self.old_path
+
+    def __repr__(self):
+        return f"FileDiffHeader({self.path!r}, {self.status})"
+
+
+def _unquote_diff_path(raw: str) -> str:
+    """
+    Undoes git's C-style quoting of unusual paths ("a/t\\303\\251st.txt").
+    """
+    raw = raw.rstrip("\t")  # git appends a tab to ---/+++ names containing spaces
+    if len(raw) >= 2 and raw[0] == '"' and raw[-1] == '"':
+        return codecs.escape_decode(raw[1:-1].encode("utf-8"))[0].decode("utf-8", errors="replace")
+    return raw
+
+
+def _strip_side_prefix(raw: str, prefix: str) -> Optional[str]:
+    path = _unquote_diff_path(raw)
+    if path == "/dev/null":
+        return None
+    return path[len(prefix):] if path.startswith(prefix) else path
+
+
+def _parse_diff_git_line(line: str) -> FileDiffHeader:
+    rest = line[len("diff --git "):]
+    # Unquoted "a/<p> b/<p>" is ambiguous with spaces; it is symmetric unless renamed,
+    # in which case the rename/---/+++ lines that follow supply the real paths.
+    if rest.startswith('"'):
+        end = rest.index('"', 1)
+        old_raw, new_raw = rest[:end + 1], rest[end + 2:]
+    else:
+        half = (len(rest) - 1) // 2
+        if rest[half] == " " and rest[:half][2:] == rest[half + 1:][2:]:
+            old_raw, new_raw = rest[:half], rest[half + 1:]
+        else:
+            old_raw, _, new_raw = rest.partition(" b/")
+            new_raw = "b/" + new_raw
+    return FileDiffHeader(_strip_side_prefix(old_raw, "a/"), _strip_side_prefix(new_raw, "b/"))
+
+
+def iter_diff_hunks(lines: Iterable[Union[bytes, str]]) -> Iterator[Tuple[FileDiffHeader, Optional[Hunk]]]:
+    """
+    Streams a multi-file unified diff (`git diff` output or GitHub's `.diff` media type)
+    given as an iterator of byte or text lines.
+
+    Yields `(file_header, hunk)` as soon as each hunk is complete, so memory stays
+    proportional to one hunk rather than to the whole diff. Files without hunks (binary
+    files, pure renames, mode changes) are yielded once as `(file_header, None)`.
+    """
+    header: Optional[FileDiffHeader] = None
+    builder = HunkBuilder()
+    had_hunk = False
+
+    for raw in lines:
+        line = raw.decode("utf-8", errors="replace") if isinstance(raw, bytes) else raw
+        if line.endswith("\n"):
+            line = line[:-1]
+
+        if line.startswith("diff --git "):
+            if header is not None:
+                hunk = builder.finish()
+                if hunk is not None or not had_hunk:
+                    yield header, hunk
+            header = _parse_diff_git_line(line)
+            builder = HunkBuilder()
+            had_hunk = False
+            continue
+        if header is None:
+            continue
+
+        if builder.hunk is None and not had_hunk and not line.startswith("@@"):
+            # Extended header lines between "diff --git" and the first hunk
+            if line.startswith("--- "):
+                header.old_path = _strip_side_prefix(line[4:], "a/")
+                if header.old_path is None:
+                    header.status = "added"
+            elif line.startswith("+++ "):
+                header.new_path = _strip_side_prefix(line[4:], "b/")
+                if header.new_path is None:
+                    header.status = "removed"
+            elif line.startswith("rename from "):
+                header.old_path = _unquote_diff_path(line[len("rename from "):])
+                header.status = "renamed"
+            elif line.startswith("rename to "):
+                header.new_path = _unquote_diff_path(line[len("rename to "):])
+                header.status = "renamed"
+            elif line.startswith("new file mode"):
+                header.status = "added"
+            elif line.startswith("deleted file mode"):
+                header.status = "removed"
+            elif line.startswith("Binary files ") or line == "GIT binary patch":
+                header.is_binary = True
+            continue
+
+        hunk = builder.feed(line)
+        if hunk is not None:
+            had_hunk = True
+            yield header, hunk
+
+    if header is not None:
+        hunk = builder.finish()
+        if hunk is not None or not had_hunk:
+            yield header, hunk
+
+
+def collect_file_patches(lines: Iterable[Union[bytes, str]],
+                         paths: Optional[Iterable[str]] = None) -> Dict[str, ParsedPatch]:
+    """
+    Parses a multi-file diff stream into one `ParsedPatch` per file, keyed by new path
+    (old path for deletions). With `paths`, only those files' hunks are kept; every
+    other hunk is dropped as soon as it has been parsed.
+    """
+    wanted = set(paths) if paths is not None else None
+    patches: Dict[str, ParsedPatch] = {}
+    for header, hunk in iter_diff_hunks(lines):
+        path = header.path
+        if wanted is not None and path not in wanted:
+            continue
+        patch = patches.get(path)
+        if patch is None:
+            patch = patches[path] = ParsedPatch([])
+        if hunk is not None:
+            patch.hunks.append(hunk)
+    return patches
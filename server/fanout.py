@@ -0,0 +1,228 @@
+import os
+import re
+import posixpath
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from .models import (
+    BugDetectionAgentOutput,
+    CodeQualityAgentOutput,
+    SecurityAgentOutput,
+)
+from .payload_encoding import encode_payload, get_encoder
+from .token_counter import estimate_tokens
+
+# Largest estimated payload (diffs + base context) one level-2 prompt may carry
+FANOUT_GROUP_TOKEN_BUDGET = int(os.getenv("FANOUT_GROUP_TOKEN_BUDGET", "30000"))
+# Most crews one review runs at the same time (llm_executor caps all reviews together)
+FANOUT_MAX_PARALLEL = int(os.getenv("FANOUT_MAX_PARALLEL", "12"))
+# Alignment is not fanned out: it gets the full file list and only the diffs that fit this budget
+ALIGNMENT_DIFF_TOKEN_BUDGET = int(os.getenv("ALIGNMENT_DIFF_TOKEN_BUDGET", "12000"))
+
+# "test_foo", "foo_test", "foo.test", "foo.spec" all relate to "foo"
+_TEST_AFFIXES_RE = re.compile(r"^(test_)|(_test|_tests|\.test|\.spec)$")
+
+
+@dataclass
+class FileUnit:
+    """One changed file of the level-2 payloads (a `pr_files` entry) and its encoded size."""
+    file: str
+    entry: Dict[str, Any]
+    tokens: int
+
+
+@dataclass
+class ReviewGroup:
+    """A set of related files reviewed together in one prompt."""
+    units: List[FileUnit] = field(default_factory=list)
+    tokens: int = 0
+
+    @property
+    def files(self) -> List[str]:
+        return [u.file for u in self.units]
+
+    def add(self, unit: FileUnit):
+        self.units.append(unit)
+        self.tokens += unit.tokens
+
+    def to_inputs(self, encoding: Optional[str] = None) -> Dict[str, str]:
+        """The group's encoded `all_pr_diffs` / `all_original_pr_files`, in PR order."""
+        return encode_payload([u.entry for u in self.units], encoding)
+
+
+def _stem(path: str) -> str:
+    return _TEST_AFFIXES_RE.sub("", posixpath.basename(path).split(".", 1)[0])
+
+
+def _relation_key(path: str, stem_counts: Dict[str, int]) -> Tuple[str, str]:
+    stem = _stem(path)
+    # Files sharing a stem (module + its tests) belong together wherever they live;
+    # everything else is grouped by directory
+    if stem_counts.get(stem, 0) > 1:
+        return "stem", stem
+    return "dir", posixpath.dirname(path)
+
+
+def plan_review_groups(pr_files: List[Dict[str, Any]],
+                       token_budget: int = FANOUT_GROUP_TOKEN_BUDGET,
+                       encoding: Optional[str] = None) -> List[ReviewGroup]:
+    """
+    Splits a PR's files (dicts with file, added, removed and content) into groups whose
+    estimated token size, in the payload `encoding`, fits `token_budget`.
+
+    Related files (same directory, or a module and its tests) are clustered first; the
+    clusters are then bin-packed first-fit-decreasing, and only a cluster that is larger
+    than the budget on its own is split across groups. A single file over the budget
+    gets a group of its own.
+    """
+    encoder = get_encoder(encoding)
+    units = []
+    for index, entry in enumerate(pr_files):
+        tokens = estimate_tokens(encoder.encode_diffs([entry])) + estimate_tokens(encoder.encode_originals([entry]))
+        units.append((index, FileUnit(entry["file"], entry, tokens)))
+
+    stem_counts: Dict[str, int] = {}
+    for _, unit in units:
+        stem = _stem(unit.file)
+        stem_counts[stem] = stem_counts.get(stem, 0) + 1
+    clusters: Dict[Tuple[str, str], List[Tuple[int, FileUnit]]] = {}
+    for index, unit in units:
+        clusters.setdefault(_relation_key(unit.file, stem_counts), []).append((index, unit))
+
+    bins: List[List[Tuple[int, FileUnit]]] = []
+    sizes: List[int] = []
+
+    def place(items: List[Tuple[int, FileUnit]]):
+        size = sum(u.tokens for _, u in items)
+        for i in range(len(bins)):
+            if sizes[i] + size <= token_budget:
+                bins[i].extend(items)
+                sizes[i] += size
+                return
+        bins.append(list(items))
+        sizes.append(size)
+
+    for cluster in sorted(clusters.values(), key=lambda c: -sum(u.tokens for _, u in c)):
+        if sum(u.tokens for _, u in cluster) <= token_budget:
+            place(cluster)
+        else:
+            for item in sorted(cluster, key=lambda item: -item[1].tokens):
+                place([item])
+
+    groups = []
+    for items in bins:
+        group = ReviewGroup()
+        for _, unit in sorted(items, key=lambda item: item[0]):
+            group.add(unit)
+        groups.append(group)
+    # Largest first, so the slowest prompts start earliest
+    return sorted(groups, key=lambda g: -g.tokens)
+
+
+def _changed_line_count(runs: List[Dict[str, Any]]) -> int:
+    return sum(len(run["lines"]) for run in runs)
+
+
+def alignment_inputs(pr_files: List[Dict[str, Any]],
+                     token_budget: int = ALIGNMENT_DIFF_TOKEN_BUDGET,
+                     encoding: Optional[str] = None) -> Dict[str, str]:
+    """
+    The AlignmentAgent's view of the whole PR within `token_budget`: `alignment_pr_files`
+    lists every changed file with its added/removed line counts, and `alignment_pr_diffs`
+    holds the diffs of the files that still fit, smallest first, in the payload `encoding`.
+    Files whose diffs did not fit are marked in the list; the list itself is cut at the budget.
+    """
+    encoder = get_encoder(encoding)
+    listing = [f"{entry['file']} (+{_changed_line_count(entry['added'])}/-{_changed_line_count(entry['removed'])})"
+               for entry in pr_files]
+    remaining = token_budget - estimate_tokens("\n".join(listing))
+
+    sizes = [estimate_tokens(encoder.encode_diffs([entry])) for entry in pr_files]
+    included = set()
+    for index in sorted(range(len(pr_files)), key=lambda i: sizes[i]):
+        if sizes[index] > remaining:
+            break
+        included.add(index)
+        remaining -= sizes[index]
+
+    listing = [line if index in included else f"{line} [diff not shown]" for index, line in enumerate(listing)]
+    # Even the list is cut short on PRs with thousands of files
+    shown, listed_tokens = [], 0
+    for line in listing:
+        listed_tokens += estimate_tokens(line)
+        if listed_tokens > token_budget:
+            shown.append(f"…and {len(listing) - len(shown)} more files")
+            break
+        shown.append(line)
+    return {
+        "alignment_pr_files": "\n".join(shown) or "None.",
+        "alignment_pr_diffs": encoder.encode_diffs([entry for index, entry in enumerate(pr_files) if index in included]),
+    }
+
+
+# --- Reduce: merging per-group outputs into one result per agent ---
+# With no groups at all (every file triaged out) the merges return a "nothing to review" result.
+NOTHING_TO_REVIEW = "No reviewable code changes: every changed file was left out by triage."
+
+def _dedupe(findings: List[Any], key) -> List[Any]:
+    seen = set()
+    merged = []
+    for finding in findings:
+        k = key(finding)
+        if k not in seen:
+            seen.add(k)
+            merged.append(finding)
+    return merged
+
+
+def _join_summaries(parts: List[Optional[str]]) -> Optional[str]:
+    parts = list(dict.fromkeys(p.strip() for p in parts if p and p.strip()))
+    if not parts:
+        return None
+    return parts[0] if len(parts) == 1 else "\n\n".join(parts)
+
+
+def merge_bug_outputs(outputs: List[BugDetectionAgentOutput]) -> BugDetectionAgentOutput:
+    if not outputs:
+        return BugDetectionAgentOutput(has_bugs=False, findings=[], overall_assessment=NOTHING_TO_REVIEW)
+    if len(outputs) == 1:
+        return outputs[0]
+    findings = _dedupe([f for o in outputs for f in o.findings],
+                       lambda f: (f.file, tuple(f.line_numbers), f.description))
+    return BugDetectionAgentOutput(
+        has_bugs=any(o.has_bugs for o in outputs) or bool(findings),
+        findings=findings,
+        overall_assessment=_join_summaries([o.overall_assessment for o in outputs]),
+    )
+
+
+def merge_code_quality_outputs(outputs: List[CodeQualityAgentOutput],
+                               weights: Optional[List[int]] = None) -> CodeQualityAgentOutput:
+    if not outputs:
+        return CodeQualityAgentOutput(code_quality_score=100, suggestions=[], summary_comment=NOTHING_TO_REVIEW)
+    if len(outputs) == 1:
+        return outputs[0]
+    weights = weights or [1] * len(outputs)
+    # Score weighted by how much of the PR each group covered
+    score = round(sum(o.code_quality_score * w for o, w in zip(outputs, weights)) / max(1, sum(weights)))
+    suggestions = _dedupe([s for o in outputs for s in o.suggestions],
+                          lambda s: (s.file, tuple(s.line_numbers), s.description))
+    return CodeQualityAgentOutput(
+        code_quality_score=score,
+        suggestions=suggestions,
+        summary_comment=_join_summaries([o.summary_comment for o in outputs]) or "",
+    )
+
+
+def merge_security_outputs(outputs: List[SecurityAgentOutput]) -> SecurityAgentOutput:
+    if not outputs:
+        return SecurityAgentOutput(has_security_vulnerabilities=False, findings=[], overall_security_assessment=NOTHING_TO_REVIEW)
+    if len(outputs) == 1:
+        return outputs[0]
+    findings = _dedupe([f for o in outputs for f in o.findings],
+                       lambda f: (f.file, tuple(f.line_numbers), f.title))
+    return SecurityAgentOutput(
+        has_security_vulnerabilities=any(o.has_security_vulnerabilities for o in outputs) or bool(findings),
+        findings=findings,
+        overall_security_assessment=_join_summaries([o.overall_security_assessment for o in outputs]),
+    )
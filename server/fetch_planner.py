@@ -0,0 +1,58 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from .diff_parser import ParsedPatch
+
+# Plan actions
+FETCH = "fetch"            # download the base content from `base_path`
+FROM_PATCH = "from_patch"  # rebuild it from the patch (deleted files: the patch holds every line)
+SKIP = "skip"              # no base content is needed
+
+
+@dataclass
+class BaseFetchPlan:
+    action: str
+    base_path: Optional[str]
+    reason: str
+
+
+def plan_base_fetch(file_info: Dict[str, Any], parsed: Optional[ParsedPatch]) -> BaseFetchPlan:
+    """
+    Decides from a files-API record (`filename`, `status`, `previous_filename`, `changes`)
+    and its parsed patch whether the file's base content is needed, and from which path.
+    """
+    filename = file_info["filename"]
+    status = file_info.get("status", "modified")
+    if status == "added":
+        return BaseFetchPlan(SKIP, None, "new file, no base version")
+    if status == "removed":
+        if parsed is not None and patch_holds_whole_base(parsed):
+            return BaseFetchPlan(FROM_PATCH, filename, "deleted file, content is in the patch")
+        return BaseFetchPlan(FETCH, filename, "deleted file without a complete patch")
+    if status in ("renamed", "copied") and file_info.get("previous_filename"):
+        return BaseFetchPlan(FETCH, file_info["previous_filename"], f"{status} from {file_info['previous_filename']}")
+    if not file_info.get("changes", 1):
+        return BaseFetchPlan(SKIP, filename, "no line changes")
+    return BaseFetchPlan(FETCH, filename, status)
+
+
+def patch_holds_whole_base(parsed: ParsedPatch) -> bool:
+    """Whether the patch removes every line of the base file (one hunk starting at line 1)."""
+    if len(parsed.hunks) != 1:
+        return False
+    hunk = parsed.hunks[0]
+    removed = sum(run.count for run in hunk.removed)
+    return hunk.old_start == 1 and hunk.new_count == 0 and removed == hunk.old_count
+
+
+def content_from_patch(parsed: ParsedPatch) -> str:
+    """The base content of a deleted file, rebuilt from its removed lines."""
+    lines: List[str] = [line for run in parsed.removed_runs() for line in run.code_lines]
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def summarize_plans(plans: List[BaseFetchPlan]) -> str:
+    counts = {FETCH: 0, FROM_PATCH: 0, SKIP: 0}
+    for plan in plans:
+        counts[plan.action] += 1
+    return f"{counts[FETCH]} to download, {counts[FROM_PATCH]} rebuilt from patches, {counts[SKIP]} not needed"
@@ -0,0 +1,200 @@
+import os
+import base64
+import subprocess
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+GIT_MIRROR_DIR = os.getenv("GIT_MIRROR_DIR", os.path.join(os.path.expanduser("~"), ".cache", "codesense", "mirrors"))
+# Where mirrors are fetched from; a local path template makes it usable against local repositories.
+GIT_MIRROR_REMOTE_TEMPLATE = os.getenv("GIT_MIRROR_REMOTE_TEMPLATE", "https://github.com/{owner}/{repo}.git")
+GIT_FETCH_TIMEOUT = float(os.getenv("GIT_FETCH_TIMEOUT", "600"))
+
+# `git diff --name-status` letters -> GitHub file `status` values
+_STATUS_NAMES = {
+    "A": "added",
+    "M": "modified",
+    "D": "removed",
+    "R": "renamed",
+    "C": "copied",
+    "T": "changed",
+}
+
+
+class GitMirrorError(Exception):
+    pass
+
+
+class GitMirror:
+    """
+    A local bare mirror of one repository, updated incrementally with `git fetch`.
+
+    All reads (diffs, trees, blobs) are served from the local object store, so a review
+    costs one fetch instead of one API request per file.
+    """
+
+    _locks: Dict[str, threading.Lock] = {}
+    _locks_guard = threading.Lock()
+
+    def __init__(self, repo_owner: str, repo_name: str, token: Optional[str] = None,
+                 remote_url: Optional[str] = None, directory: Optional[str] = None):
+        self.repo_full_name = f"{repo_owner}/{repo_name}"
+        self.remote_url = remote_url or GIT_MIRROR_REMOTE_TEMPLATE.format(owner=repo_owner, repo=repo_name)
+        self.token = token
+        self.path = os.path.join(directory or GIT_MIRROR_DIR, repo_owner, f"{repo_name}.git")
+        with GitMirror._locks_guard:
+            self._lock = GitMirror._locks.setdefault(self.path, threading.Lock())
+
+    # --- plumbing ---
+    def _git(self, *args: str, input: Optional[bytes] = None, timeout: Optional[float] = None,
+             auth: bool = False) -> bytes:
+        command = ["git"]
+        if auth and self.token and self.remote_url.startswith("http"):
+            # Passed per command so the token is never written to the mirror's config
+            credentials = base64.b64encode(f"x-access-token:{self.token}".encode()).decode()
+            command += ["-c", f"http.extraHeader=Authorization: Basic {credentials}"]
+        command += ["--git-dir", self.path, *args]
+        result = subprocess.run(command, input=input, capture_output=True, timeout=timeout)
+        if result.returncode != 0:
+            raise GitMirrorError(f"git {args[0]} failed for {self.repo_full_name}: {result.stderr.decode(errors='replace').strip()}")
+        return result.stdout
+
+    def _has_commit(self, sha: str) -> bool:
+        try:
+            self._git("cat-file", "-e", f"{sha}^{{commit}}")
+            return True
+        except GitMirrorError:
+            return False
+
+    def ensure(self):
+        if not os.path.isdir(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            subprocess.run(["git", "init", "--quiet", "--bare", self.path], check=True, capture_output=True)
+        self._git("config", "remote.origin.url", self.remote_url)
+
+    def fetch(self, refspecs: Iterable[str]):
+        self._git("fetch", "--quiet", "--no-tags", "origin", *refspecs, timeout=GIT_FETCH_TIMEOUT, auth=True)
+
+    def fetch_pull_request(self, pr_number: int, base_ref: str, base_sha: Optional[str] = None,
+                           head_sha: Optional[str] = None) -> Tuple[str, str]:
+        """
+        Brings the mirror up to date with the PR head and its base branch.
+        Returns the (base_sha, head_sha) pair to diff; nothing is fetched if both are present.
+        """
+        head_local_ref = f"refs/pull/{pr_number}/head"
+        base_local_ref = f"refs/remotes/origin/{base_ref}"
+        with self._lock:
+            self.ensure()
+            if not (base_sha and head_sha and self._has_commit(base_sha) and self._has_commit(head_sha)):
+                self.fetch([f"+refs/pull/{pr_number}/head:{head_local_ref}",
+                            f"+refs/heads/{base_ref}:{base_local_ref}"])
+                if base_sha and not self._has_commit(base_sha):
+                    # The base branch moved away from the PR's base commit; fetch it directly
+                    self.fetch([base_sha])
+        return (base_sha or self.rev_parse(base_local_ref), head_sha or self.rev_parse(head_local_ref))
+
+    # --- reads ---
+    def rev_parse(self, rev: str) -> str:
+        return self._git("rev-parse", "--verify", rev).decode().strip()
+
+    def merge_base(self, base: str, head: str) -> str:
+        return self._git("merge-base", base, head).decode().strip()
+
+    def changed_files(self, base: str, head: str) -> List[Dict[str, Optional[str]]]:
+        """
+        Lists the files changed between `base` and `head`, in GitHub's files-API shape
+        (`filename`, `status`, `previous_filename`).
+        """
+        out = self._git("diff", "--name-status", "-z", "-M", base, head).decode("utf-8", errors="replace")
+        fields = out.split("\0")
+        files = []
+        i = 0
+        while i < len(fields) and fields[i]:
+            letter = fields[i][0]
+            if letter in ("R", "C"):
+                files.append({"status": _STATUS_NAMES[letter], "previous_filename": fields[i + 1], "filename": fields[i + 2]})
+                i += 3
+            else:
+                files.append({"status": _STATUS_NAMES.get(letter, "modified"), "previous_filename": None, "filename": fields[i + 1]})
+                i += 2
+        return files
+
+    def iter_diff_lines(self, base: str, head: str) -> Iterator[bytes]:
+        """
+        Streams `git diff base head` as byte lines, read from the process as it writes them.
+        """
+        process = subprocess.Popen(
+            ["git", "--git-dir", self.path, "diff", "--no-color", "--no-ext-diff", "-M", base, head],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+        try:
+            for line in process.stdout:
+                yield line
+            process.stdout.close()
+            stderr = process.stderr.read()
+            if process.wait() != 0:
+                raise GitMirrorError(f"git diff failed for {self.repo_full_name}: {stderr.decode(errors='replace').strip()}")
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+            process.stderr.close()
+
+    def list_tree(self, commit: str) -> Tuple[str, Dict[str, str]]:
+        """
+        Returns the tree SHA of `commit` and a path -> blob SHA map of every file in it.
+        """
+        tree_sha = self.rev_parse(f"{commit}^{{tree}}")
+        blobs = {}
+        for entry in self._git("ls-tree", "-r", "-z", "--full-tree", commit).decode("utf-8", errors="replace").split("\0"):
+            if not entry:
+                continue
+            meta, path = entry.split("\t", 1)
+            _, kind, sha = meta.split(" ")
+            if kind == "blob":
+                blobs[path] = sha
+        return tree_sha, blobs
+
+    def blob_sizes(self, shas: Iterable[str]) -> Dict[str, int]:
+        """
+        Sizes of many blobs with a single `git cat-file --batch-check` process, without reading them.
+        """
+        shas = list(dict.fromkeys(shas))
+        if not shas:
+            return {}
+        sizes = {}
+        for line in self._git("cat-file", "--batch-check", input=("\n".join(shas) + "\n").encode()).decode().splitlines():
+            parts = line.split(" ")
+            if len(parts) == 3:
+                sizes[parts[0]] = int(parts[2])
+        return sizes
+
+    def read_blobs(self, shas: Iterable[str]) -> Dict[str, bytes]:
+        """
+        Reads many blobs with a single `git cat-file --batch` process.
+        """
+        shas = list(dict.fromkeys(shas))
+        if not shas:
+            return {}
+        out = self._git("cat-file", "--batch", input=("\n".join(shas) + "\n").encode())
+        blobs = {}
+        pos = 0
+        for sha in shas:
+            header_end = out.index(b"\n", pos)
+            header = out[pos:header_end].decode().split(" ")
+            pos = header_end + 1
+            if len(header) < 3 or header[1] == "missing":
+                continue
+            size = int(header[2])
+            blobs[sha] = out[pos:pos + size]
+            pos += size + 1  # content is followed by a newline
+        return blobs
+
+
+def find_readme_path(paths: Iterable[str]) -> Optional[str]:
+    """
+    Picks the root-level README the way GitHub does, preferring README.md.
+    """
+    candidates = sorted((p for p in paths if "/" not in p and p.lower().startswith("readme")),
+                        key=lambda p: (p.lower() != "readme.md", p.lower()))
+    return candidates[0] if candidates else None
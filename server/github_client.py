@@ -0,0 +1,148 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from github import Github, Auth
+
+from .github_http import GITHUB_API, HTTP_POOL_SIZE, HTTP_TIMEOUT
+from .rate_limiter import get_request_scheduler
+
+# How long Repository / PullRequest handles are reused before being looked up again
+GITHUB_HANDLE_TTL = float(os.getenv("GITHUB_HANDLE_TTL", "300"))
+# Most handles kept at once; the least recently used are dropped first
+GITHUB_HANDLE_CACHE_SIZE = int(os.getenv("GITHUB_HANDLE_CACHE_SIZE", "256"))
+# PyGithub spaces requests of one client by this many seconds (its default is 0.25s,
+# which would serialize every review sharing the client)
+GITHUB_CLIENT_REQUEST_INTERVAL = float(os.getenv("GITHUB_CLIENT_REQUEST_INTERVAL", "0.05"))
+
+_clients: Dict[Optional[str], Github] = {}
+_clients_lock = threading.Lock()
+
+
+def get_github_client(token: Optional[str] = None) -> Github:
+    """
+    Returns the process-wide PyGithub client for `token` (by default the pool's best token).
+    Clients are created once and keep their pooled keep-alive connections warm.
+    """
+    token = token or get_request_scheduler().best_token()
+    client = _clients.get(token)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(token)
+            if client is None:
+                client = Github(
+                    auth=Auth.Token(token) if token else None,
+                    base_url=GITHUB_API,
+                    timeout=int(HTTP_TIMEOUT),
+                    per_page=100,
+                    pool_size=HTTP_POOL_SIZE,
+                    seconds_between_requests=GITHUB_CLIENT_REQUEST_INTERVAL,
+                )
+                _clients[token] = client
+    return client
+
+
+class HandleCache:
+    """
+    Small TTL + LRU cache for PyGithub objects. Concurrent lookups of the same key share
+    a single API call; the per-key lock is dropped once no lookup of the key is waiting.
+    """
+
+    def __init__(self, ttl_seconds: float = GITHUB_HANDLE_TTL, max_entries: int = GITHUB_HANDLE_CACHE_SIZE):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()  # key -> (expires_at, value), oldest first
+        self._key_locks: Dict[Tuple, Tuple[threading.Lock, int]] = {}  # key -> (lock, lookups holding it)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _lookup_locked(self, key: Tuple) -> Tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        if entry[0] <= time.monotonic():
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return True, entry[1]
+
+    def get_or_load(self, key: Tuple, load: Callable[[], Any]) -> Any:
+        with self._lock:
+            found, value = self._lookup_locked(key)
+            if found:
+                return value
+            key_lock, users = self._key_locks.get(key, (None, 0))
+            key_lock = key_lock or threading.Lock()
+            self._key_locks[key] = (key_lock, users + 1)
+        try:
+            with key_lock:
+                with self._lock:
+                    found, value = self._lookup_locked(key)
+                    if found:
+                        return value
+                    self.misses += 1
+                value = load()
+                with self._lock:
+                    self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                        self.evictions += 1
+                return value
+        finally:
+            with self._lock:
+                key_lock, users = self._key_locks[key]
+                if users > 1:
+                    self._key_locks[key] = (key_lock, users - 1)
+                else:
+                    del self._key_locks[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+
+_handles = HandleCache()
+
+
+def get_repository(repo_full_name: str, token: Optional[str] = None):
+    """
+    Returns a (cached) PyGithub Repository handle.
+    """
+    return _handles.get_or_load(
+        ("repo", repo_full_name, token),
+        lambda: get_github_client(token).get_repo(repo_full_name),
+    )
+
+
+def get_pull_request(repo_full_name: str, pr_number: int, token: Optional[str] = None):
+    """
+    Returns a (cached) PyGithub PullRequest handle.
+    """
+    return _handles.get_or_load(
+        ("pull", repo_full_name, pr_number, token),
+        lambda: get_repository(repo_full_name, token).get_pull(pr_number),
+    )
+
+
+def clear_handle_cache():
+    _handles.clear()
+
+
+def handle_cache_stats() -> Dict[str, Any]:
+    return {**_handles.stats(), "clients": len(_clients)}
@@ -0,0 +1,240 @@
+import os
+import base64
+import queue
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, Iterator, List, Optional
+
+from .http_cache import get_http_cache
+from .rate_limiter import get_request_scheduler, GITHUB_RATE_LIMIT_MAX_RETRIES
+
+GITHUB_API = "https://api.github.com"
+
+# Connection pool sizing for the shared session. Every ingestion thread borrows a
+# connection from this pool, so it should be at least as large as the number of
+# concurrent GitHub calls we expect across all in-flight reviews.
+HTTP_POOL_SIZE = int(os.getenv("GITHUB_HTTP_POOL_SIZE", "32"))
+HTTP_TIMEOUT = float(os.getenv("GITHUB_HTTP_TIMEOUT", "30"))
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """
+    Returns the process-wide keep-alive session used for all GitHub REST calls.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update({"Accept": "application/vnd.github+json"})
+                _session = session
+    return _session
+
+
+def close_http_session():
+    """
+    Closes the shared session and its pooled connections (called on app shutdown).
+    """
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def build_headers(token: Optional[str] = None, extra: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    headers = {}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    if extra:
+        headers.update(extra)
+    return headers
+
+
+def github_get(url: str, token: Optional[str] = None, params: Optional[Dict[str, Any]] = None,
+               headers: Optional[Dict[str, str]] = None, stream: bool = False,
+               use_cache: bool = True) -> requests.Response:
+    """
+    Performs a GET against the GitHub API through the shared session.
+    Non-streaming requests are revalidated against the conditional-request cache:
+    a 304 answer is served from disk and does not count against the rate limit.
+    Tokens are assigned and paced by the rate-limit-aware request scheduler.
+    Raises for HTTP errors, like the plain `requests.get(...).raise_for_status()` calls it replaces.
+    """
+    cache = get_http_cache() if use_cache and not stream else None
+    cache_key = cached = None
+    conditional_headers = {}
+    if cache is not None:
+        accept = (headers or {}).get("Accept", get_http_session().headers.get("Accept"))
+        cache_key = cache.make_key(url, params, accept)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            if cached.etag:
+                conditional_headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                conditional_headers["If-Modified-Since"] = cached.last_modified
+
+    # Calls without a token (or with a pooled one) may use any token of the pool;
+    # a rate-limited answer only retries this one request, on the next best token.
+    scheduler = get_request_scheduler()
+    pinned_token = None if scheduler.in_pool(token) else token
+    for attempt in range(GITHUB_RATE_LIMIT_MAX_RETRIES + 1):
+        request_token = scheduler.acquire(pinned_token)
+        response = get_http_session().get(
+            url,
+            headers=build_headers(request_token, {**(headers or {}), **conditional_headers}),
+            params=params,
+            timeout=HTTP_TIMEOUT,
+            stream=stream,
+        )
+        scheduler.update(request_token, response)
+        if not scheduler.is_rate_limited(response) or attempt == GITHUB_RATE_LIMIT_MAX_RETRIES:
+            break
+        scheduler.penalize(request_token, response)
+        response.close()
+        print(f"⚠️ GitHub API rate limit reached for {url}; retrying on another token or after the window resets")
+
+    if cache is not None:
+        if response.status_code == 304 and cached is not None:
+            cache.record(hit=True)
+            cache.touch(cache_key)
+            return cached.to_response()
+        cache.record(hit=False)
+        if response.status_code == 200:
+            cache.put(cache_key, response)
+
+    response.raise_for_status()
+    return response
+
+
+def fetch_git_blob(repo_owner: str, repo_name: str, blob_sha: str, token: Optional[str] = None) -> bytes:
+    """
+    Downloads the raw bytes of a git blob.
+    Blobs are immutable and cached by the blob store, so HTTP revalidation is skipped.
+    """
+    blob = github_get(f"{GITHUB_API}/repos/{repo_owner}/{repo_name}/git/blobs/{blob_sha}",
+                      token=token, use_cache=False).json()
+    if blob.get("encoding") != "base64":
+        raise ValueError(f"Unsupported blob encoding '{blob.get('encoding')}'")
+    return base64.b64decode(blob.get("content", ""))
+
+
+# Media type of the raw unified diff of a pull request
+GITHUB_DIFF_MEDIA_TYPE = "application/vnd.github.v3.diff"
+DIFF_STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def iter_pr_diff_lines(repo_owner: str, repo_name: str, pr_number: int,
+                       token: Optional[str] = None) -> Iterator[bytes]:
+    """
+    Streams the raw `.diff` of a pull request as byte lines (without the trailing newline).
+    Unlike the files API, the diff media type includes the patches of large files; the
+    response body is read incrementally and never held in memory as a whole.
+    """
+    return iter_diff_lines(f"{GITHUB_API}/repos/{repo_owner}/{repo_name}/pulls/{pr_number}", token)
+
+
+def iter_compare_diff_lines(repo_owner: str, repo_name: str, base: str, head: str,
+                            token: Optional[str] = None) -> Iterator[bytes]:
+    """Streams the raw `.diff` of `base...head` like `iter_pr_diff_lines`."""
+    return iter_diff_lines(f"{GITHUB_API}/repos/{repo_owner}/{repo_name}/compare/{base}...{head}", token)
+
+
+def iter_diff_lines(url: str, token: Optional[str] = None) -> Iterator[bytes]:
+    response = github_get(url, token=token, headers={"Accept": GITHUB_DIFF_MEDIA_TYPE}, stream=True)
+    try:
+        # Split on "\n" only ("\r" may be part of a CRLF file's content); requests'
+        # `iter_lines(delimiter=...)` is not used because it emits spurious empty lines
+        # when a chunk ends on the delimiter.
+        pending = b""
+        for chunk in response.iter_content(chunk_size=DIFF_STREAM_CHUNK_SIZE):
+            lines = (pending + chunk).split(b"\n")
+            pending = lines.pop()
+            yield from lines
+        if pending:
+            yield pending
+    finally:
+        response.close()
+
+
+# Sentinel the page producer puts on the queue once there is nothing left to read.
+_END_OF_PAGES = object()
+
+
+def iter_github_items(url: str, token: Optional[str] = None, params: Optional[Dict[str, Any]] = None,
+                      per_page: int = 100, max_items: Optional[int] = None,
+                      max_bytes: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Streams the records of a paginated GitHub list endpoint, following `Link: rel="next"`.
+
+    Pages are downloaded on a background thread one page ahead of the consumer, so the
+    caller can process page 1 while page 2 is in flight. Only one page is buffered.
+    `max_items` caps the number of records yielded; `max_bytes` stops requesting further
+    pages once that many response-body bytes have been read.
+    """
+    pages: "queue.Queue[Any]" = queue.Queue(maxsize=1)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        next_url: Optional[str] = url
+        next_params: Optional[Dict[str, Any]] = {**(params or {}), "per_page": per_page}
+        read_bytes = 0
+        try:
+            while next_url and not stop.is_set():
+                response = github_get(next_url, token=token, params=next_params)
+                read_bytes += len(response.content)
+                # The "next" link already carries the query string
+                next_url = response.links.get("next", {}).get("url")
+                next_params = None
+                if next_url and max_bytes is not None and read_bytes >= max_bytes:
+                    print(f"⚠️ Stopped paginating {url} after {read_bytes} bytes (limit {max_bytes}); results are truncated.")
+                    next_url = None
+                if not put(response.json()):
+                    return
+        except Exception as e:
+            put(e)
+            return
+        put(_END_OF_PAGES)
+
+    producer = threading.Thread(target=produce, name="github-pages", daemon=True)
+    producer.start()
+
+    yielded = 0
+    try:
+        while True:
+            page = pages.get()
+            if page is _END_OF_PAGES:
+                return
+            if isinstance(page, Exception):
+                raise page
+            for item in page:
+                if max_items is not None and yielded >= max_items:
+                    print(f"⚠️ Stopped reading {url} after {max_items} records; results are truncated.")
+                    return
+                yielded += 1
+                yield item
+    finally:
+        stop.set()
+
+
+def fetch_all_github_items(url: str, token: Optional[str] = None, **kwargs) -> List[Dict[str, Any]]:
+    """
+    Convenience wrapper collecting every page of `iter_github_items` into a list.
+    """
+    return list(iter_github_items(url, token=token, **kwargs))
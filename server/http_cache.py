@@ -0,0 +1,206 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+HTTP_CACHE_ENABLED = os.getenv("HTTP_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "codesense", "http"))
+HTTP_CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Response headers worth replaying on a revalidated hit (Link drives pagination)
+_KEPT_HEADERS = ("ETag", "Last-Modified", "Link", "Content-Type")
+
+
+@dataclass
+class CachedResponse:
+    url: str
+    body: bytes
+    headers: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def etag(self) -> Optional[str]:
+        return self.headers.get("ETag")
+
+    @property
+    def last_modified(self) -> Optional[str]:
+        return self.headers.get("Last-Modified")
+
+    def to_response(self) -> requests.Response:
+        """
+        Rebuilds a `requests.Response` equivalent to the original 200 answer.
+        """
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.url = self.url
+        response.headers = CaseInsensitiveDict(self.headers)
+        response._content = self.body
+        response.encoding = "utf-8"
+        return response
+
+
+class ConditionalHTTPCache:
+    """
+    On-disk cache of GitHub GET responses revalidated with ETag / Last-Modified.
+
+    Each entry is stored as `<key>.json` (URL and headers) plus `<key>.body`. A hit is only
+    served after GitHub confirms it with a 304, which does not count against the rate limit.
+    Total body size is bounded by `max_bytes`; the least recently used entries are evicted.
+    """
+
+    def __init__(self, directory: str = HTTP_CACHE_DIR, max_bytes: int = HTTP_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index: "OrderedDict[str, int]" = OrderedDict()  # key -> body size, oldest first
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".body"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, name[:-len(".body")], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total_bytes += size
+
+    @staticmethod
+    def make_key(url: str, params: Optional[Dict[str, Any]] = None, accept: Optional[str] = None) -> str:
+        raw = json.dumps([url, sorted((params or {}).items()), accept or ""], default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _paths(self, key: str):
+        base = os.path.join(self.directory, key)
+        return base + ".json", base + ".body"
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        meta_path, body_path = self._paths(key)
+        with self._lock:
+            if key not in self._index:
+                return None
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                body = f.read()
+        except (OSError, ValueError):
+            self._remove(key)
+            return None
+        return CachedResponse(url=meta["url"], body=body, headers=meta.get("headers", {}))
+
+    def put(self, key: str, response: requests.Response):
+        headers = {name: response.headers[name] for name in _KEPT_HEADERS if name in response.headers}
+        if "ETag" not in headers and "Last-Modified" not in headers:
+            return  # Nothing to revalidate with
+        body = response.content
+        if len(body) > self.max_bytes:
+            return
+        meta_path, body_path = self._paths(key)
+        try:
+            for path, data, mode in ((body_path, body, "wb"),
+                                     (meta_path, json.dumps({"url": response.url, "headers": headers}), "w")):
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, mode, **({} if mode == "wb" else {"encoding": "utf-8"})) as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Warning: Could not write HTTP cache entry for {response.url}: {e}")
+            return
+        with self._lock:
+            self._total_bytes -= self._index.pop(key, 0)
+            self._index[key] = len(body)
+            self._total_bytes += len(body)
+            self.stores += 1
+            evicted = self._evict_locked()
+        for old_key in evicted:
+            self._delete_files(old_key)
+
+    def touch(self, key: str):
+        """
+        Marks an entry as most recently used.
+        """
+        with self._lock:
+            if key in self._index:
+                self._index.move_to_end(key)
+        try:
+            os.utime(self._paths(key)[1])
+        except OSError:
+            pass
+
+    def _evict_locked(self):
+        evicted = []
+        while self._total_bytes > self.max_bytes and self._index:
+            old_key, size = self._index.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            evicted.append(old_key)
+        return evicted
+
+    def _remove(self, key: str):
+        with self._lock:
+            self._total_bytes -= self._index.pop(key, 0)
+        self._delete_files(key)
+
+    def _delete_files(self, key: str):
+        for path in self._paths(key):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def record(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "entries": len(self._index),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+_cache: Optional[ConditionalHTTPCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_http_cache() -> Optional[ConditionalHTTPCache]:
+    """
+    Returns the process-wide response cache, or None when HTTP_CACHE_ENABLED is off.
+    """
+    global _cache
+    if not HTTP_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ConditionalHTTPCache()
+    return _cache
@@ -0,0 +1,97 @@
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from .models import BugDetectionAgentOutput, CodeQualityAgentOutput, SecurityAgentOutput
+from .result_cache import ResultCache
+
+REVIEW_STATE_TTL = float(os.getenv("REVIEW_STATE_TTL", str(30 * 24 * 3600)))
+
+
+# --- Stored state: the last reviewed head of a PR and its parsed findings ---
+_store: Optional[ResultCache] = None
+_store_lock = threading.Lock()
+
+
+def get_review_state_store() -> ResultCache:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ResultCache("review_state", ttl_seconds=REVIEW_STATE_TTL)
+    return _store
+
+
+def load_review_state(repo_full_name: str, pr_number: int) -> Optional[Dict[str, Any]]:
+    return get_review_state_store().get(repo_full_name, str(pr_number))
+
+
+def save_review_state(repo_full_name: str, pr_number: int, state: Dict[str, Any]):
+    """
+    `state` holds head_sha, review_fingerprint (models + prompts), pr_message, reviewed_lines
+    and the model dumps of repo_context, code_quality, bug_detection, security and alignment.
+    """
+    get_review_state_store().put(repo_full_name, str(pr_number), state)
+
+
+# --- Carrying findings forward across a push ---
+def map_line(line: int, file_change: Dict[str, Any]) -> Optional[int]:
+    """
+    Maps a line number of the file before a push to its number after it, using the push's
+    added/removed chunks. Returns None when the line was removed or rewritten.
+    """
+    removed = {n for run in file_change["removed"] for n in run["lines"]}
+    if line in removed:
+        return None
+    # `line` is the u-th line the push left untouched; find the u-th untouched line after it
+    untouched = line - sum(1 for n in removed if n < line)
+    new_line = untouched
+    for run in sorted(file_change["added"], key=lambda r: r["lines"][0] if r["lines"] else 0):
+        if run["lines"] and run["lines"][0] <= new_line:
+            new_line += len(run["lines"])
+        else:
+            break
+    return new_line
+
+
+def carry_forward(findings: List[Any], push_changes: Dict[str, Dict[str, Any]]) -> List[Any]:
+    """
+    Moves findings of the previous head (pydantic models with `file` and `line_numbers`)
+    to the new head: renamed files follow, line numbers shift with the push, and findings
+    on deleted files or on lines the push rewrote are dropped, since the new review of the
+    push covers those lines. `push_changes` maps each pushed file's previous path to its
+    file change.
+    """
+    carried = []
+    for finding in findings:
+        change = push_changes.get(finding.file)
+        if change is None:
+            carried.append(finding)
+            continue
+        if change["status"] == "removed":
+            continue
+        if not change["added"] and not change["removed"] and (change.get("additions") or change.get("deletions")):
+            continue  # Changed, but without hunks to map through (triaged out before parsing)
+        lines = [map_line(n, change) for n in finding.line_numbers]
+        if any(n is None for n in lines):
+            continue
+        carried.append(finding.model_copy(update={"file": change["file"], "line_numbers": lines}))
+    return carried
+
+
+def push_changes_by_previous_path(file_changes: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    return {fc.get("previous_file") or fc["file"]: fc for fc in file_changes}
+
+
+def carry_forward_bug_output(output: BugDetectionAgentOutput, push_changes: Dict[str, Dict[str, Any]]) -> BugDetectionAgentOutput:
+    findings = carry_forward(output.findings, push_changes)
+    return output.model_copy(update={"findings": findings, "has_bugs": bool(findings)})
+
+
+def carry_forward_code_quality_output(output: CodeQualityAgentOutput, push_changes: Dict[str, Dict[str, Any]]) -> CodeQualityAgentOutput:
+    return output.model_copy(update={"suggestions": carry_forward(output.suggestions, push_changes)})
+
+
+def carry_forward_security_output(output: SecurityAgentOutput, push_changes: Dict[str, Dict[str, Any]]) -> SecurityAgentOutput:
+    findings = carry_forward(output.findings, push_changes)
+    return output.model_copy(update={"findings": findings, "has_security_vulnerabilities": bool(findings)})
@@ -0,0 +1,235 @@
+import os
+import time
+import uuid
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .utils import parse_github_pr_url, fetch_pr_metadata_async
+from .controller import run_pr_review_crew
+from .report_cache import get_report_cache, report_cache_key_for
+
+# Reviews run at the same time by the background workers; further jobs wait in the queue
+REVIEW_JOB_WORKERS = int(os.getenv("REVIEW_JOB_WORKERS", "4"))
+# How long a finished job (and its report) stays retrievable
+REVIEW_JOB_TTL = float(os.getenv("REVIEW_JOB_TTL", "3600"))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+@dataclass
+class ReviewJob:
+    """One review of a PR at a given head commit, shared by every submission for it."""
+    id: str
+    pr_url: str
+    key: str
+    head_sha: Optional[str] = None
+    # The PR object the job was keyed on; the review reads the same head and base commits
+    pr_data: Optional[Dict[str, Any]] = field(default=None, repr=False)
+    status: str = QUEUED
+    submissions: int = 1
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    # Review only what was pushed since the PR's last review
+    incremental: bool = False
+    # Served from the report cache without running the crews
+    cached: bool = False
+    # Where the report is cached once the review succeeds (None: not cached)
+    cache_group: Optional[str] = field(default=None, repr=False)
+    cache_key: Optional[str] = field(default=None, repr=False)
+    # (stage, data) progress events of the run, replayed to every subscriber
+    events: List[Tuple[str, Dict[str, Any]]] = field(default_factory=list, repr=False)
+    _done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+    _changed: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+    async def wait(self):
+        await self._done.wait()
+
+    def publish(self, stage: str, data: Dict[str, Any]):
+        self.events.append((stage, data))
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def subscribe(self) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Yields every event of the job, past ones first, until it finishes."""
+        sent = 0
+        while True:
+            changed = self._changed
+            while sent < len(self.events):
+                yield self.events[sent]
+                sent += 1
+            if self.finished:
+                return
+            await changed.wait()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "pr_url": self.pr_url,
+            "key": self.key,
+            "status": self.status,
+            "submissions": self.submissions,
+            "incremental": self.incremental,
+            "cached": self.cached,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+        }
+
+
+def review_job_key(owner: str, repo: str, pr_number: int, head_sha: str, incremental: bool = False) -> str:
+    """Single-flight key of a review: owner/repo#n@head, plus "+incremental" for a review of only the latest push."""
+    key = f"{owner}/{repo}#{pr_number}@{head_sha}"
+    return f"{key}+incremental" if incremental else key
+
+
+class ReviewJobManager:
+    """
+    Runs reviews on a fixed number of background workers and coalesces submissions:
+    while a job for the same PR and head SHA is queued or running, a new submission
+    gets that job back instead of starting a second, identical crew run (single-flight).
+    """
+
+    def __init__(self, run_review: Callable[..., Awaitable[Dict[str, Any]]],
+                 workers: int = REVIEW_JOB_WORKERS, ttl: float = REVIEW_JOB_TTL):
+        self._run_review = run_review
+        self._worker_count = max(1, workers)
+        self._ttl = ttl
+        self._jobs: Dict[str, ReviewJob] = {}
+        self._active: Dict[str, ReviewJob] = {}  # key -> queued or running job
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self.coalesced = 0
+
+    def _ensure_workers(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self._worker_count)]
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            job.status = RUNNING
+            job.started_at = time.time()
+            job.publish("started", job.to_dict())
+            reviewed_head = None
+
+            def on_progress(stage: str, data: Dict[str, Any]):
+                nonlocal reviewed_head
+                if stage == "fetched":
+                    reviewed_head = data.get("head_sha")
+                job.publish(stage, data)
+
+            try:
+                job.result = await self._run_review(job.pr_url, on_progress=on_progress, incremental=job.incremental,
+                                                    pr_data=job.pr_data)
+                job.status = SUCCEEDED
+                # Only cached under the head it was keyed by: the PR may have moved since submission
+                if job.cache_key and reviewed_head and reviewed_head == job.head_sha:
+                    get_report_cache().put(job.cache_group, job.cache_key, job.result)
+            except Exception as e:
+                job.error = str(e)
+                job.status = FAILED
+            finally:
+                if not job.finished:  # cancelled at shutdown
+                    job.error = "The server shut down before the review finished"
+                    job.status = FAILED
+                job.finished_at = time.time()
+                self._active.pop(job.key, None)
+                if job.status == FAILED:
+                    job.publish("failed", {"error": job.error})
+                job._done.set()
+                self._queue.task_done()
+
+    def _prune(self):
+        cutoff = time.time() - self._ttl
+        for job_id in [j.id for j in self._jobs.values() if j.finished and j.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    async def submit(self, pr_url: str, bypass_cache: bool = False, refresh: bool = False,
+                     incremental: bool = False) -> ReviewJob:
+        """
+        Queues a review of `pr_url`, or returns the queued/running job for the same head commit.
+        A report cached for the same head, base, models and prompts is returned as an already
+        finished job; `refresh` reviews again and replaces it, `bypass_cache` neither reads
+        nor writes the cache. `incremental` reviews only what was pushed since the last review;
+        it never joins a full review's job or vice versa, and its carried-forward report is not
+        cached (a cached full report is still served to it).
+        Raises ValueError for a malformed PR URL.
+        """
+        owner, repo, pr_number = parse_github_pr_url(pr_url)
+        # The PR object is revalidated through the conditional-request cache, so this is cheap
+        pr_data = await fetch_pr_metadata_async(owner, repo, pr_number)
+        head_sha = pr_data["head"]["sha"]
+        key = review_job_key(owner, repo, pr_number, head_sha, incremental)
+
+        self._prune()
+        report_cache = None if bypass_cache else get_report_cache()
+        cache_group = f"{owner}/{repo}"
+        cache_key = report_cache_key_for(pr_data) if report_cache is not None else None
+        if report_cache is not None and not refresh:
+            cached_report = report_cache.get(cache_group, cache_key)
+            if cached_report is not None:
+                print(f"⚡ Report cache hit for {key}")
+                return self._cached_job(pr_url, key, head_sha, cached_report)
+
+        job = self._active.get(key)
+        if job is not None:
+            job.submissions += 1
+            self.coalesced += 1
+            print(f"⚡ Review of {key} already {job.status}; joining job {job.id}")
+            return job
+
+        self._ensure_workers()
+        job = ReviewJob(id=uuid.uuid4().hex, pr_url=pr_url, key=key, head_sha=head_sha, pr_data=pr_data, incremental=incremental,
+                        cache_key=None if incremental else cache_key, cache_group=cache_group)
+        self._jobs[job.id] = job
+        self._active[key] = job
+        self._queue.put_nowait(job)
+        return job
+
+    def _cached_job(self, pr_url: str, key: str, head_sha: str, report: Dict[str, Any]) -> ReviewJob:
+        job = ReviewJob(id=uuid.uuid4().hex, pr_url=pr_url, key=key, head_sha=head_sha, status=SUCCEEDED,
+                        cached=True, result=report)
+        job.started_at = job.finished_at = job.created_at
+        job.publish("report", report)
+        job._done.set()
+        self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[ReviewJob]:
+        return self._jobs.get(job_id)
+
+    async def shutdown(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+
+    def stats(self) -> Dict[str, Any]:
+        counts = {QUEUED: 0, RUNNING: 0, SUCCEEDED: 0, FAILED: 0}
+        for job in self._jobs.values():
+            counts[job.status] += 1
+        return {"workers": self._worker_count, "jobs": counts, "coalesced_submissions": self.coalesced}
+
+
+_manager: Optional[ReviewJobManager] = None
+
+
+def get_job_manager() -> ReviewJobManager:
+    global _manager
+    if _manager is None:
+        _manager = ReviewJobManager(run_pr_review_crew)
+    return _manager
@@ -0,0 +1,162 @@
+import os
+import time
+import asyncio
+import threading
+import concurrent.futures
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+# Worker threads shared by every review for the blocking CrewAI `kickoff` calls
+CREW_EXECUTOR_WORKERS = int(os.getenv("CREW_EXECUTOR_WORKERS", "64"))
+# LLM calls allowed in flight at once across all reviews, per model
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+# Per-model overrides, e.g. "gemini/gemini-1.5-flash=24,gemini/gemini-1.5-pro=4"
+LLM_MODEL_CONCURRENCY = os.getenv("LLM_MODEL_CONCURRENCY", "")
+
+
+def parse_model_limits(raw: str) -> Dict[str, int]:
+    limits = {}
+    for item in raw.split(","):
+        model, sep, limit = item.strip().rpartition("=")
+        if sep and model.strip() and limit.strip().isdigit():
+            limits[model.strip()] = max(1, int(limit))
+    return limits
+
+
+@dataclass
+class ModelSlots:
+    """Admission state of one model: a counting semaphore plus queue metrics."""
+    limit: int
+    semaphore: asyncio.Semaphore = field(init=False, repr=False)
+    in_flight: int = 0
+    queued: int = 0
+    max_queued: int = 0
+    admitted: int = 0
+    total_wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+
+    def __post_init__(self):
+        self.semaphore = asyncio.Semaphore(self.limit)
+
+
+class LLMAdmissionLimiter:
+    """
+    Caps the LLM calls in flight per model across every review in the process.
+    Calls over the cap wait here instead of reaching the provider, so a burst of reviews
+    queues at the provider's sustainable rate rather than turning into throttling errors
+    and retries. Admission is awaited on the event loop before a call is handed to the
+    crew executor, so waiting calls hold no worker thread and a saturated model cannot
+    starve the others.
+    """
+
+    def __init__(self, default_limit: int = LLM_MAX_CONCURRENCY,
+                 model_limits: Optional[Dict[str, int]] = None):
+        self.default_limit = max(1, default_limit)
+        self.model_limits = parse_model_limits(LLM_MODEL_CONCURRENCY) if model_limits is None else model_limits
+        self._models: Dict[str, ModelSlots] = {}
+
+    def _slots(self, model: str) -> ModelSlots:
+        slots = self._models.get(model)
+        if slots is None:
+            slots = self._models[model] = ModelSlots(limit=self.model_limits.get(model, self.default_limit))
+        return slots
+
+    async def acquire(self, model: str):
+        """Takes one of `model`'s slots, waiting for one if needed. Pair with `release`."""
+        slots = self._slots(model)
+        started = time.perf_counter()
+        waiting = slots.semaphore.locked()
+        if waiting:
+            slots.queued += 1
+            slots.max_queued = max(slots.max_queued, slots.queued)
+        try:
+            await slots.semaphore.acquire()
+        finally:
+            if waiting:
+                slots.queued -= 1
+        slots.in_flight += 1
+        slots.admitted += 1
+        waited = time.perf_counter() - started
+        slots.total_wait_seconds += waited
+        slots.max_wait_seconds = max(slots.max_wait_seconds, waited)
+
+    def release(self, model: str):
+        slots = self._models[model]
+        slots.in_flight -= 1
+        slots.semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "default_limit": self.default_limit,
+            "models": {
+                model: {
+                    "limit": s.limit,
+                    "in_flight": s.in_flight,
+                    "queued": s.queued,
+                    "max_queued": s.max_queued,
+                    "admitted": s.admitted,
+                    "average_wait_seconds": round(s.total_wait_seconds / s.admitted, 3) if s.admitted else 0.0,
+                    "max_wait_seconds": round(s.max_wait_seconds, 3),
+                }
+                for model, s in self._models.items()
+            },
+        }
+
+
+_limiter: Optional[LLMAdmissionLimiter] = None
+_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+_lock = threading.Lock()
+
+
+def get_llm_limiter() -> LLMAdmissionLimiter:
+    global _limiter
+    if _limiter is None:
+        with _lock:
+            if _limiter is None:
+                _limiter = LLMAdmissionLimiter()
+    return _limiter
+
+
+def get_crew_executor() -> concurrent.futures.ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=max(1, CREW_EXECUTOR_WORKERS), thread_name_prefix="crew"
+                )
+    return _executor
+
+
+def shutdown_crew_executor():
+    """Stops the shared executor (at server shutdown); a later call to `get_crew_executor` starts a new one."""
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def run_llm_call(model: str, fn: Callable[..., Any], *args: Any) -> Any:
+    """
+    Runs the blocking `fn(*args)` (a crew kickoff) on the shared executor once `model`
+    has a free admission slot; only admitted calls take a worker thread.
+    The slot is held until the thread finishes, even if the caller is cancelled first
+    (client disconnect, job cancel): the kickoff cannot be interrupted and keeps calling the model.
+    """
+    limiter = get_llm_limiter()
+    await limiter.acquire(model)
+    try:
+        future = asyncio.get_running_loop().run_in_executor(get_crew_executor(), fn, *args)
+    except BaseException:
+        limiter.release(model)
+        raise
+
+    def finished(f: asyncio.Future):
+        limiter.release(model)
+        if not f.cancelled():
+            f.exception()  # Retrieved here, so the error of an abandoned call is not reported as unhandled
+
+    future.add_done_callback(finished)
+    # Shielded: cancelling the caller must not mark the executor future done while its thread runs
+    return await asyncio.shield(future)
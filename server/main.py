@@ -1,15 +1,32 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from dotenv import load_dotenv
 import os
 from fastapi.middleware.cors import CORSMiddleware
-from routes import router as review_router # Import the router
 
-load_dotenv() # Load environment variables at the application start
+# Load environment variables at the application start, before the server modules below
+# read their settings into module-level constants on import
+load_dotenv()
+
+from .routes import router as review_router # Import the router
+from .github_http import close_http_session
+from .llm_executor import shutdown_crew_executor
+from .jobs import get_job_manager
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Stop the review job workers, then release pooled GitHub connections and the crew
+    # worker threads when the server stops
+    await get_job_manager().shutdown()
+    close_http_session()
+    shutdown_crew_executor()
 
 app = FastAPI(
     title="GitHub PR Reviewer AI",
     description="An AI-powered service to automate Pull Request reviews using CrewAI.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 origins = [
     "http://localhost:5173",
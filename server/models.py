@@ -7,6 +7,9 @@ class PRReviewRequest(BaseModel):
     Request model for the PR review API endpoint.
     """
     pr_url: str = Field(..., description="The full URL of the GitHub Pull Request (e.g., 'https://github.com/owner/repo/pull/123').")
+    bypass_cache: bool = Field(False, description="Review without reading or writing the report cache.")
+    refresh: bool = Field(False, description="Review again even if a report is cached for this PR head, and replace it.")
+    incremental: bool = Field(False, description="Review only the commits pushed since this PR's last review, carrying its findings over.")
 
 class PRReviewResponse(BaseModel):
     """
@@ -87,5 +90,8 @@ class PullRequestReviewReport(BaseModel):
     committer_feedback: str = Field(description="Human-like, empathetic, and constructive feedback for the committer.")
     actionable_next_steps_for_committer: List[str] = Field(description="A bulleted list of concrete, prioritized actions for the committer.")
 
+class CommitterFeedbackOutput(BaseModel):
+    committer_feedback: str = Field(description="Human-like, empathetic, and constructive feedback for the committer, in Markdown prose.")
+
 class PullReport(BaseModel):
     report: str =Field(..., description="The comprehensive Pull Request Review Report.")
\ No newline at end of file
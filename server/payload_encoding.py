@@ -0,0 +1,171 @@
+import os
+import json
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from .token_counter import count_tokens
+
+# Encoding of the PR payload (`all_pr_diffs` / `all_original_pr_files`) sent to the level-2 agents
+PAYLOAD_ENCODING = os.getenv("PAYLOAD_ENCODING", "json").lower()
+# Log the payload's token count under every registered encoding (encodes and counts it once per encoding)
+PAYLOAD_COMPARE_ENCODINGS = os.getenv("PAYLOAD_COMPARE_ENCODINGS", "0").lower() not in ("0", "false", "no")
+
+# pr_files entries look like {"file", "added", "removed", "content"}, where added/removed
+# are `chunk_diff` runs: {"lines": [12, 13, 14], "code": "..."}
+PRFile = Dict[str, Any]
+
+
+@dataclass
+class PayloadEncoder:
+    name: str
+    # How the format reads; passed to the prompts as `{pr_payload_format}`
+    description: str
+    encode_diffs: Callable[[List[PRFile]], str]
+    encode_originals: Callable[[List[PRFile]], str]
+
+
+_encoders: Dict[str, PayloadEncoder] = {}
+
+
+def register_encoder(encoder: PayloadEncoder) -> PayloadEncoder:
+    _encoders[encoder.name] = encoder
+    return encoder
+
+
+def available_encodings() -> List[str]:
+    return list(_encoders)
+
+
+def get_encoder(name: Optional[str] = None) -> PayloadEncoder:
+    name = name or PAYLOAD_ENCODING
+    encoder = _encoders.get(name)
+    if encoder is None:
+        raise ValueError(f"Unknown payload encoding '{name}' (available: {', '.join(_encoders)})")
+    return encoder
+
+
+def encode_payload(pr_files: List[PRFile], encoding: Optional[str] = None) -> Dict[str, str]:
+    """
+    Encodes the PR payload agent inputs: `all_pr_diffs`, `all_original_pr_files` and the
+    `pr_payload_format` description the prompts use to read them.
+    """
+    encoder = get_encoder(encoding)
+    return {
+        "all_pr_diffs": encoder.encode_diffs(pr_files),
+        "all_original_pr_files": encoder.encode_originals(pr_files),
+        "pr_payload_format": encoder.description,
+    }
+
+
+def compare_encodings(pr_files: List[PRFile]) -> Dict[str, int]:
+    """
+    Token count of the full payload (diffs + original files) under every registered encoding.
+    """
+    return {
+        name: count_tokens(encoder.encode_diffs(pr_files)) + count_tokens(encoder.encode_originals(pr_files))
+        for name, encoder in _encoders.items()
+    }
+
+
+# --- Shared helpers ---
+def line_ranges(lines: List[int]) -> str:
+    """Run-length form of a line list: [3, 4, 5, 9] -> "3-5,9"."""
+    parts = []
+    start = prev = None
+    for n in lines:
+        if prev is not None and n == prev + 1:
+            prev = n
+            continue
+        if start is not None:
+            parts.append(str(start) if start == prev else f"{start}-{prev}")
+        start = prev = n
+    if start is not None:
+        parts.append(str(start) if start == prev else f"{start}-{prev}")
+    return ",".join(parts)
+
+
+def _sorted_runs(pr_file: PRFile):
+    """The file's removed and added runs by position, removals first on ties."""
+    runs = [("-", run) for run in pr_file["removed"]] + [("+", run) for run in pr_file["added"]]
+    return sorted(runs, key=lambda r: (r[1]["lines"][0] if r[1]["lines"] else 0, r[0] == "+"))
+
+
+def _json_originals(pr_files: List[PRFile]) -> str:
+    return json.dumps([{"file": f["file"], "content": f["content"]} for f in pr_files])
+
+
+def _text_originals(pr_files: List[PRFile]) -> str:
+    # Plain text avoids JSON's escaping of every newline and quote in the code
+    return "\n\n".join(f"## {f['file']}\n{f['content']}" for f in pr_files)
+
+
+# --- Encoders ---
+def _encode_json(pr_files: List[PRFile]) -> str:
+    return json.dumps([{"file": f["file"], "added": f["added"], "removed": f["removed"]} for f in pr_files])
+
+
+def _encode_json_ranges(pr_files: List[PRFile]) -> str:
+    def runs(chunks):
+        return [{"lines": line_ranges(c["lines"]), "code": c["code"]} for c in chunks]
+    return json.dumps([{"file": f["file"], "added": runs(f["added"]), "removed": runs(f["removed"])} for f in pr_files])
+
+
+def _encode_unified(pr_files: List[PRFile], gutters: bool = True) -> str:
+    blocks = []
+    for f in pr_files:
+        out = [f"## {f['file']}"]
+        width = len(str(max((max(r["lines"], default=0) for r in f["added"] + f["removed"]), default=0)))
+        for sign, run in _sorted_runs(f):
+            lines = run["lines"]
+            if not lines:
+                continue
+            out.append(f"@@ {sign}{lines[0]},{len(lines)} @@")
+            for number, code in zip(lines, run["code"].split("\n")):
+                out.append(f"{number:>{width}} {sign} {code}" if gutters else f"{sign}{code}")
+        blocks.append("\n".join(out))
+    return "\n\n".join(blocks)
+
+
+register_encoder(PayloadEncoder(
+    name="json",
+    description=(
+        "JSON. `all_pr_diffs` is an array of {file, added, removed}, where each added/removed chunk is "
+        "{lines: [line numbers], code: text}; `all_original_pr_files` is an array of {file, content}."
+    ),
+    encode_diffs=_encode_json,
+    encode_originals=_json_originals,
+))
+
+register_encoder(PayloadEncoder(
+    name="json-ranges",
+    description=(
+        "JSON. `all_pr_diffs` is an array of {file, added, removed}, where each added/removed chunk is "
+        "{lines: line ranges such as \"12-18\", code: text}; `all_original_pr_files` is an array of {file, content}."
+    ),
+    encode_diffs=_encode_json_ranges,
+    encode_originals=_json_originals,
+))
+
+register_encoder(PayloadEncoder(
+    name="unified",
+    description=(
+        "Unified-diff text. Each file starts with a `## <path>` header. A `@@ -N,C @@` block lists C removed "
+        "lines starting at line N of the original file, a `@@ +N,C @@` block C added lines starting at line N "
+        "of the new file; every line is prefixed with its line number and `-` or `+`. "
+        "`all_original_pr_files` lists each file's original content under the same `## <path>` headers."
+    ),
+    encode_diffs=_encode_unified,
+    encode_originals=_text_originals,
+))
+
+register_encoder(PayloadEncoder(
+    name="unified-ranges",
+    description=(
+        "Unified-diff text. Each file starts with a `## <path>` header. A `@@ -N,C @@` block lists C removed "
+        "lines (prefixed `-`) starting at line N of the original file, a `@@ +N,C @@` block C added lines "
+        "(prefixed `+`) starting at line N of the new file. "
+        "`all_original_pr_files` lists each file's original content under the same `## <path>` headers."
+    ),
+    encode_diffs=lambda pr_files: _encode_unified(pr_files, gutters=False),
+    encode_originals=_text_originals,
+))
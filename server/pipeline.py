@@ -0,0 +1,161 @@
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+# Graphs of the most recent pipeline runs kept for timing analysis
+PIPELINE_HISTORY_SIZE = int(os.getenv("PIPELINE_HISTORY_SIZE", "20"))
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+@dataclass
+class PipelineNode:
+    """One fetch or crew of a pipeline: an async function of its dependencies' results."""
+    name: str
+    fn: Callable[..., Awaitable[Any]]
+    deps: List[str]
+    status: str = PENDING
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    error: Optional[str] = None
+    # Dependency that resolved last, i.e. the one this node actually waited for
+    waited_on: Optional[str] = field(default=None, repr=False)
+
+    @property
+    def seconds(self) -> Optional[float]:
+        if self.started is None or self.finished is None:
+            return None
+        return self.finished - self.started
+
+
+class Pipeline:
+    """
+    Runs a graph of async nodes, each started as soon as the nodes it depends on resolve,
+    so independent fetches and crews overlap and the run takes as long as its longest
+    dependency chain. A node is called with its dependencies' results as keyword
+    arguments; dependencies must be added before the nodes that use them, so the graph
+    cannot have cycles. When a node fails the nodes still running are cancelled and the
+    error is raised from `run`.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._nodes: Dict[str, PipelineNode] = {}
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+
+    def add(self, name: str, fn: Callable[..., Awaitable[Any]], deps: Sequence[str] = ()):
+        if name in self._nodes:
+            raise ValueError(f"Pipeline node '{name}' is already defined")
+        missing = [dep for dep in deps if dep not in self._nodes]
+        if missing:
+            raise ValueError(f"Pipeline node '{name}' depends on undefined node(s): {', '.join(missing)}")
+        self._nodes[name] = PipelineNode(name=name, fn=fn, deps=list(deps))
+
+    async def run(self) -> Dict[str, Any]:
+        """Runs every node and returns their results by name."""
+        self._started_at = time.perf_counter()
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_node(node: PipelineNode):
+            results = {}
+            for dep in node.deps:
+                # A dependency's failure is raised here, so its dependents never start
+                results[dep] = await tasks[dep]
+            if node.deps:
+                node.waited_on = max(node.deps, key=lambda dep: self._nodes[dep].finished)
+            node.status = RUNNING
+            node.started = time.perf_counter()
+            try:
+                result = await node.fn(**results)
+            except asyncio.CancelledError:
+                node.status = CANCELLED
+                raise
+            except Exception as e:
+                node.status = FAILED
+                node.error = str(e)
+                raise
+            finally:
+                node.finished = time.perf_counter()
+            node.status = DONE
+            return result
+
+        # Insertion order is a topological order, so every dependency's task exists already
+        for node in self._nodes.values():
+            tasks[node.name] = asyncio.create_task(run_node(node), name=f"{self.name}:{node.name}")
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            for node in self._nodes.values():
+                if node.status in (PENDING, RUNNING):
+                    node.status = CANCELLED
+            raise
+        finally:
+            self._finished_at = time.perf_counter()
+            record_pipeline_run(self.graph())
+        return {name: task.result() for name, task in tasks.items()}
+
+    def critical_path(self) -> List[str]:
+        """
+        The chain of nodes that set the run's length: from the node that finished last,
+        back through the dependency each node waited for.
+        """
+        finished = [n for n in self._nodes.values() if n.finished is not None]
+        if not finished:
+            return []
+        path = [max(finished, key=lambda n: n.finished).name]
+        while self._nodes[path[-1]].waited_on is not None:
+            path.append(self._nodes[path[-1]].waited_on)
+        return path[::-1]
+
+    def graph(self) -> Dict[str, Any]:
+        """The nodes with their dependencies and timings (seconds from the start of the run)."""
+        def offset(t: Optional[float]) -> Optional[float]:
+            return round(t - self._started_at, 3) if t is not None and self._started_at is not None else None
+
+        total = None
+        if self._started_at is not None and self._finished_at is not None:
+            total = round(self._finished_at - self._started_at, 3)
+        return {
+            "name": self.name,
+            "total_seconds": total,
+            "critical_path": self.critical_path(),
+            "nodes": [
+                {
+                    "name": n.name,
+                    "deps": n.deps,
+                    "status": n.status,
+                    "started_at": offset(n.started),
+                    "finished_at": offset(n.finished),
+                    "seconds": round(n.seconds, 3) if n.seconds is not None else None,
+                    "error": n.error,
+                }
+                for n in self._nodes.values()
+            ],
+        }
+
+
+_history: deque = deque(maxlen=max(1, PIPELINE_HISTORY_SIZE))
+_history_lock = threading.Lock()
+
+
+def record_pipeline_run(graph: Dict[str, Any]):
+    with _history_lock:
+        _history.append(graph)
+
+
+def recent_pipeline_runs() -> List[Dict[str, Any]]:
+    """Graphs of the most recent pipeline runs, newest first."""
+    with _history_lock:
+        return list(reversed(_history))
@@ -0,0 +1,229 @@
+import os
+import time
+import threading
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional
+
+import requests
+
+# Below this many remaining calls, requests on a token are spread evenly over the
+# time left until its window resets instead of being sent immediately.
+GITHUB_RATE_LIMIT_RESERVE = int(os.getenv("GITHUB_RATE_LIMIT_RESERVE", "100"))
+# Longest a single request may wait for a rate-limit window before giving up.
+GITHUB_RATE_LIMIT_MAX_WAIT = float(os.getenv("GITHUB_RATE_LIMIT_MAX_WAIT", "300"))
+GITHUB_RATE_LIMIT_MAX_RETRIES = int(os.getenv("GITHUB_RATE_LIMIT_MAX_RETRIES", "4"))
+# Pause after a secondary rate limit that names no Retry-After, doubled on every repeat
+GITHUB_SECONDARY_LIMIT_BACKOFF = float(os.getenv("GITHUB_SECONDARY_LIMIT_BACKOFF", "60"))
+GITHUB_SECONDARY_LIMIT_MAX_BACKOFF = float(os.getenv("GITHUB_SECONDARY_LIMIT_MAX_BACKOFF", "900"))
+
+# Assumed window size before the first response tells us the real one
+_DEFAULT_LIMIT = 5000
+_ANONYMOUS_LIMIT = 60
+
+
+class RateLimitExceeded(Exception):
+    pass
+
+
+@dataclass
+class TokenState:
+    token: Optional[str]
+    limit: int = _DEFAULT_LIMIT
+    remaining: Optional[int] = None
+    reset_at: float = 0.0
+    blocked_until: float = 0.0  # secondary rate limits (Retry-After or backoff)
+    secondary_strikes: int = 0  # secondary limits hit in a row, for the backoff
+    next_send_at: float = 0.0  # earliest send time of the next paced call
+    requests: int = 0
+    throttled: int = 0
+
+    def available(self, now: float) -> int:
+        """
+        Calls this token can make right now without hitting the limit.
+        """
+        if now < self.blocked_until:
+            return 0
+        if self.remaining is None or now >= self.reset_at:
+            return self.limit
+        return self.remaining
+
+    def ready_at(self, now: float) -> float:
+        if now < self.blocked_until:
+            return self.blocked_until
+        return self.reset_at if self.available(now) <= 0 else now
+
+
+def configured_tokens() -> List[str]:
+    """
+    Tokens from GITHUB_TOKENS (comma-separated), falling back to GITHUB_TOKEN.
+    """
+    raw = os.getenv("GITHUB_TOKENS") or os.getenv("GITHUB_TOKEN") or ""
+    return list(dict.fromkeys(t.strip() for t in raw.split(",") if t.strip()))
+
+
+class GitHubRequestScheduler:
+    """
+    Spreads GitHub API calls over a pool of tokens using the `X-RateLimit-*` headers.
+
+    Each request is assigned the token with the most remaining budget; when every token
+    runs low, calls are paced so the budget lasts until the window resets. A rate-limited
+    response only marks its token as exhausted; the caller retries that single request.
+    """
+
+    def __init__(self, tokens: Optional[List[str]] = None):
+        tokens = configured_tokens() if tokens is None else tokens
+        self._lock = threading.Lock()
+        self._states: Dict[Optional[str], TokenState] = {
+            t: TokenState(token=t) for t in tokens
+        } or {None: TokenState(token=None, limit=_ANONYMOUS_LIMIT)}
+        self.total_wait_seconds = 0.0
+
+    @property
+    def has_tokens(self) -> bool:
+        return None not in self._states
+
+    def in_pool(self, token: Optional[str]) -> bool:
+        """
+        Whether calls for `token` may be spread across the whole pool (no token, or a pooled one).
+        """
+        return not token or (token in self._states and self.has_tokens)
+
+    def _state(self, token: Optional[str]) -> TokenState:
+        state = self._states.get(token)
+        if state is None:
+            # Explicitly passed token outside the pool: track it all the same
+            state = self._states[token] = TokenState(token=token)
+        return state
+
+    def best_token(self) -> Optional[str]:
+        """
+        The token with the most budget left, without reserving or pacing a call.
+        """
+        now = time.time()
+        with self._lock:
+            return max(self._states.values(), key=lambda s: s.available(now)).token
+
+    def acquire(self, token: Optional[str] = None) -> Optional[str]:
+        """
+        Reserves one call and returns the token to send it with, sleeping first if the
+        budget has to be paced. `token` pins the call to a specific token.
+        """
+        waited = 0.0
+        while True:
+            now = time.time()
+            with self._lock:
+                if token is not None:
+                    state = self._state(token)
+                else:
+                    state = max(self._states.values(), key=lambda s: (s.available(now), -s.requests))
+                available = state.available(now)
+                if available > 0:
+                    delay = 0.0
+                    paced = state.remaining is not None and now < state.reset_at and available <= GITHUB_RATE_LIMIT_RESERVE
+                    if paced:
+                        # Paced calls are serialized on the token: each one takes the next
+                        # send slot, one interval after the previous reservation's
+                        send_at = max(now, state.next_send_at)
+                        delay = send_at - now
+                    if waited + delay <= GITHUB_RATE_LIMIT_MAX_WAIT:
+                        if paced:
+                            state.next_send_at = send_at + max(state.reset_at - send_at, 0.0) / available
+                        if state.remaining is not None and now < state.reset_at:
+                            state.remaining -= 1
+                        state.requests += 1
+                        if delay <= 0:
+                            return state.token
+                else:
+                    delay = state.ready_at(now) - now
+                    if token is None:
+                        delay = min(s.ready_at(now) for s in self._states.values()) - now
+            if waited + delay > GITHUB_RATE_LIMIT_MAX_WAIT:
+                raise RateLimitExceeded(
+                    f"GitHub API rate limit exhausted on all tokens; next window opens in {delay:.0f}s"
+                )
+            time.sleep(max(delay, 0.0))
+            waited += delay
+            with self._lock:
+                self.total_wait_seconds += delay
+            if available > 0:
+                return state.token
+
+    def update(self, token: Optional[str], response: requests.Response):
+        """
+        Records the rate-limit headers of a response sent with `token`.
+        """
+        headers = response.headers
+        if headers.get("X-RateLimit-Resource", "core") != "core":
+            return  # Search/GraphQL budgets are separate and not scheduled here
+        with self._lock:
+            state = self._state(token)
+            if response.status_code not in (403, 429):
+                state.secondary_strikes = 0
+            if "X-RateLimit-Limit" in headers:
+                state.limit = int(headers["X-RateLimit-Limit"])
+            if "X-RateLimit-Remaining" in headers:
+                state.remaining = int(headers["X-RateLimit-Remaining"])
+            if "X-RateLimit-Reset" in headers:
+                state.reset_at = float(headers["X-RateLimit-Reset"])
+
+    @staticmethod
+    def is_rate_limited(response: requests.Response) -> bool:
+        if response.status_code not in (403, 429):
+            return False
+        if response.headers.get("X-RateLimit-Remaining") == "0" or "Retry-After" in response.headers:
+            return True
+        return "rate limit" in response.text.lower()
+
+    def penalize(self, token: Optional[str], response: requests.Response):
+        """
+        Takes a token out of rotation after a rate-limited response: until Retry-After,
+        until the window resets when the primary budget is spent, and otherwise (a secondary
+        limit without Retry-After) for a backoff that doubles while the limit keeps hitting.
+        """
+        now = time.time()
+        with self._lock:
+            state = self._state(token)
+            state.throttled += 1
+            retry_after = response.headers.get("Retry-After")
+            if retry_after is not None:
+                state.blocked_until = now + float(retry_after)
+            elif response.headers.get("X-RateLimit-Remaining") == "0":
+                state.remaining = 0
+                state.reset_at = float(response.headers.get("X-RateLimit-Reset", now + 60))
+            else:
+                backoff = min(GITHUB_SECONDARY_LIMIT_BACKOFF * 2 ** state.secondary_strikes,
+                              GITHUB_SECONDARY_LIMIT_MAX_BACKOFF)
+                state.secondary_strikes += 1
+                state.blocked_until = now + backoff
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            return {
+                "tokens": [
+                    {
+                        # Never expose the token itself
+                        "token": f"…{s.token[-4:]}" if s.token else "anonymous",
+                        "limit": s.limit,
+                        "remaining": s.available(now),
+                        "resets_in": max(0, round(s.reset_at - now)) if s.remaining is not None else None,
+                        "requests": s.requests,
+                        "throttled": s.throttled,
+                    }
+                    for s in self._states.values()
+                ],
+                "total_wait_seconds": round(self.total_wait_seconds, 2),
+            }
+
+
+_scheduler: Optional[GitHubRequestScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_request_scheduler() -> GitHubRequestScheduler:
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = GitHubRequestScheduler()
+    return _scheduler
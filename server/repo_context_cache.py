@@ -0,0 +1,63 @@
+import os
+import threading
+from typing import Optional
+
+from .result_cache import ResultCache, stable_hash
+
+REPO_CONTEXT_CACHE_ENABLED = os.getenv("REPO_CONTEXT_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+REPO_CONTEXT_CACHE_TTL = float(os.getenv("REPO_CONTEXT_CACHE_TTL", str(7 * 24 * 3600)))
+# Bump to invalidate every cached repo context after a prompt or model-output change
+# that the task fingerprint below would not catch.
+REPO_CONTEXT_PROMPT_VERSION = os.getenv("REPO_CONTEXT_PROMPT_VERSION", "1")
+
+
+def task_fingerprint(task) -> str:
+    """
+    Hashes everything about a CrewAI task that shapes its output: the prompt, the expected
+    output schema and the agent persona.
+    """
+    agent = getattr(task, "agent", None)
+    return stable_hash(
+        getattr(task, "description", ""),
+        getattr(task, "expected_output", ""),
+        getattr(agent, "role", ""),
+        getattr(agent, "goal", ""),
+        getattr(agent, "backstory", ""),
+    )
+
+
+def task_model_name(task) -> str:
+    llm = getattr(getattr(task, "agent", None), "llm", None)
+    return str(getattr(llm, "model", llm) or "unknown")
+
+
+def repo_context_cache_key(base_tree_sha: str, model: str, prompt_version: str, pr_message: str) -> str:
+    """
+    Key for one cached `RepoContextAgentOutput`.
+    The PR message is part of the key because the output summarizes it
+    (`pr_message_context_summary`).
+    """
+    return stable_hash(base_tree_sha, model, prompt_version, pr_message)
+
+
+_cache: Optional[ResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_repo_context_cache() -> Optional[ResultCache]:
+    """
+    Returns the process-wide repo context cache, or None when REPO_CONTEXT_CACHE_ENABLED is off.
+    """
+    global _cache
+    if not REPO_CONTEXT_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache("repo_context", ttl_seconds=REPO_CONTEXT_CACHE_TTL)
+    return _cache
+
+
+def invalidate_repo_context(repo_full_name: str) -> int:
+    cache = get_repo_context_cache()
+    return cache.invalidate_group(repo_full_name) if cache else 0
@@ -0,0 +1,101 @@
+import os
+import threading
+from typing import Any, Dict, Optional
+
+from .result_cache import ResultCache, stable_hash
+from .repo_context_cache import task_fingerprint, task_model_name
+from .context_extractor import CONTEXT_EXTRACTION_MODE, CONTEXT_FILE_TOKEN_BUDGET, CONTEXT_LINES_AROUND
+from .payload_encoding import PAYLOAD_ENCODING
+from .token_counter import CHARS_PER_TOKEN
+from .triage import (
+    TRIAGE_ENABLED, TRIAGE_EXCLUDE_GLOBS, TRIAGE_MAX_CHANGED_LINES, TRIAGE_MAX_FILE_BYTES,
+    TRIAGE_MAX_LINE_LENGTH, TRIAGE_MAX_AVERAGE_LINE_LENGTH, DEFAULT_EXCLUDE_GLOBS
+)
+from .fanout import FANOUT_GROUP_TOKEN_BUDGET, ALIGNMENT_DIFF_TOKEN_BUDGET
+from .report_renderer import (
+    REPORT_RENDERER, REPORT_LLM_FEEDBACK, REPORT_MIN_QUALITY_SCORE, REPORT_MIN_ALIGNMENT_SCORE,
+    REPORT_MAX_SUGGESTIONS, REPORT_MAX_NEXT_STEPS
+)
+from .crew_agents import (
+    RepoContextAgent_task, BugDetectionAgent_task, CodeQualityAgent_task,
+    SecurityAgent_task, AlignmentAgent_task, ReportCompilerAgent_task,
+    CommitterFeedbackAgent_task
+)
+
+REPORT_CACHE_ENABLED = os.getenv("REPORT_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+REPORT_CACHE_TTL = float(os.getenv("REPORT_CACHE_TTL", str(30 * 24 * 3600)))
+REPORT_CACHE_MEMORY_ENTRIES = int(os.getenv("REPORT_CACHE_MEMORY_ENTRIES", "512"))
+# Bump to invalidate every cached report after a change the task fingerprints would not catch
+REPORT_PROMPT_VERSION = os.getenv("REPORT_PROMPT_VERSION", "1")
+
+_REVIEW_TASKS = (
+    RepoContextAgent_task, BugDetectionAgent_task, CodeQualityAgent_task,
+    SecurityAgent_task, AlignmentAgent_task, ReportCompilerAgent_task,
+    CommitterFeedbackAgent_task,
+)
+
+
+def review_prompt_hash() -> str:
+    """
+    Hashes the prompts of every crew plus the settings that change what they are shown
+    (payload encoding, base-file context, triage, how the PR is split into prompts) or
+    how the report is rendered from their outputs.
+    """
+    return stable_hash(
+        REPORT_PROMPT_VERSION,
+        [task_fingerprint(task) for task in _REVIEW_TASKS],
+        PAYLOAD_ENCODING,
+        [CONTEXT_EXTRACTION_MODE, CONTEXT_FILE_TOKEN_BUDGET, CONTEXT_LINES_AROUND],
+        [TRIAGE_ENABLED, TRIAGE_EXCLUDE_GLOBS, TRIAGE_MAX_CHANGED_LINES, TRIAGE_MAX_FILE_BYTES,
+         TRIAGE_MAX_LINE_LENGTH, TRIAGE_MAX_AVERAGE_LINE_LENGTH, DEFAULT_EXCLUDE_GLOBS],
+        [FANOUT_GROUP_TOKEN_BUDGET, ALIGNMENT_DIFF_TOKEN_BUDGET, CHARS_PER_TOKEN],
+        [REPORT_RENDERER, REPORT_LLM_FEEDBACK, REPORT_MIN_QUALITY_SCORE, REPORT_MIN_ALIGNMENT_SCORE,
+         REPORT_MAX_SUGGESTIONS, REPORT_MAX_NEXT_STEPS],
+    )
+
+
+def review_models() -> str:
+    return ",".join(sorted({task_model_name(task) for task in _REVIEW_TASKS}))
+
+
+def review_fingerprint() -> str:
+    """Changes whenever a model or prompt of the review does; stored findings are only reused under the same one."""
+    return stable_hash(review_models(), review_prompt_hash())
+
+
+def report_cache_key(pr_number: int, head_sha: str, base_sha: str, pr_message: Optional[str]) -> str:
+    """
+    Key for one cached final report. The PR description is part of it because every crew
+    is shown it, so editing it is a reason to review again even at the same head.
+    """
+    return stable_hash(pr_number, head_sha, base_sha, review_models(), review_prompt_hash(), pr_message or "")
+
+
+def report_cache_key_for(pr_data: Dict[str, Any]) -> str:
+    """`report_cache_key` from a PR object of the GitHub API."""
+    return report_cache_key(pr_data["number"], pr_data["head"]["sha"], pr_data["base"]["sha"], pr_data.get("body"))
+
+
+_cache: Optional[ResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_report_cache() -> Optional[ResultCache]:
+    """
+    Returns the process-wide final report cache, or None when REPORT_CACHE_ENABLED is off.
+    Groups are repositories ("owner/repo"), so one repository's reports can be dropped at once.
+    """
+    global _cache
+    if not REPORT_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache("reports", ttl_seconds=REPORT_CACHE_TTL,
+                                     max_memory_entries=REPORT_CACHE_MEMORY_ENTRIES)
+    return _cache
+
+
+def invalidate_reports(repo_full_name: str) -> int:
+    cache = get_report_cache()
+    return cache.invalidate_group(repo_full_name) if cache else 0
@@ -0,0 +1,213 @@
+import os
+from typing import List, Optional, Sequence, Tuple
+
+from .models import (
+    RepoContextAgentOutput,
+    BugDetectionAgentOutput,
+    CodeQualityAgentOutput,
+    SecurityAgentOutput,
+    AlignmentAgentOutput,
+)
+
+# "template" renders the final report from the agents' outputs; "llm" has ReportCompilerAgent write it
+REPORT_RENDERER = os.getenv("REPORT_RENDERER", "template").lower()
+# Ask a model for the committer-feedback paragraph of a template report (one short LLM call)
+REPORT_LLM_FEEDBACK = os.getenv("REPORT_LLM_FEEDBACK", "0").lower() not in ("0", "false", "no")
+# Verdict thresholds: below either score a PR without blocking findings still needs a closer look
+REPORT_MIN_QUALITY_SCORE = int(os.getenv("REPORT_MIN_QUALITY_SCORE", "60"))
+REPORT_MIN_ALIGNMENT_SCORE = int(os.getenv("REPORT_MIN_ALIGNMENT_SCORE", "50"))
+# Longest lists written out in full; the rest are counted
+REPORT_MAX_SUGGESTIONS = int(os.getenv("REPORT_MAX_SUGGESTIONS", "15"))
+REPORT_MAX_NEXT_STEPS = int(os.getenv("REPORT_MAX_NEXT_STEPS", "10"))
+
+APPROVED = "Approved"
+CHANGES_REQUESTED = "Changes Requested"
+NEEDS_MORE_REVIEW = "Needs More Review"
+
+SEVERITY_RANK = {"Critical": 0, "High": 1, "Medium": 2, "Low": 3, "Informational": 4}
+SEVERITY_ICON = {"Critical": "🔴", "High": "🟠", "Medium": "🟡", "Low": "🔵", "Informational": "⚪"}
+BLOCKING_SEVERITIES = ("Critical", "High")
+
+
+def _plural(count: int, noun: str) -> str:
+    if count == 0:
+        return f"no {noun}s"
+    return f"{count} {noun}" if count == 1 else f"{count} {noun}s"
+
+
+def _severity_counts(severities: Sequence[str]) -> str:
+    """Counts per severity, most severe first, e.g. "2 High, 1 Low"."""
+    counts = {}
+    for severity in severities:
+        counts[severity] = counts.get(severity, 0) + 1
+    return ", ".join(f"{n} {s}" for s, n in sorted(counts.items(), key=lambda item: SEVERITY_RANK[item[0]]))
+
+
+def _location(file: str, line_numbers: Sequence[int]) -> str:
+    if not line_numbers:
+        return f"`{file}`"
+    label = "line" if len(line_numbers) == 1 else "lines"
+    return f"`{file}` ({label} {', '.join(str(n) for n in line_numbers)})"
+
+
+def _code_block(code: Optional[str]) -> List[str]:
+    if not code or not code.strip():
+        return []
+    # A longer fence keeps backticks in the snippet from closing the block
+    fence = "````" if "```" in code else "```"
+    return [fence, code.rstrip("\n"), fence, ""]
+
+
+def compute_verdict(bugs: BugDetectionAgentOutput, quality: CodeQualityAgentOutput,
+                    security: SecurityAgentOutput, alignment: AlignmentAgentOutput,
+                    unparsed_agents: Sequence[str] = ()) -> Tuple[str, str]:
+    """
+    The overall verdict and its reason, from severity rules:
+    any Critical/High bug or security finding requests changes; Medium findings, a quality
+    or alignment score under its threshold, an off-topic PR or an agent whose output could
+    not be read need more review; anything else is approved.
+    """
+    blocking_bugs = [f.severity for f in bugs.findings if f.severity in BLOCKING_SEVERITIES]
+    blocking_risks = [f.risk_level for f in security.findings if f.risk_level in BLOCKING_SEVERITIES]
+    if blocking_bugs or blocking_risks:
+        reasons = []
+        if blocking_bugs:
+            reasons.append(f"{_plural(len(blocking_bugs), 'bug')} ({_severity_counts(blocking_bugs)})")
+        if blocking_risks:
+            reasons.append(f"{_plural(len(blocking_risks), 'security risk')} ({_severity_counts(blocking_risks)})")
+        return CHANGES_REQUESTED, f"{' and '.join(reasons)} must be fixed before merging"
+
+    reasons = []
+    if unparsed_agents:
+        reasons.append(f"the {', '.join(unparsed_agents)} output could not be read")
+    medium_bugs = sum(1 for f in bugs.findings if f.severity == "Medium")
+    if medium_bugs:
+        reasons.append(f"{_plural(medium_bugs, 'medium-severity bug')} to confirm")
+    medium_risks = sum(1 for f in security.findings if f.risk_level == "Medium")
+    if medium_risks:
+        reasons.append(f"{_plural(medium_risks, 'medium security risk')} to assess")
+    if quality.code_quality_score < REPORT_MIN_QUALITY_SCORE:
+        reasons.append(f"code quality scored {quality.code_quality_score}/100 (below {REPORT_MIN_QUALITY_SCORE})")
+    if alignment.pr_nature_classification == "Off-topic":
+        reasons.append("the change looks off-topic for this repository")
+    elif alignment.alignment_score < REPORT_MIN_ALIGNMENT_SCORE:
+        reasons.append(f"alignment with the project scored {alignment.alignment_score}/100 (below {REPORT_MIN_ALIGNMENT_SCORE})")
+    if reasons:
+        return NEEDS_MORE_REVIEW, "; ".join(reasons)
+    return APPROVED, "no high- or medium-severity bugs or security risks were found and the scores meet the thresholds"
+
+
+def actionable_next_steps(bugs: BugDetectionAgentOutput, quality: CodeQualityAgentOutput,
+                          security: SecurityAgentOutput, limit: int = REPORT_MAX_NEXT_STEPS) -> List[str]:
+    """
+    Prioritized actions: findings by severity (security before bugs at the same level),
+    then code quality suggestions.
+    """
+    steps = []  # (severity rank, kind, text); sorting is stable, so agent order is kept within a rank
+    for f in security.findings:
+        steps.append((SEVERITY_RANK[f.risk_level], 0,
+                      f"Fix the {f.risk_level.lower()}-risk security issue \"{f.title}\" in {_location(f.file, f.line_numbers)}: {f.recommended_mitigation}"))
+    for f in bugs.findings:
+        steps.append((SEVERITY_RANK[f.severity], 1,
+                      f"Fix the {f.severity.lower()}-severity bug in {_location(f.file, f.line_numbers)}: {f.suggested_fix}"))
+    for s in quality.suggestions:
+        steps.append((len(SEVERITY_RANK), 2, f"{s.category}: {s.suggestion} ({_location(s.file, s.line_numbers)})"))
+    steps.sort(key=lambda step: step[:2])
+    texts = [text for _, _, text in steps[:limit]]
+    if len(steps) > limit:
+        texts.append(f"…and {len(steps) - limit} more, listed in the sections above")
+    return texts or ["No changes are required before merging."]
+
+
+def template_committer_feedback(repo_context: RepoContextAgentOutput, quality: CodeQualityAgentOutput,
+                                verdict: str, has_suggestions: bool) -> str:
+    """A plain feedback paragraph for reports rendered without the LLM."""
+    parts = ["Thank you for the contribution!"]
+    if repo_context.pr_message_context_summary:
+        parts.append(f"As we understand it, the goal of this PR is: {repo_context.pr_message_context_summary.strip().rstrip('.')}.")
+    if quality.code_quality_score >= REPORT_MIN_QUALITY_SCORE:
+        parts.append(f"The code is in good shape overall (quality score {quality.code_quality_score}/100).")
+    if verdict == CHANGES_REQUESTED:
+        parts.append("A few issues need to be fixed before this can be merged; they come first in the next steps below.")
+    elif verdict == NEEDS_MORE_REVIEW:
+        parts.append("Some points deserve a closer look before merging; the next steps below list them in order of priority.")
+    elif has_suggestions:
+        parts.append("Nothing blocks merging; the remaining suggestions are optional polish.")
+    else:
+        parts.append("Nothing blocks merging. Nice work!")
+    return " ".join(parts)
+
+
+def render_report(repo_context: RepoContextAgentOutput, bugs: BugDetectionAgentOutput,
+                  quality: CodeQualityAgentOutput, security: SecurityAgentOutput,
+                  alignment: AlignmentAgentOutput, committer_feedback: Optional[str] = None,
+                  unparsed_agents: Sequence[str] = ()) -> str:
+    """
+    Renders the Markdown review report (the sections ReportCompilerAgent_task asks for)
+    straight from the agents' outputs. `committer_feedback` replaces the template's own
+    feedback paragraph, e.g. with one written by a model.
+    """
+    verdict, verdict_reason = compute_verdict(bugs, quality, security, alignment, unparsed_agents)
+    next_steps = actionable_next_steps(bugs, quality, security)
+    bug_severities = [f.severity for f in bugs.findings]
+    risk_levels = [f.risk_level for f in security.findings]
+
+    lines = ["# Pull Request Review", ""]
+
+    lines += ["## Overall Verdict", f"**{verdict}**: {verdict_reason[0].upper()}{verdict_reason[1:]}.", ""]
+
+    lines += ["## Executive Summary"]
+    summary = (f"This PR is classified as **{alignment.pr_nature_classification}** "
+               f"(alignment {alignment.alignment_score}/100) with a code quality score of {quality.code_quality_score}/100. ")
+    summary += f"The review found {_plural(len(bugs.findings), 'potential bug')}"
+    summary += f" ({_severity_counts(bug_severities)})" if bug_severities else ""
+    summary += f" and {_plural(len(security.findings), 'security finding')}"
+    summary += f" ({_severity_counts(risk_levels)})." if risk_levels else "."
+    lines += [summary, ""]
+    if repo_context.pr_message_context_summary:
+        lines += [f"**Stated intent:** {repo_context.pr_message_context_summary.strip()}", ""]
+
+    lines += ["## Code Quality Assessment", f"**Score:** {quality.code_quality_score}/100", ""]
+    if quality.summary_comment:
+        lines += [quality.summary_comment.strip(), ""]
+    if quality.suggestions:
+        lines += ["### Suggestions"]
+        for s in quality.suggestions[:REPORT_MAX_SUGGESTIONS]:
+            lines.append(f"- **{s.category}** in {_location(s.file, s.line_numbers)}: {s.description} *Suggestion:* {s.suggestion}")
+        if len(quality.suggestions) > REPORT_MAX_SUGGESTIONS:
+            lines.append(f"- …and {len(quality.suggestions) - REPORT_MAX_SUGGESTIONS} more")
+        lines.append("")
+
+    lines += ["## Bug Risk Assessment"]
+    if bugs.overall_assessment:
+        lines += [bugs.overall_assessment.strip(), ""]
+    if not bugs.findings:
+        lines += ["No bugs were detected.", ""]
+    for f in sorted(bugs.findings, key=lambda f: SEVERITY_RANK[f.severity]):
+        lines += [f"### {SEVERITY_ICON[f.severity]} {f.severity}: {_location(f.file, f.line_numbers)}", f.description.strip(), ""]
+        lines += _code_block(f.code_snippet)
+        lines += [f"**Suggested fix:** {f.suggested_fix.strip()}", ""]
+
+    lines += ["## Security Assessment"]
+    if security.overall_security_assessment:
+        lines += [security.overall_security_assessment.strip(), ""]
+    if not security.findings:
+        lines += ["No security vulnerabilities were detected.", ""]
+    for f in sorted(security.findings, key=lambda f: SEVERITY_RANK[f.risk_level]):
+        lines += [f"### {SEVERITY_ICON[f.risk_level]} {f.risk_level}: {f.title} in {_location(f.file, f.line_numbers)}", f.explanation.strip(), ""]
+        lines += _code_block(f.code_snippet)
+        lines += [f"**Mitigation:** {f.recommended_mitigation.strip()}", ""]
+
+    lines += ["## Alignment Assessment",
+              f"**Classification:** {alignment.pr_nature_classification}. **Score:** {alignment.alignment_score}/100", "",
+              alignment.justification.strip(), ""]
+    if alignment.potential_misalignment_risks:
+        lines += ["**Potential risks:**"] + [f"- {risk}" for risk in alignment.potential_misalignment_risks] + [""]
+
+    feedback = committer_feedback or template_committer_feedback(
+        repo_context, quality, verdict, bool(bugs.findings or security.findings or quality.suggestions)
+    )
+    lines += ["## Feedback for Committer", feedback.strip(), ""]
+
+    lines += ["## Actionable Next Steps"] + [f"{i}. {step}" for i, step in enumerate(next_steps, 1)]
+    return "\n".join(lines) + "\n"
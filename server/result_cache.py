@@ -0,0 +1,123 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "codesense", "results"))
+
+
+def stable_hash(*parts: Any) -> str:
+    """
+    Hashes JSON-serializable parts into a stable hex digest (dict key order does not matter).
+    """
+    raw = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _safe_name(value: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in value)
+
+
+class ResultCache:
+    """
+    Small JSON result cache with a memory tier in front of a disk tier.
+
+    Entries live at `<dir>/<namespace>/<group>/<key>.json`, where `group` is typically the
+    repository, so everything cached for one repository can be invalidated at once.
+    Entries older than `ttl_seconds` are treated as missing (None/0 disables expiry).
+    """
+
+    def __init__(self, namespace: str, ttl_seconds: Optional[float] = None, max_memory_entries: int = 256,
+                 directory: str = RESULT_CACHE_DIR):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_entries = max_memory_entries
+        self.directory = os.path.join(directory, _safe_name(namespace))
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, group: str, key: str) -> str:
+        return os.path.join(self.directory, _safe_name(group), f"{_safe_name(key)}.json")
+
+    def _expired(self, entry: Dict[str, Any]) -> bool:
+        return bool(self.ttl_seconds) and time.time() - entry["stored_at"] > self.ttl_seconds
+
+    def get(self, group: str, key: str) -> Optional[Any]:
+        memory_key = f"{group}/{key}"
+        with self._lock:
+            entry = self._memory.get(memory_key)
+        if entry is None:
+            try:
+                with open(self._path(group, key), "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                entry = None
+        if entry is None or self._expired(entry):
+            if entry is not None:
+                self.invalidate(group, key)
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self._memory[memory_key] = entry
+            self._memory.move_to_end(memory_key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+            self.hits += 1
+        return entry["value"]
+
+    def put(self, group: str, key: str, value: Any):
+        entry = {"stored_at": time.time(), "value": value}
+        path = self._path(group, key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError) as e:
+            print(f"Warning: Could not persist {self.namespace} cache entry: {e}")
+        with self._lock:
+            self._memory[f"{group}/{key}"] = entry
+            self._memory.move_to_end(f"{group}/{key}")
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def invalidate(self, group: str, key: str):
+        with self._lock:
+            self._memory.pop(f"{group}/{key}", None)
+        try:
+            os.remove(self._path(group, key))
+        except OSError:
+            pass
+
+    def invalidate_group(self, group: str) -> int:
+        """
+        Drops every entry of `group`; returns how many disk entries were removed.
+        """
+        prefix = f"{group}/"
+        with self._lock:
+            for memory_key in [k for k in self._memory if k.startswith(prefix)]:
+                del self._memory[memory_key]
+        group_dir = os.path.join(self.directory, _safe_name(group))
+        removed = len(os.listdir(group_dir)) if os.path.isdir(group_dir) else 0
+        shutil.rmtree(group_dir, ignore_errors=True)
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "ttl_seconds": self.ttl_seconds,
+            }
@@ -1,9 +1,20 @@
 from fastapi import APIRouter, HTTPException
-from typing import Dict, Any
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Dict, Any, Optional
+import json
 from pydantic import BaseModel, Field
 
-from models import PRReviewRequest # Import request/response models
-from controller import run_pr_review_crew # Import the core logic
+from .models import PRReviewRequest # Import request/response models
+from .http_cache import get_http_cache
+from .blob_store import get_blob_store
+from .rate_limiter import get_request_scheduler
+from .github_client import handle_cache_stats
+from .repo_context_cache import get_repo_context_cache, invalidate_repo_context
+from .report_cache import get_report_cache, invalidate_reports
+from .agent_cache import get_agent_cache
+from .llm_executor import get_llm_limiter
+from .pipeline import recent_pipeline_runs
+from .jobs import get_job_manager, ReviewJob, SUCCEEDED, FAILED
 
 router = APIRouter()
 
@@ -13,17 +24,168 @@ class PRReviewResponse(BaseModel):
     """
     report: str = Field(..., description="The comprehensive Pull Request Review Report in Markdown format.")
 
+class ReviewJobResponse(BaseModel):
+    """
+    State of an asynchronous review job. Submissions for a PR whose review is already
+    queued or running at the same head commit share that job.
+    """
+    job_id: str
+    pr_url: str
+    key: str = Field(..., description="owner/repo#number@head_sha the job reviews, with a +incremental suffix for incremental reviews.")
+    status: str = Field(..., description="queued, running, succeeded or failed.")
+    submissions: int = Field(..., description="How many submissions share this job.")
+    incremental: bool = Field(False, description="Whether the job reviews only the commits pushed since the last review.")
+    cached: bool = Field(False, description="Whether the report was served from the report cache.")
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+
+def wrap_report(result: Any) -> Dict[str, str]:
+    if isinstance(result, dict) and "report" in result:
+        return result  # Already in {"report": "markdown"} format
+    # If it's not in the expected format, wrap it
+    return {"report": result}
+
 @router.post("/review-pr", response_model=PRReviewResponse)
 async def review_pull_request(request: PRReviewRequest) -> Dict[str, str]:
     """
     Reviews a GitHub Pull Request and returns a comprehensive analysis report in markdown format.
+    Runs as a review job, so concurrent requests for the same PR head share one review, and
+    a report cached for the same head is returned without running the crews.
+    """
+    try:
+        job = await get_job_manager().submit(request.pr_url, request.bypass_cache, request.refresh, request.incremental)
+        await job.wait()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error reviewing PR: {str(e)}")
+    if job.status == FAILED:
+        raise HTTPException(status_code=500, detail=f"Error reviewing PR: {job.error}")
+    return wrap_report(job.result)
+
+async def job_event_stream(job: ReviewJob) -> AsyncIterator[str]:
+    """
+    Server-sent events for a review job: `job` first, then one event per completed stage
+    (`started`, `fetched`, `repo_context`, `code_quality`, `bug_detection`, `security`,
+    `alignment`, `report`, then `pipeline` with the run's timings), or `failed` if the
+    review errors out.
+    """
+    yield f"event: job\ndata: {json.dumps(job.to_dict())}\n\n"
+    async for stage, data in job.subscribe():
+        yield f"event: {stage}\ndata: {json.dumps(data)}\n\n"
+
+def event_stream_response(job: ReviewJob) -> StreamingResponse:
+    return StreamingResponse(
+        job_event_stream(job),
+        media_type="text/event-stream",
+        # Proxies must pass events through as they come
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.post("/review-pr/stream")
+async def stream_pull_request_review(request: PRReviewRequest) -> StreamingResponse:
+    """
+    Reviews a GitHub Pull Request, streaming each stage's result as a server-sent event
+    as soon as it is available instead of waiting for the final report.
+    """
+    try:
+        job = await get_job_manager().submit(request.pr_url, request.bypass_cache, request.refresh, request.incremental)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error reviewing PR: {str(e)}")
+    return event_stream_response(job)
+
+@router.post("/review-jobs", response_model=ReviewJobResponse, status_code=202)
+async def submit_review_job(request: PRReviewRequest) -> Dict[str, Any]:
+    """
+    Queues a PR review and returns its job without waiting for the report.
+    Poll `GET /review-jobs/{job_id}` and fetch the report from `/review-jobs/{job_id}/result`.
     """
     try:
-        result = await run_pr_review_crew(request.pr_url)
-        if isinstance(result, dict) and "report" in result:
-            return result  # Already in {"report": "markdown"} format
-        else:
-            # If it's not in the expected format, wrap it
-            return {"report": result}
+        job = await get_job_manager().submit(request.pr_url, request.bypass_cache, request.refresh, request.incremental)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error reviewing PR: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error submitting PR review: {str(e)}")
+    return job.to_dict()
+
+@router.get("/review-jobs/{job_id}", response_model=ReviewJobResponse)
+async def get_review_job(job_id: str) -> Dict[str, Any]:
+    """
+    Returns the state of a review job.
+    """
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired review job")
+    return job.to_dict()
+
+@router.get("/review-jobs/{job_id}/events")
+async def stream_review_job_events(job_id: str) -> StreamingResponse:
+    """
+    Streams a review job's progress as server-sent events, replaying the stages already done.
+    """
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired review job")
+    return event_stream_response(job)
+
+@router.get("/review-jobs/{job_id}/result", response_model=PRReviewResponse)
+async def get_review_job_result(job_id: str) -> Dict[str, str]:
+    """
+    Returns the report of a finished review job (409 while it is still queued or running).
+    """
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired review job")
+    if job.status == FAILED:
+        raise HTTPException(status_code=500, detail=f"Error reviewing PR: {job.error}")
+    if job.status != SUCCEEDED:
+        raise HTTPException(status_code=409, detail=f"Review job is {job.status}")
+    return wrap_report(job.result)
+
+@router.get("/stats")
+async def service_stats() -> Dict[str, Any]:
+    """
+    Returns hit/miss counters for the ingestion and review caches, the LLM admission queues
+    and the review job queue.
+    """
+    http_cache = get_http_cache()
+    repo_context_cache = get_repo_context_cache()
+    report_cache = get_report_cache()
+    agent_cache = get_agent_cache()
+    return {
+        "http_cache": http_cache.stats() if http_cache else {"enabled": False},
+        "blob_store": get_blob_store().stats(),
+        "github_rate_limits": get_request_scheduler().stats(),
+        "github_handles": handle_cache_stats(),
+        "repo_context_cache": repo_context_cache.stats() if repo_context_cache else {"enabled": False},
+        "report_cache": report_cache.stats() if report_cache else {"enabled": False},
+        "agent_cache": agent_cache.stats() if agent_cache else {"enabled": False},
+        "llm_admission": get_llm_limiter().stats(),
+        "review_jobs": get_job_manager().stats(),
+    }
+
+@router.get("/pipeline-runs")
+async def pipeline_runs() -> Dict[str, Any]:
+    """
+    Returns the dependency graphs of the most recent review pipelines, newest first, with
+    each node's start/finish offsets and the critical path, for timing analysis.
+    """
+    return {"runs": recent_pipeline_runs()}
+
+@router.delete("/repo-context-cache/{owner}/{repo}")
+async def invalidate_repo_context_cache(owner: str, repo: str) -> Dict[str, Any]:
+    """
+    Drops every cached repository context of a repository, forcing Crew 1 to run again.
+    """
+    return {"invalidated": invalidate_repo_context(f"{owner}/{repo}")}
+
+@router.delete("/report-cache/{owner}/{repo}")
+async def invalidate_report_cache(owner: str, repo: str) -> Dict[str, Any]:
+    """
+    Drops every cached review report of a repository.
+    """
+    return {"invalidated": invalidate_reports(f"{owner}/{repo}")}
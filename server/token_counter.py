@@ -0,0 +1,51 @@
+import os
+
+try:
+    import tiktoken
+except ImportError:  # Optional: exact counts when installed, estimates otherwise
+    tiktoken = None
+
+# Rough characters-per-token ratio of the review models for source code
+CHARS_PER_TOKEN = float(os.getenv("CHARS_PER_TOKEN", "4"))
+# tiktoken encoding used for exact counts (a proxy: the review model's own tokenizer is not public)
+TOKEN_COUNT_ENCODING = os.getenv("TOKEN_COUNT_ENCODING", "cl100k_base")
+
+_encoding = None
+_encoding_loaded = False
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap, tokenizer-free estimate of how many LLM tokens `text` costs.
+    """
+    if not text:
+        return 0
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+
+def _get_encoding():
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        if tiktoken is not None:
+            try:
+                _encoding = tiktoken.get_encoding(TOKEN_COUNT_ENCODING)
+            except Exception as e:
+                print(f"⚠️ Could not load tokenizer '{TOKEN_COUNT_ENCODING}', falling back to estimates: {e}")
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """
+    Token count of `text` with tiktoken when it is installed, otherwise `estimate_tokens`.
+    Slower than the estimate; meant for reporting, not for hot loops.
+    """
+    encoding = _get_encoding()
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def token_counter_name() -> str:
+    """The tokenizer behind `count_tokens` ("estimate" when tiktoken is unavailable)."""
+    return TOKEN_COUNT_ENCODING if _get_encoding() is not None else "estimate"
@@ -0,0 +1,165 @@
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from .diff_parser import ParsedPatch
+
+TRIAGE_ENABLED = os.getenv("TRIAGE_ENABLED", "true").lower() in ("1", "true", "yes")
+# Extra comma-separated globs to exclude, on top of DEFAULT_EXCLUDE_GLOBS
+TRIAGE_EXCLUDE_GLOBS = [g.strip() for g in os.getenv("TRIAGE_EXCLUDE_GLOBS", "").split(",") if g.strip()]
+# Changes larger than this many added+removed lines are summarized rather than reviewed
+TRIAGE_MAX_CHANGED_LINES = int(os.getenv("TRIAGE_MAX_CHANGED_LINES", "5000"))
+# Base files larger than this are not downloaded
+TRIAGE_MAX_FILE_BYTES = int(os.getenv("TRIAGE_MAX_FILE_BYTES", str(1024 * 1024)))
+# Added lines this long (or this long on average) mark minified or generated output
+TRIAGE_MAX_LINE_LENGTH = int(os.getenv("TRIAGE_MAX_LINE_LENGTH", "1000"))
+TRIAGE_MAX_AVERAGE_LINE_LENGTH = int(os.getenv("TRIAGE_MAX_AVERAGE_LINE_LENGTH", "300"))
+
+# (glob, reason). Globs without "/" match the file name at any depth.
+DEFAULT_EXCLUDE_GLOBS: List[Tuple[str, str]] = [
+    *[(name, "lockfile") for name in (
+        "package-lock.json", "npm-shrinkwrap.json", "yarn.lock", "pnpm-lock.yaml", "bun.lockb",
+        "poetry.lock", "Pipfile.lock", "pdm.lock", "uv.lock", "Cargo.lock", "composer.lock",
+        "Gemfile.lock", "go.sum", "mix.lock", "pubspec.lock", "packages.lock.json", "flake.lock",
+    )],
+    *[(pattern, "minified or source map") for pattern in ("*.min.js", "*.min.css", "*.min.mjs", "*.map")],
+    *[(pattern, "test snapshot") for pattern in ("*.snap", "**/__snapshots__/**")],
+    *[(pattern, "vendored") for pattern in (
+        "vendor/**", "**/vendor/**", "third_party/**", "**/third_party/**", "node_modules/**", "**/node_modules/**",
+    )],
+    *[(pattern, "generated") for pattern in (
+        "*_pb2.py", "*_pb2_grpc.py", "*.pb.go", "*.pb.cc", "*.pb.h", "*.generated.*", "*.g.dart",
+        "dist/**", "build/**",
+    )],
+    *[(f"*.{ext}", "binary") for ext in (
+        "png", "jpg", "jpeg", "gif", "bmp", "ico", "webp", "pdf", "zip", "gz", "tgz", "bz2", "xz", "7z",
+        "jar", "war", "whl", "egg", "exe", "dll", "so", "dylib", "a", "o", "pyc", "class", "wasm",
+        "woff", "woff2", "ttf", "otf", "eot", "mp3", "mp4", "mov", "avi", "webm", "sqlite", "db",
+    )],
+]
+
+# .gitattributes attributes that mark a path as not worth reviewing
+_GITATTRIBUTE_REASONS = {
+    "linguist-generated": "generated",
+    "linguist-vendored": "vendored",
+    "binary": "binary",
+}
+
+
+def _glob_to_regex(pattern: str, ignore_case: bool = False) -> "re.Pattern":
+    """
+    gitignore-style glob: `**` spans directories, `*` and `?` stay within one path segment,
+    and a pattern without "/" matches the file name at any depth.
+    """
+    anchored = "/" in pattern.rstrip("/")
+    pattern = pattern.lstrip("/")
+    out = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            out.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            out.append("[^/]")
+            i += 1
+        else:
+            out.append(re.escape(pattern[i]))
+            i += 1
+    prefix = "" if anchored else "(?:.*/)?"
+    return re.compile(f"^{prefix}{''.join(out)}$", re.IGNORECASE if ignore_case else 0)
+
+
+def parse_gitattributes(text: str) -> List[Tuple[str, str]]:
+    """
+    Extracts (pattern, reason) rules for generated/vendored/binary paths from a `.gitattributes` file.
+    Later lines win, as in git, so an explicit `-linguist-generated` re-includes a path.
+    """
+    rules = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        pattern, *attributes = line.split()
+        for attribute in attributes:
+            name, _, value = attribute.partition("=")
+            unset = name.startswith("-") or name.startswith("!") or value.lower() == "false"
+            reason = _GITATTRIBUTE_REASONS.get(name.lstrip("-!"))
+            if reason is not None:
+                rules.append((pattern, "" if unset else reason))
+    return rules
+
+
+@dataclass
+class FileTriage:
+    """
+    Rule-driven filter deciding, before any content is fetched, which changed files the
+    agents should not see. Excluded files are reported with a one-line reason.
+    """
+    exclude_globs: List[Tuple[str, str]] = field(default_factory=lambda: DEFAULT_EXCLUDE_GLOBS + [(g, "excluded by configuration") for g in TRIAGE_EXCLUDE_GLOBS])
+    attribute_rules: List[Tuple[str, str]] = field(default_factory=list)
+    max_changed_lines: int = TRIAGE_MAX_CHANGED_LINES
+    max_file_bytes: int = TRIAGE_MAX_FILE_BYTES
+    max_line_length: int = TRIAGE_MAX_LINE_LENGTH
+    max_average_line_length: int = TRIAGE_MAX_AVERAGE_LINE_LENGTH
+
+    def __post_init__(self):
+        # Exclusion globs ignore case (logo.PNG); .gitattributes matching is case-sensitive, like git's
+        self._globs = [(_glob_to_regex(p, ignore_case=True), r) for p, r in self.exclude_globs]
+        self._attributes = [(_glob_to_regex(p), r) for p, r in self.attribute_rules]
+
+    @classmethod
+    def for_repository(cls, gitattributes: Optional[str] = None) -> "FileTriage":
+        return cls(attribute_rules=parse_gitattributes(gitattributes) if gitattributes else [])
+
+    def path_reason(self, path: str) -> Optional[str]:
+        """Exclusion reason from the path alone (globs, then `.gitattributes`), or None."""
+        attribute_reason = None
+        for regex, rule_reason in self._attributes:
+            if regex.match(path):
+                attribute_reason = rule_reason
+        if attribute_reason is not None:
+            # An explicitly unset attribute (`-linguist-generated`) also overrides the default globs
+            return f"{attribute_reason} (.gitattributes)" if attribute_reason else None
+        for regex, rule_reason in self._globs:
+            if regex.match(path):
+                return rule_reason
+        return None
+
+    def change_reason(self, status: str, changes: int, parsed: Optional[ParsedPatch],
+                      base_size: Optional[int] = None) -> Optional[str]:
+        """
+        Exclusion reason from the change itself (`parsed` is None when there is no patch), or None.
+        """
+        if parsed is None or not parsed.hunks:
+            if status == "renamed" and not changes:
+                return "renamed without content changes"
+            if not changes:
+                return "binary or mode-only change"
+        if changes > self.max_changed_lines:
+            return f"too large to review ({changes} changed lines)"
+        if base_size is not None and status != "added" and base_size > self.max_file_bytes:
+            return f"base file too large ({base_size} bytes)"
+        if parsed is not None:
+            lengths = [len(line) - 1 for run in parsed.added_runs() for line in run.raw_lines]
+            if lengths and (max(lengths) > self.max_line_length
+                            or sum(lengths) / len(lengths) > self.max_average_line_length):
+                return f"looks minified or generated (lines up to {max(lengths)} characters)"
+        return None
+
+    def exclusion_reason(self, path: str, status: str, changes: int, parsed: Optional[ParsedPatch],
+                         base_size: Optional[int] = None) -> Optional[str]:
+        return self.path_reason(path) or self.change_reason(status, changes, parsed, base_size)
+
+
+def summarize_skipped(file_change: Dict) -> str:
+    """One-line summary standing in for a file the agents do not see."""
+    return (f"{file_change['file']} ({file_change.get('status', 'modified')}, "
+            f"+{file_change.get('additions', 0)}/-{file_change.get('deletions', 0)}): "
+            f"not reviewed, {file_change['skipped']}")
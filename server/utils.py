@@ -1,31 +1,32 @@
 import os
 import re
-import requests
 import json
-from github import Github, UnknownObjectException, GithubException
-from langchain_community.document_loaders import GithubFileLoader
-import tempfile
-import subprocess
-from typing import List, Dict, Any, Optional, Literal
-
-GITHUB_API = "https://api.github.com"
-
-# --- GitHub Client ---
-def get_github_client():
-    # Ensure dotenv is loaded here if this file is run independently for testing,
-    # otherwise, it can be loaded in main.py once.
-    # from dotenv import load_dotenv
-    # load_dotenv()
-    token = os.getenv("GITHUB_TOKEN")
-    return Github(token) if token else Github()
-
-# --- Get Repo Object ---
-def get_repo(repo_full_name: str):
-    try:
-        client = get_github_client()
-        return client.get_repo(repo_full_name)
-    except GithubException as e:
-        raise Exception(f"Failed to access repository '{repo_full_name}': {e}")
+import base64
+import asyncio
+import requests
+from urllib.parse import quote
+from typing import Callable, Iterable, List, Dict, Any, Optional, Tuple
+
+from .github_http import GITHUB_API, github_get, iter_github_items, fetch_git_blob, iter_pr_diff_lines, iter_compare_diff_lines
+from .rate_limiter import get_request_scheduler
+from .content_fetcher import BaseContentFetcher, log_slowest_fetches
+from .blob_store import get_blob_store
+from .git_mirror import GitMirror, GitMirrorError, find_readme_path
+from .diff_parser import ParsedPatch, parse_patch, collect_file_patches
+from .context_extractor import CONTEXT_EXTRACTION_MODE, extract_context
+from .triage import TRIAGE_ENABLED, FileTriage, summarize_skipped
+from .fetch_planner import FETCH, FROM_PATCH, plan_base_fetch, content_from_patch, summarize_plans
+from .payload_encoding import PAYLOAD_COMPARE_ENCODINGS, PAYLOAD_ENCODING, encode_payload, compare_encodings
+from .token_counter import estimate_tokens, token_counter_name
+from .pipeline import Pipeline
+
+# "api" fetches everything through the GitHub REST API; "git" reads diffs, base contents
+# and trees from a local bare mirror updated with `git fetch`.
+INGESTION_BACKEND = os.getenv("INGESTION_BACKEND", "api").lower()
+
+# Optional bounds on how much of a PR's file listing is read (unset = read everything)
+PR_MAX_FILES = int(os.getenv("PR_MAX_FILES")) if os.getenv("PR_MAX_FILES") else None
+PR_MAX_LISTING_BYTES = int(os.getenv("PR_MAX_LISTING_BYTES")) if os.getenv("PR_MAX_LISTING_BYTES") else None
 
 def parse_github_pr_url(pr_url: str):
     """
@@ -39,155 +40,295 @@ def parse_github_pr_url(pr_url: str):
         raise ValueError("Invalid GitHub PR URL")
     return match.group("owner"), match.group("repo"), int(match.group("pr_number"))
 
-def chunk_diff(patch: str):
-    """
-    Extracts both added and removed lines from a unified diff patch.
-    Returns two lists: added_chunks and removed_chunks
-    """
-    added_chunks = []
-    removed_chunks = []
-
-    if not patch:
-        return added_chunks, removed_chunks
-
-    lines = patch.split('\n')
-    added_chunk = []
-    removed_chunk = []
-    added_lines = []
-    removed_lines = []
-
-    old_line = new_line = 0
-
-    for line in lines:
-        # Start of a diff hunk
-        if line.startswith('@@'):
-            if added_chunk:
-                added_chunks.append({
-                    "lines": added_lines,
-                    "code": "\n".join(added_chunk)
-                })
-                added_chunk = []
-                added_lines = []
-
-            if removed_chunk:
-                removed_chunks.append({
-                    "lines": removed_lines,
-                    "code": "\n".join(removed_chunk)
-                })
-                removed_chunk = []
-                removed_lines = []
-
-            match = re.match(r"@@ -(\d+),?\d* \+(\d+),?\d* @@", line)
-            if match:
-                old_line = int(match.group(1))
-                new_line = int(match.group(2))
-        elif line.startswith('+') and not line.startswith('+++'):
-            added_chunk.append(line[1:])
-            added_lines.append(new_line)
-            new_line += 1
-        elif line.startswith('-') and not line.startswith('---'):
-            removed_chunk.append(line[1:])
-            removed_lines.append(old_line)
-            old_line += 1
-        else:
-            # Context line
-            if added_chunk:
-                added_chunks.append({
-                    "lines": added_lines,
-                    "code": "\n".join(added_chunk)
-                })
-                added_chunk = []
-                added_lines = []
-            if removed_chunk:
-                removed_chunks.append({
-                    "lines": removed_lines,
-                    "code": "\n".join(removed_chunk)
-                })
-                removed_chunk = []
-                removed_lines = []
-            old_line += 1
-            new_line += 1
-
-    # Final pending chunks
-    if added_chunk:
-        added_chunks.append({
-            "lines": added_lines,
-            "code": "\n".join(added_chunk)
-        })
-    if removed_chunk:
-        removed_chunks.append({
-            "lines": removed_lines,
-            "code": "\n".join(removed_chunk)
-        })
+def fetch_pr_metadata(repo_owner: str, repo_name: str, pr_number: int, token: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Fetches the PR object (title, body, base/head refs and SHAs).
+    """
+    return github_get(f"{GITHUB_API}/repos/{repo_owner}/{repo_name}/pulls/{pr_number}", token=token).json()
 
-    return added_chunks, removed_chunks
+# GitHub lists at most this many files in a compare response
+COMPARE_MAX_FILES = 300
 
+def fetch_pr_compare(repo_owner: str, repo_name: str, base_sha: str, head_sha: str,
+                     token: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    The first page of the compare of a PR's base and head commits: `merge_base_commit`,
+    the commit the PR's patches are against (three-dot), and up to COMPARE_MAX_FILES
+    changed files at exactly `head_sha`. Returns None when the compare fails.
+    """
+    try:
+        # One commit per page: the files are listed on the first page regardless
+        return github_get(f"{GITHUB_API}/repos/{repo_owner}/{repo_name}/compare/{base_sha}...{head_sha}",
+                          token=token, params={"per_page": 1}).json()
+    except Exception as e:
+        print(f"Warning: Could not compare {base_sha[:7]}...{head_sha[:7]}: {e}")
+        return None
 
-def fetch_pr_diff_and_content(repo_owner: str, repo_name: str, pr_number: int, token: Optional[str] = None):
+def decode_file_content(filename: str, data: bytes) -> str:
     """
-    Fetches PR file changes (diffs) and their original content.
-    Returns a list of dictionaries, each containing file, original_content, added, and removed.
+    Decodes raw file bytes as text, or returns a placeholder for binary files.
     """
-    headers = {}
-    if token:
-        headers["Authorization"] = f"Bearer {token}"
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        # Handle files that can't be decoded as UTF-8 text
+        print(f"Note: File {filename} appears to be binary, skipping content extraction")
+        return "[Binary file content not shown]"
 
+def get_tree_blob_shas(repo_owner: str, repo_name: str, commit_sha: str, token: Optional[str] = None) -> Tuple[Dict[str, str], Dict[str, int], bool]:
+    """
+    Maps every file path at `commit_sha` to its git blob SHA and to its size in bytes.
+    Also returns whether GitHub truncated the listing (very large trees), in which case
+    a missing path does not mean the file is absent.
+    """
+    tree = github_get(f"{GITHUB_API}/repos/{repo_owner}/{repo_name}/git/trees/{commit_sha}",
+                      token=token, params={"recursive": "1"}).json()
+    if tree.get("truncated"):
+        print(f"Note: Tree listing for {repo_owner}/{repo_name}@{commit_sha} is truncated; some files will be fetched by path")
+    blobs = [entry for entry in tree.get("tree", []) if entry.get("type") == "blob"]
+    blob_shas = {entry["path"]: entry["sha"] for entry in blobs}
+    blob_sizes = {entry["path"]: entry.get("size", 0) for entry in blobs}
+    return blob_shas, blob_sizes, bool(tree.get("truncated"))
+
+def fetch_file_bytes_at(repo_owner: str, repo_name: str, path: str, ref: str, token: Optional[str] = None) -> bytes:
+    content = github_get(f"{GITHUB_API}/repos/{repo_owner}/{repo_name}/contents/{quote(path)}",
+                         token=token, params={"ref": ref}).json()
+    if content.get("encoding") != "base64":
+        raise ValueError(f"Unsupported content encoding '{content.get('encoding')}'")
+    return base64.b64decode(content.get("content", ""))
+
+def load_base_file_content(repo_owner: str, repo_name: str, base_sha: str, filename: str,
+                           blob_shas: Dict[str, str], tree_truncated: bool = False,
+                           token: Optional[str] = None) -> str:
+    """
+    Returns the text of `filename` at the base commit.
+    Files are resolved to their blob SHA and served from the content-addressed blob store,
+    so an unchanged base file is downloaded once per repository version, not once per PR.
+    """
+    blob_sha = blob_shas.get(filename)
+    if blob_sha is None:
+        if not tree_truncated:
+            raise FileNotFoundError(f"{filename} does not exist at {base_sha}")
+        data = fetch_file_bytes_at(repo_owner, repo_name, filename, base_sha, token)
+    else:
+        data = get_blob_store().get_or_fetch(
+            blob_sha, lambda: fetch_git_blob(repo_owner, repo_name, blob_sha, token)
+        )
+    return decode_file_content(filename, data)
+
+def diff_fields(parsed: ParsedPatch) -> Dict[str, Any]:
+    """
+    The diff part of a file change: added/removed chunks plus the base-file line spans
+    the hunks touch (used to extract the relevant base context).
+    """
+    added_chunks, removed_chunks = parsed.to_chunks()
+    return {"added": added_chunks, "removed": removed_chunks, "base_spans": parsed.base_spans()}
+
+def log_skipped_files(file_changes: List[Dict[str, Any]]):
+    skipped = [fc for fc in file_changes if "skipped" in fc]
+    if skipped:
+        print(f"✂️ Triage left {len(skipped)} of {len(file_changes)} changed files out of the review:")
+        for file_change in skipped:
+            print(f"   • {summarize_skipped(file_change)}")
+
+def fill_patches_from_raw_diff(diff_lines: Callable[[], Iterable[bytes]], file_changes: Dict[str, Dict[str, Any]],
+                               label: str):
+    """
+    Fills the added/removed chunks of `file_changes` (file change dicts keyed by filename)
+    from a raw `.diff` (`diff_lines()`, e.g. the PR's), streamed and parsed hunk by hunk;
+    hunks of other files are discarded as they are parsed.
+    """
+    try:
+        patches = collect_file_patches(diff_lines(), paths=file_changes)
+    except requests.RequestException as e:
+        # GitHub refuses the diff media type for extremely large diffs (406)
+        print(f"Warning: Could not stream the raw diff of {label}: {e}")
+        return
+    for filename, file_change in file_changes.items():
+        parsed = patches.get(filename)
+        if parsed is None:
+            print(f"Warning: {filename} has no hunks in the raw diff of {label}")
+            continue
+        file_change.update(diff_fields(parsed))
+
+def cap_file_records(records: List[Dict[str, Any]], max_files: Optional[int] = None,
+                     max_bytes: Optional[int] = None, label: str = "file listing") -> List[Dict[str, Any]]:
+    """
+    The leading `records` of an already downloaded files listing, within the same bounds the
+    paginated listing applies: at most `max_files` records, and records are kept until their
+    JSON size reaches `max_bytes` (the record that reaches it is kept, as a page would be).
+    """
+    if max_files is not None:
+        records = records[:max_files]
+    if max_bytes is None:
+        return records
+    kept, read_bytes = [], 0
+    for record in records:
+        if read_bytes >= max_bytes:
+            print(f"⚠️ Stopped reading {label} after {read_bytes} bytes (limit {max_bytes}); results are truncated.")
+            break
+        kept.append(record)
+        read_bytes += len(json.dumps(record))
+    return kept
+
+def fetch_pr_diff_and_content(repo_owner: str, repo_name: str, pr_number: int, token: Optional[str] = None,
+                              max_concurrency: Optional[int] = None, max_files: Optional[int] = PR_MAX_FILES,
+                              max_listing_bytes: Optional[int] = PR_MAX_LISTING_BYTES,
+                              pr_data: Optional[Dict[str, Any]] = None):
+    """
+    Fetches PR file changes (diffs) and their original content.
+    The changes are read at the head commit of `pr_data` (the PR object, fetched when not
+    given), so they match the SHA the review caches are keyed on, and base contents at the
+    merge-base the PR's patches are against. PRs with more files than a compare lists are
+    read from the PR files listing, which follows the PR's current head.
+    The file listing is streamed page by page; each file's diff is chunked and its base
+    content download started as soon as its record arrives. Base contents are downloaded
+    in parallel (at most `max_concurrency` at a time). `max_files` / `max_listing_bytes`
+    optionally bound how much of a very large PR is read, on either listing.
+    Files are triaged before anything is downloaded for them: generated, vendored, lockfile
+    and binary changes get a `skipped` reason instead of content (see triage.py). For the
+    rest, the file status decides whether base content is needed and from which path:
+    added files have none, renamed files are read from their previous path and deleted
+    files are rebuilt from their patch (see fetch_planner.py).
+    Returns a list of dictionaries, each containing file, previous_file (renames), status,
+    additions, deletions, original_content, added, removed, base_spans, content_fetch_seconds
+    and, for excluded files, skipped, in the same order as the PR file listing.
+    """
+    if pr_data is None:
+        pr_data = fetch_pr_metadata(repo_owner, repo_name, pr_number, token)
+    base_sha, head_sha = pr_data["base"]["sha"], pr_data["head"]["sha"]
+    # Pin to commits, not the moving branches, so contents are content-addressable. Base
+    # contents are read at the merge-base, as in the git backend, not the base branch tip
+    compare = fetch_pr_compare(repo_owner, repo_name, base_sha, head_sha, token)
+    merge_base = compare["merge_base_commit"]["sha"] if compare else base_sha
+    compared_files = compare.get("files", []) if compare else []
+    if compare is not None and len(compared_files) < COMPARE_MAX_FILES:
+        return ingest_file_records(
+            repo_owner, repo_name, merge_base,
+            cap_file_records(compared_files, max_files, max_listing_bytes, f"the compare of PR #{pr_number}"),
+            lambda: iter_compare_diff_lines(repo_owner, repo_name, base_sha, head_sha, token), f"PR #{pr_number}",
+            token=token, max_concurrency=max_concurrency,
+        )
+
+    print(f"Note: PR #{pr_number} is listed at its current head, which may have moved past {head_sha[:7]}")
     files_url = f"{GITHUB_API}/repos/{repo_owner}/{repo_name}/pulls/{pr_number}/files"
-    response = requests.get(files_url, headers=headers)
-    response.raise_for_status()
-    files_data = response.json()
+    return ingest_file_records(
+        repo_owner, repo_name, merge_base,
+        iter_github_items(files_url, token=token, max_items=max_files, max_bytes=max_listing_bytes),
+        lambda: iter_pr_diff_lines(repo_owner, repo_name, pr_number, token), f"PR #{pr_number}",
+        token=token, max_concurrency=max_concurrency,
+    )
 
-    repo = get_repo(f"{repo_owner}/{repo_name}")
-    pr = repo.get_pull(pr_number)
+def ingest_file_records(repo_owner: str, repo_name: str, base_sha: str, file_records: Iterable[Dict[str, Any]],
+                        raw_diff_lines: Callable[[], Iterable[bytes]], label: str,
+                        token: Optional[str] = None, max_concurrency: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    The body of `fetch_pr_diff_and_content` for any files-API listing (`file_records`) of
+    changes against `base_sha`: PR files, or the files of a compare between two commits.
+    `raw_diff_lines()` streams the matching raw diff for files whose `patch` is left out.
+    """
+    blob_shas, blob_sizes, tree_truncated = get_tree_blob_shas(repo_owner, repo_name, base_sha, token)
+    triage = None
+    if TRIAGE_ENABLED:
+        gitattributes = None
+        if ".gitattributes" in blob_shas:
+            try:
+                gitattributes = load_base_file_content(repo_owner, repo_name, base_sha, ".gitattributes", blob_shas, tree_truncated, token)
+            except Exception as e:
+                print(f"Warning: Could not read .gitattributes, triaging without it: {e}")
+        triage = FileTriage.for_repository(gitattributes)
 
     all_file_changes = []
-    for file_info in files_data:
-        filename = file_info['filename']
-        patch = file_info.get('patch')
-
-        original_content = ""
-        try:
-            # Try to get the content of the file from the base branch before the PR
-            content_obj = repo.get_contents(filename, ref=pr.base.ref)
-            # Check if the content is not binary (can be decoded as text)
-            if content_obj.encoding == 'base64':
-                try:
-                    original_content = content_obj.decoded_content.decode('utf-8')
-                except UnicodeDecodeError:
-                    # Handle files that can't be decoded as UTF-8 text
-                    print(f"Note: File {filename} appears to be binary, skipping content extraction")
-                    original_content = "[Binary file content not shown]"
-            else:
-                print(f"Warning: Unsupported encoding '{content_obj.encoding}' for {filename}")
-                original_content = f"[Content with encoding {content_obj.encoding} not shown]"
-        except Exception as e:
-            print(f"Warning: Could not fetch original content for {filename} from base branch: {e}")
-            original_content = "" # Or handle as appropriate
-
-        added_chunks, removed_chunks = chunk_diff(patch) if patch else ([], [])
-
-        all_file_changes.append({
-            "file": filename,
-            "original_content": original_content,
-            "added": added_chunks,
-            "removed": removed_chunks
-        })
+    fetched_changes = []
+    plans = []
+    # Files whose `patch` GitHub left out of the listing although they have line changes
+    # (too large for the files API); their hunks are read from the streamed raw diff
+    missing_patches: Dict[str, Dict[str, Any]] = {}
+    # Try to get the content of each file from the base branch before the PR
+    with BaseContentFetcher(lambda base_path: load_base_file_content(repo_owner, repo_name, base_sha, base_path, blob_shas, tree_truncated, token),
+                            max_concurrency=max_concurrency) as fetcher:
+        for file_info in file_records:
+            filename = file_info['filename']
+            patch = file_info.get('patch')
+            file_change = {
+                "file": filename,
+                "previous_file": file_info.get("previous_filename"),
+                "status": file_info.get("status", "modified"),
+                "additions": file_info.get("additions", 0),
+                "deletions": file_info.get("deletions", 0),
+                "original_content": "",
+                "content_fetch_seconds": 0.0
+            }
+            all_file_changes.append(file_change)
+
+            # Triage runs before anything is downloaded for the file
+            skip_reason = triage.path_reason(filename) if triage else None
+            parsed = parse_patch(patch) if patch and not skip_reason else None
+            plan = plan_base_fetch(file_info, parsed)
+            if triage and not skip_reason:
+                base_size = blob_sizes.get(plan.base_path) if plan.base_path else None
+                skip_reason = triage.change_reason(file_change["status"], file_info.get("changes", 0), parsed, base_size)
+            file_change.update(diff_fields(parsed or ParsedPatch([])))
+            if skip_reason:
+                file_change["skipped"] = skip_reason
+                continue
+
+            # Only base contents that are needed, from the path they had at the base commit
+            plans.append(plan)
+            if plan.action == FETCH:
+                fetcher.submit(plan.base_path)
+                fetched_changes.append(file_change)
+            elif plan.action == FROM_PATCH:
+                file_change["original_content"] = content_from_patch(parsed)
+            if not patch and file_info.get("changes"):
+                missing_patches[filename] = file_change
+
+        if missing_patches:
+            # Parsed while the base contents are still downloading
+            fill_patches_from_raw_diff(raw_diff_lines, missing_patches, label)
+        content_results = fetcher.results()
+    log_slowest_fetches(content_results)
+
+    log_skipped_files(all_file_changes)
+    print(f"📥 Base contents: {summarize_plans(plans)}")
+    for file_change, content_result in zip(fetched_changes, content_results):
+        if content_result.error:
+            print(f"Warning: Could not fetch original content for {file_change['file']} from base branch: {content_result.error}")
+        file_change["original_content"] = content_result.content
+        file_change["content_fetch_seconds"] = round(content_result.elapsed, 3)
     return all_file_changes
 
-def fetch_pr_conversation(repo_owner: str, repo_name: str, pr_number: int, token: Optional[str] = None):
+def fetch_compare_diff_and_content(repo_owner: str, repo_name: str, base: str, head: str,
+                                   token: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+    """
+    File changes (as `fetch_pr_diff_and_content` returns them) between two commits, with
+    base contents read at `base`. Returns None when `head` does not descend from `base`
+    (force-push or rebase) or the compare is too large to list completely.
+    """
+    compare = github_get(f"{GITHUB_API}/repos/{repo_owner}/{repo_name}/compare/{base}...{head}", token=token).json()
+    if compare.get("status") not in ("ahead", "identical"):
+        print(f"Note: {head} does not descend from {base} ({compare.get('status')})")
+        return None
+    files = compare.get("files", [])
+    if len(files) >= COMPARE_MAX_FILES:
+        print(f"Note: {base}...{head} changes too many files to compare")
+        return None
+    return ingest_file_records(
+        repo_owner, repo_name, base, files,
+        lambda: iter_compare_diff_lines(repo_owner, repo_name, base, head, token), f"{base[:7]}...{head[:7]}",
+        token=token,
+    )
+
+def fetch_pr_conversation(repo_owner: str, repo_name: str, pr_number: int, token: Optional[str] = None,
+                          pr_data: Optional[Dict[str, Any]] = None):
     """
     Fetches the initial PR message and subsequent comments.
     Returns a list of dicts, including 'body' for the main PR message.
+    The initial message comes from `pr_data` (the PR object) when given.
     """
-    headers = {}
-    if token:
-        headers["Authorization"] = f"Bearer {token}"
-
     # Fetch main PR details for the initial message
-    pr_url = f"{GITHUB_API}/repos/{repo_owner}/{repo_name}/pulls/{pr_number}"
-    pr_response = requests.get(pr_url, headers=headers)
-    pr_response.raise_for_status()
-    pr_data = pr_response.json()
+    if pr_data is None:
+        pr_data = fetch_pr_metadata(repo_owner, repo_name, pr_number, token)
 
     conversation_messages = []
     if pr_data.get("body"):
@@ -199,11 +340,7 @@ def fetch_pr_conversation(repo_owner: str, repo_name: str, pr_number: int, token
 
     # Fetch comments (optional, but good for full context)
     comments_url = f"{GITHUB_API}/repos/{repo_owner}/{repo_name}/issues/{pr_number}/comments"
-    comments_response = requests.get(comments_url, headers=headers)
-    comments_response.raise_for_status()
-    comments_data = comments_response.json()
-
-    for comment in comments_data:
+    for comment in iter_github_items(comments_url, token=token):
         conversation_messages.append({
             "user": comment["user"]["login"],
             "created_at": comment.get("created_at"),
@@ -211,25 +348,30 @@ def fetch_pr_conversation(repo_owner: str, repo_name: str, pr_number: int, token
         })
     return conversation_messages
 
-def get_repository_structure_and_content(repo_owner: str, repo_name: str, branch: str = "HEAD", token: Optional[str] = None):
+def get_repository_snapshot(repo_owner: str, repo_name: str, branch: str = "HEAD", token: Optional[str] = None) -> Dict[str, str]:
     """
-    Fetches the repository structure (file paths) and README.md content.
-    For more comprehensive repo content, this might need cloning or deeper API calls.
+    Fetches the repository structure (file paths) and README.md content at `branch`,
+    together with the SHA of the tree they were read from.
     """
-    repo = get_repo(f"{repo_owner}/{repo_name}")
-    
+    repo_api = f"{GITHUB_API}/repos/{repo_owner}/{repo_name}"
+
     # Fetch repository structure (file paths)
-    tree = repo.get_git_tree(sha=branch, recursive=True)
-    repository_structure = "\n".join([f.path for f in tree.tree if f.type == 'blob'])
+    tree = github_get(f"{repo_api}/git/trees/{branch}", token=token, params={"recursive": "1"}).json()
+    repository_structure = "\n".join([f["path"] for f in tree.get("tree", []) if f.get("type") == 'blob'])
 
     # Fetch README.md content
     readme_content = ""
     try:
-        readme = repo.get_readme()
-        readme_content = readme.decoded_content.decode('utf-8')
-    except UnknownObjectException:
-        print("No README.md found in the repository.")
-        readme_content = "No README.md available."
+        readme_params = None if branch == "HEAD" else {"ref": branch}
+        readme = github_get(f"{repo_api}/readme", token=token, params=readme_params).json()
+        readme_content = base64.b64decode(readme.get("content", "")).decode('utf-8')
+    except requests.HTTPError as e:
+        if e.response is not None and e.response.status_code == 404:
+            print("No README.md found in the repository.")
+            readme_content = "No README.md available."
+        else:
+            print(f"Error fetching README.md: {e}")
+            readme_content = "Error fetching README.md content."
     except Exception as e:
         print(f"Error fetching README.md: {e}")
         readme_content = "Error fetching README.md content."
@@ -238,80 +380,340 @@ def get_repository_structure_and_content(repo_owner: str, repo_name: str, branch
     # You could add other important files here, e.g., package.json, requirements.txt
     # by fetching them similarly.
 
-    return repository_structure, repository_contents
+    return {
+        "tree_sha": tree.get("sha", ""),
+        "repository_structure": repository_structure,
+        "repository_contents": repository_contents,
+    }
 
-async def prepare_agent_inputs_from_pr_url(pr_url: str) -> Dict[str, Any]:
+def get_repository_structure_and_content(repo_owner: str, repo_name: str, branch: str = "HEAD", token: Optional[str] = None):
     """
-    Prepares all inputs needed for PR review agents from a GitHub PR URL.
+    Fetches the repository structure (file paths) and README.md content.
+    For more comprehensive repo content, this might need cloning or deeper API calls.
+    """
+    snapshot = get_repository_snapshot(repo_owner, repo_name, branch, token)
+    return snapshot["repository_structure"], snapshot["repository_contents"]
+
+# --- Local git mirror backend ---
+def get_repository_snapshot_from_mirror(mirror: GitMirror, commit: str) -> Dict[str, str]:
     """
+    Mirror-backed equivalent of `get_repository_snapshot`.
+    """
+    tree_sha, blob_shas = mirror.list_tree(commit)
+    readme_path = find_readme_path(blob_shas)
+    if readme_path:
+        readme_content = decode_file_content(readme_path, mirror.read_blobs([blob_shas[readme_path]]).get(blob_shas[readme_path], b""))
+    else:
+        print("No README.md found in the repository.")
+        readme_content = "No README.md available."
+    return {
+        "tree_sha": tree_sha,
+        "repository_structure": "\n".join(blob_shas),
+        "repository_contents": f"README.md:\n{readme_content}\n\n",
+    }
+
+def ingest_pr_from_mirror(repo_owner: str, repo_name: str, pr_number: int, pr_data: Dict[str, Any],
+                          token: Optional[str] = None, remote_url: Optional[str] = None):
+    """
+    Builds the same file changes as `fetch_pr_diff_and_content` and the same snapshot as
+    `get_repository_snapshot` from a local mirror: one incremental fetch plus local reads.
+    Diffs are taken against the merge base, like GitHub's PR diff, and base contents are read
+    from the merge base so their line numbers match the removed lines.
+    Returns (file_changes, repository_snapshot).
+    """
+    mirror = GitMirror(repo_owner, repo_name, token=token or get_request_scheduler().best_token(), remote_url=remote_url)
+    base_sha, head_sha = mirror.fetch_pull_request(
+        pr_number, pr_data["base"]["ref"], pr_data["base"]["sha"], pr_data["head"]["sha"]
+    )
+    merge_base = mirror.merge_base(base_sha, head_sha)
+    return ingest_range_from_mirror(mirror, merge_base, head_sha), get_repository_snapshot_from_mirror(mirror, base_sha)
+
+def ingest_push_from_mirror(repo_owner: str, repo_name: str, pr_number: int, pr_data: Dict[str, Any],
+                            previous_head_sha: str, token: Optional[str] = None,
+                            remote_url: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+    """
+    File changes between a previously reviewed head and the PR's current head, from the
+    mirror. Returns None when the current head does not descend from the previous one.
+    """
+    mirror = GitMirror(repo_owner, repo_name, token=token or get_request_scheduler().best_token(), remote_url=remote_url)
+    _, head_sha = mirror.fetch_pull_request(
+        pr_number, pr_data["base"]["ref"], pr_data["base"]["sha"], pr_data["head"]["sha"]
+    )
     try:
-        # Parse the PR URL
-        repo_owner, repo_name, pr_number = parse_github_pr_url(pr_url)
-
-        # Get GitHub token from environment variables
-        github_token = os.getenv("GITHUB_TOKEN")
-
-        if not github_token:
-            print("⚠️ Warning: GITHUB_TOKEN not found in environment variables. API rate limits may apply.")
-            
-        # Add retry logic with exponential backoff
-        max_retries = 3
-        retry_delay = 2  # starting delay in seconds
-        
-        for attempt in range(max_retries):
-            try:
-                # Fetch PR diff and content
-                file_changes = fetch_pr_diff_and_content(
-                    repo_owner, repo_name, pr_number, token=github_token
-                )
-                
-                # Fetch PR conversation
-                pr_conversation = fetch_pr_conversation(
-                    repo_owner, repo_name, pr_number, token=github_token
-                )
-                
-                # Get repository structure and content
-                repo_structure, repo_contents = get_repository_structure_and_content(
-                    repo_owner, repo_name, token=github_token
-                )
-                
-                # Successfully retrieved all data
-                break
-                
-            except Exception as e:
-                if "rate limit exceeded" in str(e).lower() and attempt < max_retries - 1:
-                    wait_time = retry_delay * (2 ** attempt)
-                    print(f"⚠️ GitHub API rate limit reached. Waiting {wait_time} seconds before retry...")
-                    await asyncio.sleep(wait_time)
-                else:
-                    # Re-raise the exception if it's not a rate limit issue or we've exhausted retries
-                    raise
-        
-        # Process file changes
-        all_pr_diffs = json.dumps([{
-            "file": fc["file"],
-            "added": fc["added"],
-            "removed": fc["removed"]
-        } for fc in file_changes])
-        
-        all_original_pr_files = json.dumps([{
-            "file": fc["file"],
-            "content": fc["original_content"]
-        } for fc in file_changes])
-        
-        # Extract initial PR comment if available, otherwise use a placeholder
-        pr_conversation_initial_message = "No description provided."
-        if pr_conversation and len(pr_conversation) > 0:
-            pr_conversation_initial_message = pr_conversation[0]["body"] or "No description provided."
-        
+        descends = mirror.merge_base(previous_head_sha, head_sha) == previous_head_sha
+    except GitMirrorError as e:
+        # The previous head is gone (force-push and garbage collection)
+        print(f"Note: Could not compare {previous_head_sha} with {head_sha}: {e}")
+        return None
+    if not descends:
+        print(f"Note: {head_sha} does not descend from {previous_head_sha}")
+        return None
+    return ingest_range_from_mirror(mirror, previous_head_sha, head_sha)
+
+def ingest_range_from_mirror(mirror: GitMirror, diff_base: str, head_sha: str) -> List[Dict[str, Any]]:
+    """
+    File changes of `diff_base..head_sha` from the mirror, with base contents read at `diff_base`.
+    """
+    changed_files = mirror.changed_files(diff_base, head_sha)
+    # Streamed from `git diff` and parsed hunk by hunk
+    patches = collect_file_patches(mirror.iter_diff_lines(diff_base, head_sha))
+    _, base_blob_shas = mirror.list_tree(diff_base)
+    base_paths = [f["previous_filename"] or f["filename"] for f in changed_files]
+    base_sizes = mirror.blob_sizes(base_blob_shas[p] for p in base_paths if p in base_blob_shas)
+    triage = None
+    if TRIAGE_ENABLED:
+        gitattributes_sha = base_blob_shas.get(".gitattributes")
+        gitattributes = None
+        if gitattributes_sha:
+            gitattributes = decode_file_content(".gitattributes", mirror.read_blobs([gitattributes_sha]).get(gitattributes_sha, b""))
+        triage = FileTriage.for_repository(gitattributes)
+
+    all_file_changes = []
+    plans = []
+    for file_info, base_path in zip(changed_files, base_paths):
+        filename = file_info["filename"]
+        parsed = patches.get(filename) or ParsedPatch([])
+        additions = sum(run.count for run in parsed.added_runs())
+        deletions = sum(run.count for run in parsed.removed_runs())
+        file_change = {
+            "file": filename,
+            "previous_file": file_info["previous_filename"],
+            "status": file_info["status"],
+            "additions": additions,
+            "deletions": deletions,
+            "original_content": "",
+            **diff_fields(parsed),
+            "content_fetch_seconds": 0.0
+        }
+        all_file_changes.append(file_change)
+        plans.append(plan_base_fetch({**file_info, "changes": additions + deletions}, parsed))
+        if triage:
+            blob_sha = base_blob_shas.get(base_path)
+            skip_reason = triage.exclusion_reason(filename, file_info["status"], additions + deletions,
+                                                  parsed, base_sizes.get(blob_sha) if blob_sha else None)
+            if skip_reason:
+                file_change["skipped"] = skip_reason
+    log_skipped_files(all_file_changes)
+
+    # Only the base blobs of reviewed files that need one are read
+    reviewed = [(fc, plan) for fc, plan in zip(all_file_changes, plans) if "skipped" not in fc]
+    print(f"📥 Base contents: {summarize_plans([plan for _, plan in reviewed])}")
+    base_blobs = mirror.read_blobs(base_blob_shas[plan.base_path] for _, plan in reviewed
+                                   if plan.action == FETCH and plan.base_path in base_blob_shas)
+    for file_change, plan in reviewed:
+        if plan.action == FROM_PATCH:
+            file_change["original_content"] = content_from_patch(patches[file_change["file"]])
+            continue
+        blob_sha = base_blob_shas.get(plan.base_path) if plan.action == FETCH else None
+        if blob_sha in base_blobs:
+            file_change["original_content"] = decode_file_content(plan.base_path, base_blobs[blob_sha])
+    return all_file_changes
+
+def original_file_context(file_change: Dict[str, Any]) -> str:
+    """
+    The base content sent to the reviewers for one file change: whole in "full" mode,
+    otherwise only the scopes around its hunks (see `context_extractor`).
+    """
+    if CONTEXT_EXTRACTION_MODE == "full":
+        return file_change["original_content"]
+    return extract_context(file_change["file"], file_change["original_content"], file_change.get("base_spans", []))
+
+# --- Async wrappers ---
+# The fetchers above are blocking (requests + PyGithub). These wrappers run them on
+# worker threads so the event loop stays responsive while a review is ingesting.
+async def fetch_pr_diff_and_content_async(repo_owner: str, repo_name: str, pr_number: int, token: Optional[str] = None,
+                                          pr_data: Optional[Dict[str, Any]] = None):
+    return await asyncio.to_thread(fetch_pr_diff_and_content, repo_owner, repo_name, pr_number, token, pr_data=pr_data)
+
+async def fetch_pr_conversation_async(repo_owner: str, repo_name: str, pr_number: int, token: Optional[str] = None,
+                                      pr_data: Optional[Dict[str, Any]] = None):
+    return await asyncio.to_thread(fetch_pr_conversation, repo_owner, repo_name, pr_number, token, pr_data)
+
+async def fetch_pr_metadata_async(repo_owner: str, repo_name: str, pr_number: int, token: Optional[str] = None):
+    return await asyncio.to_thread(fetch_pr_metadata, repo_owner, repo_name, pr_number, token)
+
+async def get_repository_snapshot_async(repo_owner: str, repo_name: str, branch: str = "HEAD", token: Optional[str] = None):
+    return await asyncio.to_thread(get_repository_snapshot, repo_owner, repo_name, branch, token)
+
+async def get_repository_structure_and_content_async(repo_owner: str, repo_name: str, branch: str = "HEAD", token: Optional[str] = None):
+    return await asyncio.to_thread(get_repository_structure_and_content, repo_owner, repo_name, branch, token)
+
+async def ingest_pr_from_mirror_async(repo_owner: str, repo_name: str, pr_number: int, pr_data: Dict[str, Any], token: Optional[str] = None):
+    return await asyncio.to_thread(ingest_pr_from_mirror, repo_owner, repo_name, pr_number, pr_data, token)
+
+async def fetch_compare_diff_and_content_async(repo_owner: str, repo_name: str, base: str, head: str, token: Optional[str] = None):
+    return await asyncio.to_thread(fetch_compare_diff_and_content, repo_owner, repo_name, base, head, token)
+
+async def ingest_push_from_mirror_async(repo_owner: str, repo_name: str, pr_number: int, pr_data: Dict[str, Any],
+                                        previous_head_sha: str, token: Optional[str] = None):
+    return await asyncio.to_thread(ingest_push_from_mirror, repo_owner, repo_name, pr_number, pr_data, previous_head_sha, token)
+
+def build_review_payload(file_changes: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    The level-2 agent inputs for a list of file changes: the encoded payload, the
+    `skipped_pr_files` summary, the `pr_files` entries behind them and `payload_tokens`.
+    """
+    # Large base files are cut down to the functions/classes enclosing the changes
+    pr_files = [{
+        "file": fc["file"],
+        "added": fc["added"],
+        "removed": fc["removed"],
+        "content": original_file_context(fc)
+    } for fc in file_changes if "skipped" not in fc]
+    # Triaged-out files are only named, one line each
+    skipped_pr_files = "\n".join(summarize_skipped(fc) for fc in file_changes if "skipped" in fc) or "None."
+    # Encoded in the configured payload format
+    payload = encode_payload(pr_files)
+    if PAYLOAD_COMPARE_ENCODINGS:
+        # Every format's size, for choosing PAYLOAD_ENCODING; costs one encoding and count per format
+        payload_tokens = compare_encodings(pr_files)
+        print(f"📦 PR payload tokens by encoding ({token_counter_name()}): "
+              + ", ".join(f"{name}={tokens}" + (" (used)" if name == PAYLOAD_ENCODING else "") for name, tokens in payload_tokens.items()))
+    else:
+        payload_tokens = {PAYLOAD_ENCODING: estimate_tokens(payload["all_pr_diffs"]) + estimate_tokens(payload["all_original_pr_files"])}
+        print(f"📦 PR payload: ~{payload_tokens[PAYLOAD_ENCODING]} tokens ({PAYLOAD_ENCODING})")
+    return {
+        **payload,
+        "skipped_pr_files": skipped_pr_files,
+        "pr_files": pr_files,
+        "payload_tokens": payload_tokens,
+    }
+
+def initial_pr_message(pr_conversation: List[Dict[str, Any]]) -> str:
+    # Extract initial PR comment if available, otherwise use a placeholder
+    if pr_conversation and len(pr_conversation) > 0:
+        return pr_conversation[0]["body"] or "No description provided."
+    return "No description provided."
+
+async def prepare_incremental_agent_inputs(pr_url: str, previous_head_sha: str,
+                                           pr_data: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Level-2 inputs for only what was pushed since `previous_head_sha` was reviewed: the
+    diff between that and the head of `pr_data` (the PR object, fetched when not given),
+    with base contents read at the previous head. Carries the
+    same keys as `prepare_agent_inputs_from_pr_url` (the repository snapshot is left empty:
+    the stored repo context is reused) plus the push's `file_changes`.
+    Returns None when there is nothing to compare (same head, force-push, rebase or a
+    compare too large to list), so the caller reviews the whole PR instead.
+    """
+    repo_owner, repo_name, pr_number = parse_github_pr_url(pr_url)
+    if pr_data is None:
+        pr_data = await fetch_pr_metadata_async(repo_owner, repo_name, pr_number)
+    head_sha = pr_data["head"]["sha"]
+    if head_sha == previous_head_sha:
+        return None
+
+    if INGESTION_BACKEND == "git":
+        file_changes, pr_conversation = await asyncio.gather(
+            ingest_push_from_mirror_async(repo_owner, repo_name, pr_number, pr_data, previous_head_sha),
+            fetch_pr_conversation_async(repo_owner, repo_name, pr_number, pr_data=pr_data),
+        )
+    else:
+        file_changes, pr_conversation = await asyncio.gather(
+            fetch_compare_diff_and_content_async(repo_owner, repo_name, previous_head_sha, head_sha),
+            fetch_pr_conversation_async(repo_owner, repo_name, pr_number, pr_data=pr_data),
+        )
+    if file_changes is None:
+        return None
+    print(f"📥 Incremental review of {previous_head_sha[:7]}...{head_sha[:7]}: {len(file_changes)} changed file(s)")
+
+    return {
+        "repository_structure": "",
+        "repository_contents": "",
+        **build_review_payload(file_changes),
+        "pr_conversation_initial_message": initial_pr_message(pr_conversation),
+        "file_changes": file_changes,
+        "repo_full_name": f"{repo_owner}/{repo_name}",
+        "pr_number": pr_number,
+        "base_sha": pr_data["base"]["sha"],
+        "head_sha": head_sha,
+        "previous_head_sha": previous_head_sha,
+        "base_tree_sha": None
+    }
+
+def add_ingestion_nodes(pipeline: Pipeline, pr_url: str, pr_data: Optional[Dict[str, Any]] = None):
+    """
+    Declares the ingestion of a PR as pipeline nodes, each started as soon as what it
+    needs is there: "pr_metadata", "pr_conversation", "repo_snapshot" (tree, README and
+    key files at the base commit), "file_changes" (diffs and base contents) and "inputs",
+    the dict `prepare_agent_inputs_from_pr_url` returns. The snapshot does not wait for
+    the per-file base contents, so the repository context can be built while they download.
+    The PR object is fetched once ("pr_metadata", or `pr_data` when the caller already has
+    it) and every later request is pinned to its base and head SHAs.
+    """
+    # Parse the PR URL
+    repo_owner, repo_name, pr_number = parse_github_pr_url(pr_url)
+
+    # No token is passed below: every call takes one from the request scheduler's pool
+    # (GITHUB_TOKENS / GITHUB_TOKEN)
+    if not get_request_scheduler().has_tokens:
+        print("⚠️ Warning: GITHUB_TOKEN not found in environment variables. API rate limits may apply.")
+
+    # Rate limits are handled per request by the scheduler (pacing, token rotation and
+    # retrying only the throttled call), so a throttled call never restarts ingestion.
+    # The PR object pins the commits everything else is read at
+    async def pr_metadata():
+        if pr_data is not None:
+            return pr_data
+        return await fetch_pr_metadata_async(repo_owner, repo_name, pr_number)
+
+    async def pr_conversation(pr_metadata):
+        return await fetch_pr_conversation_async(repo_owner, repo_name, pr_number, pr_data=pr_metadata)
+
+    pipeline.add("pr_metadata", pr_metadata)
+    pipeline.add("pr_conversation", pr_conversation, deps=["pr_metadata"])
+
+    if INGESTION_BACKEND == "git":
+        # Diffs, base contents and the tree come from the local mirror in one pass
+        async def mirror_ingest(pr_metadata):
+            return await ingest_pr_from_mirror_async(repo_owner, repo_name, pr_number, pr_metadata)
+
+        async def file_changes(mirror_ingest):
+            return mirror_ingest[0]
+
+        async def repo_snapshot(mirror_ingest):
+            return mirror_ingest[1]
+
+        pipeline.add("mirror_ingest", mirror_ingest, deps=["pr_metadata"])
+        pipeline.add("file_changes", file_changes, deps=["mirror_ingest"])
+        pipeline.add("repo_snapshot", repo_snapshot, deps=["mirror_ingest"])
+    else:
+        async def file_changes(pr_metadata):
+            return await fetch_pr_diff_and_content_async(repo_owner, repo_name, pr_number, pr_data=pr_metadata)
+
+        async def repo_snapshot(pr_metadata):
+            return await get_repository_snapshot_async(repo_owner, repo_name, pr_metadata["base"]["sha"])
+
+        pipeline.add("file_changes", file_changes, deps=["pr_metadata"])
+        pipeline.add("repo_snapshot", repo_snapshot, deps=["pr_metadata"])
+
+    async def inputs(pr_metadata, pr_conversation, repo_snapshot, file_changes):
         return {
-            "repository_structure": json.dumps(repo_structure),
-            "repository_contents": json.dumps(repo_contents),
-            "all_pr_diffs": all_pr_diffs,
-            "all_original_pr_files": all_original_pr_files,
-            "pr_conversation_initial_message": pr_conversation_initial_message
+            "repository_structure": json.dumps(repo_snapshot["repository_structure"]),
+            "repository_contents": json.dumps(repo_snapshot["repository_contents"]),
+            **build_review_payload(file_changes),
+            "pr_conversation_initial_message": initial_pr_message(pr_conversation),
+            "repo_full_name": f"{repo_owner}/{repo_name}",
+            "pr_number": pr_number,
+            "base_sha": pr_metadata["base"]["sha"],
+            "head_sha": pr_metadata["head"]["sha"],
+            "base_tree_sha": repo_snapshot["tree_sha"]
         }
-        
+
+    pipeline.add("inputs", inputs, deps=["pr_metadata", "pr_conversation", "repo_snapshot", "file_changes"])
+
+async def prepare_agent_inputs_from_pr_url(pr_url: str) -> Dict[str, Any]:
+    """
+    Prepares all inputs needed for PR review agents from a GitHub PR URL.
+    Besides the agent inputs, the result carries the per-file entries behind them
+    (`pr_files`, used to split large PRs), the estimated payload size (`payload_tokens`,
+    per encoding when PAYLOAD_COMPARE_ENCODINGS is set) and the PR coordinates
+    (repo_full_name, pr_number, base_sha, head_sha, base_tree_sha) used to key the review caches.
+    """
+    try:
+        pipeline = Pipeline(f"ingest {pr_url}")
+        add_ingestion_nodes(pipeline, pr_url)
+        return (await pipeline.run())["inputs"]
     except Exception as e:
         print(f"Error preparing agent inputs: {e}")
-        raise
\ No newline at end of file
+        raise
@@ -0,0 +1,108 @@
+import re
+
+from server.context_extractor import CONTEXT_LINES_AROUND, extract_context
+
+OMITTED = re.compile(r"^\.\.\. \(lines (\d+)-(\d+) omitted\) \.\.\.$")
+
+
+def filler(prefix, count):
+    return [line for i in range(count) for line in (f"def {prefix}_{i}(value):", f"    return value + {i}", "")]
+
+
+def shown(excerpt):
+    """The kept lines of an excerpt, without the omission markers."""
+    return [line for line in excerpt.split("\n") if not OMITTED.match(line)]
+
+
+def omitted(excerpt):
+    return [tuple(map(int, m.groups())) for m in map(OMITTED.match, excerpt.split("\n")) if m]
+
+
+def line_of(lines, text):
+    return lines.index(text) + 1
+
+
+PYTHON = [
+    "import os",
+    "from typing import List",
+    "",
+    *filler("before", 40),
+    "class Widget:",
+    "    kind = 'box'",
+    "",
+    "    def __init__(self):",
+    "        self.size = 1",
+    "",
+    "    @property",
+    "    def grown(self):",
+    "        size = self.size + 1",
+    "        return size",
+    "",
+    *filler("after", 40),
+]
+
+
+def test_small_files_are_sent_whole():
+    content = "x = 1\ny = 2\n"
+    assert extract_context("a.py", content, [(1, 1)]) == content
+
+
+def test_python_change_gets_its_enclosing_function_and_the_imports():
+    change = line_of(PYTHON, "        size = self.size + 1")
+    excerpt = extract_context("widget.py", "\n".join(PYTHON), [(change, change)], token_budget=200)
+    assert shown(excerpt) == [
+        "import os",
+        "from typing import List",
+        "    @property",
+        "    def grown(self):",
+        "        size = self.size + 1",
+        "        return size",
+    ]
+    assert omitted(excerpt)[0] == (3, line_of(PYTHON, "    @property") - 1)
+
+
+def test_python_class_body_change_gets_the_class():
+    change = line_of(PYTHON, "    kind = 'box'")
+    excerpt = extract_context("widget.py", "\n".join(PYTHON), [(change, change)], token_budget=200)
+    kept = shown(excerpt)
+    assert kept[2:] == PYTHON[line_of(PYTHON, "class Widget:") - 1:line_of(PYTHON, "        return size")]
+
+
+JAVASCRIPT = [
+    *[f"function before{i}() {{ return {i}; }}" for i in range(60)],
+    "function target(x) {",
+    "  if (x) {",
+    "    return 1;",
+    "  }",
+    "  return 2;",
+    "}",
+    *[f"function after{i}() {{ return {i}; }}" for i in range(60)],
+]
+
+
+def test_brace_change_gets_the_outermost_block_that_fits():
+    change = line_of(JAVASCRIPT, "    return 1;")
+    excerpt = extract_context("app.js", "\n".join(JAVASCRIPT), [(change, change)], token_budget=200)
+    assert shown(excerpt) == JAVASCRIPT[60:66]
+
+
+def test_unparsable_python_falls_back_to_line_windows():
+    lines = ["def broken(:"] + [f"value_{i} = {i}" for i in range(200)]
+    change = 100
+    excerpt = extract_context("broken.py", "\n".join(lines), [(change, change)], token_budget=300)
+    assert shown(excerpt) == lines[change - 1 - CONTEXT_LINES_AROUND:change + CONTEXT_LINES_AROUND]
+
+
+def test_overlapping_windows_are_merged():
+    lines = [f"line {i}" for i in range(1, 301)]
+    excerpt = extract_context("notes.txt", "\n".join(lines), [(100, 100), (106, 106)], token_budget=400)
+    start, end = 100 - CONTEXT_LINES_AROUND, 106 + CONTEXT_LINES_AROUND
+    assert shown(excerpt) == lines[start - 1:end]
+    assert omitted(excerpt) == [(1, start - 1), (end + 1, 300)]
+
+
+def test_excerpt_is_cut_at_the_budget():
+    lines = [f"line {i}" for i in range(1, 2001)]
+    excerpt = extract_context("notes.txt", "\n".join(lines), [(100, 100), (900, 900), (1800, 1800)], token_budget=20)
+    assert len("\n".join(shown(excerpt))) <= 20 * 4
+    assert shown(excerpt)[0] == f"line {100 - CONTEXT_LINES_AROUND}"
@@ -0,0 +1,58 @@
+from benchmarks.bench_diff_parser import generate_patch, legacy_chunk_diff
+from server.diff_parser import chunk_diff, parse_patch
+
+PATCH = "\n".join([
+    "@@ -10,5 +10,6 @@ def handler():",
+    " context",
+    "-old_a",
+    "-old_b",
+    "+new_a",
+    "+new_b",
+    "+new_c",
+    " context",
+    " context",
+    "@@ -40 +41 @@",
+    "-last",
+    "\\ No newline at end of file",
+    "+last",
+])
+
+
+def test_parse_patch_numbers_runs_from_hunk_headers():
+    parsed = parse_patch(PATCH)
+    first, second = parsed.hunks
+    assert (first.old_start, first.old_count, first.new_start, first.new_count) == (10, 5, 10, 6)
+    assert first.section == "def handler():"
+    # A header without counts means one line
+    assert (second.old_start, second.old_count, second.new_start, second.new_count) == (40, 1, 41, 1)
+
+    added, removed = parsed.to_chunks()
+    assert added == [{"lines": [11, 12, 13], "code": "new_a\nnew_b\nnew_c"}, {"lines": [41], "code": "last"}]
+    assert removed == [{"lines": [11, 12], "code": "old_a\nold_b"}, {"lines": [40], "code": "last"}]
+
+
+def test_parse_patch_runs_point_into_the_patch():
+    parsed = parse_patch(PATCH)
+    run = next(parsed.added_runs())
+    assert run.text is PATCH
+    assert run.raw_lines == ["+new_a", "+new_b", "+new_c"]
+    assert run.code_lines == ["new_a", "new_b", "new_c"]
+    assert (run.start, run.end, list(run.line_numbers)) == (11, 13, [11, 12, 13])
+
+
+def test_parse_patch_keeps_interleaved_lines_in_one_run():
+    # Only context lines end a run, so "+a -b +c" is one added and one removed run
+    patch = "@@ -1,4 +1,4 @@\n ctx\n+a\n-b\n+c\n-d\n ctx"
+    assert chunk_diff(patch) == legacy_chunk_diff(patch)
+    assert chunk_diff(patch)[0] == [{"lines": [2, 3], "code": "a\nc"}]
+
+
+def test_parse_patch_empty_and_headerless():
+    assert parse_patch(None).hunks == []
+    assert parse_patch("").hunks == []
+    assert parse_patch("+not in a hunk\n-either").hunks == []
+
+
+def test_chunk_diff_matches_legacy_parser():
+    patch = generate_patch(256 * 1024, seed=7)
+    assert chunk_diff(patch) == legacy_chunk_diff(patch)
@@ -0,0 +1,153 @@
+import pytest
+
+from benchmarks.bench_diff_parser import generate_patch
+from server import github_http
+from server.diff_parser import chunk_diff, collect_file_patches, iter_diff_hunks
+
+RAW_DIFF = "\n".join([
+    "diff --git a/src/app.py b/src/app.py",
+    "index 1111111..2222222 100644",
+    "--- a/src/app.py",
+    "+++ b/src/app.py",
+    "@@ -1,2 +1,2 @@",
+    "-print('a')",
+    "+print('b')",
+    " x = 1",
+    "@@ -20 +20,2 @@",
+    " y = 2",
+    "+z = 3",
+    "diff --git a/old name.txt b/new name.txt",
+    "similarity index 90%",
+    "rename from old name.txt",
+    "rename to new name.txt",
+    "diff --git a/logo.png b/logo.png",
+    "new file mode 100644",
+    "index 0000000..3333333",
+    "Binary files /dev/null and b/logo.png differ",
+    "diff --git a/gone.py b/gone.py",
+    "deleted file mode 100644",
+    "--- a/gone.py",
+    "+++ /dev/null",
+    "@@ -1 +0,0 @@",
+    "-bye",
+    "diff --git \"a/t\\303\\251st.txt\" \"b/t\\303\\251st.txt\"",
+    "--- \"a/t\\303\\251st.txt\"",
+    "+++ \"b/t\\303\\251st.txt\"",
+    "@@ -1 +1 @@",
+    "-a",
+    "+b",
+])
+
+
+def test_iter_diff_hunks_reads_file_headers():
+    events = [(header.path, header.status, header.is_binary, hunk is not None)
+              for header, hunk in iter_diff_hunks(line.encode() + b"\n" for line in RAW_DIFF.split("\n"))]
+    assert events == [
+        ("src/app.py", "modified", False, True),
+        ("src/app.py", "modified", False, True),
+        ("new name.txt", "renamed", False, False),
+        ("logo.png", "added", True, False),
+        ("gone.py", "removed", False, True),
+        ("tést.txt", "modified", False, True),
+    ]
+
+
+def test_collect_file_patches_matches_per_file_parsing():
+    patches = collect_file_patches(RAW_DIFF.split("\n"), paths=["src/app.py", "gone.py"])
+    assert set(patches) == {"src/app.py", "gone.py"}
+    assert patches["src/app.py"].to_chunks() == chunk_diff(
+        "@@ -1,2 +1,2 @@\n-print('a')\n+print('b')\n x = 1\n@@ -20 +20,2 @@\n y = 2\n+z = 3"
+    )
+    assert patches["gone.py"].to_chunks() == ([], [{"lines": [1], "code": "bye"}])
+
+
+# Per-file patches (as the files API lists them) and the raw `.diff` headers around them
+FILE_PATCHES = {
+    "src/app.py": "\n".join([
+        "@@ -1,3 +1,3 @@",
+        " import os",
+        "-x = 0",
+        "+x = 1",
+        " y = 2",
+        "@@ -30,2 +30,2 @@ def main():",
+        "-    run()",
+        "\\ No newline at end of file",
+        "+    run(x)",
+        "+",
+    ]),
+    "src/renamed.py": "@@ -5 +5 @@\n-old = True\n+old = False",
+    "added.txt": "@@ -0,0 +1,2 @@\n+first\n+last line\r\n\\ No newline at end of file",
+    "gone.py": "@@ -1,2 +0,0 @@\n-a = 1\n-b = 2",
+}
+STREAMED_DIFF = "\n".join([
+    "diff --git a/src/app.py b/src/app.py",
+    "index 1111111..2222222 100644",
+    "--- a/src/app.py",
+    "+++ b/src/app.py",
+    FILE_PATCHES["src/app.py"],
+    "diff --git a/src/old.py b/src/renamed.py",
+    "similarity index 80%",
+    "rename from src/old.py",
+    "rename to src/renamed.py",
+    "index 3333333..4444444 100644",
+    "--- a/src/old.py",
+    "+++ b/src/renamed.py",
+    FILE_PATCHES["src/renamed.py"],
+    "diff --git a/moved.md b/docs/moved.md",
+    "similarity index 100%",
+    "rename from moved.md",
+    "rename to docs/moved.md",
+    "diff --git a/icon.png b/icon.png",
+    "index 5555555..6666666 100644",
+    "Binary files a/icon.png and b/icon.png differ",
+    "diff --git a/added.txt b/added.txt",
+    "new file mode 100644",
+    "index 0000000..7777777",
+    "--- /dev/null",
+    "+++ b/added.txt",
+    FILE_PATCHES["added.txt"],
+    "diff --git a/gone.py b/gone.py",
+    "deleted file mode 100644",
+    "index 8888888..0000000",
+    "--- a/gone.py",
+    "+++ /dev/null",
+    FILE_PATCHES["gone.py"],
+]) + "\n"
+
+
+class StreamedResponse:
+    """The part of a streamed `requests.Response` that `iter_diff_lines` reads."""
+
+    def __init__(self, body: bytes, chunk_size: int):
+        self.body = body
+        self.chunk_size = chunk_size
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), self.chunk_size):
+            yield self.body[start:start + self.chunk_size]
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1 << 16])
+def test_streamed_diff_matches_per_file_parsing(monkeypatch, chunk_size):
+    response = StreamedResponse(STREAMED_DIFF.encode("utf-8"), chunk_size)
+    monkeypatch.setattr(github_http, "github_get", lambda *args, **kwargs: response)
+    patches = collect_file_patches(github_http.iter_compare_diff_lines("o", "r", "base", "head"))
+
+    assert set(patches) == {"src/app.py", "src/renamed.py", "docs/moved.md", "icon.png", "added.txt", "gone.py"}
+    for path, patch in FILE_PATCHES.items():
+        assert patches[path].to_chunks() == chunk_diff(patch), path
+    # Pure renames and binary files have no hunks
+    assert patches["docs/moved.md"].hunks == [] and patches["icon.png"].hunks == []
+    assert response.closed
+
+
+def test_streamed_large_diff_matches_chunk_diff(monkeypatch):
+    patch = generate_patch(128 * 1024, seed=11)
+    body = ("diff --git a/big.py b/big.py\n--- a/big.py\n+++ b/big.py\n" + patch + "\n").encode("utf-8")
+    monkeypatch.setattr(github_http, "github_get", lambda *args, **kwargs: StreamedResponse(body, 1000))
+    patches = collect_file_patches(github_http.iter_pr_diff_lines("o", "r", 1))
+    assert patches["big.py"].to_chunks() == chunk_diff(patch)
@@ -0,0 +1,110 @@
+from server.fanout import (
+    NOTHING_TO_REVIEW, alignment_inputs, merge_bug_outputs, merge_code_quality_outputs,
+    merge_security_outputs, plan_review_groups
+)
+from server.models import (
+    BugDetectionAgentOutput, BugFinding, CodeQualityAgentOutput, SecurityAgentOutput
+)
+
+
+def pr_file(path, size=100):
+    return {
+        "file": path,
+        "added": [{"lines": [1], "code": "x" * size}],
+        "removed": [],
+        "content": "y" * size,
+    }
+
+
+def bug(file, line, description="d"):
+    return BugFinding(file=file, line_numbers=[line], description=description, severity="High", suggested_fix="f")
+
+
+def test_everything_fits_in_one_group():
+    files = [pr_file("a/one.py"), pr_file("b/two.py"), pr_file("c/three.py")]
+    groups = plan_review_groups(files, token_budget=10_000)
+    assert len(groups) == 1
+    assert groups[0].files == ["a/one.py", "b/two.py", "c/three.py"]
+
+
+def test_groups_respect_the_budget():
+    files = [pr_file(f"dir{i}/file.py", 400) for i in range(6)]
+    one_file = plan_review_groups(files[:1], token_budget=10_000)[0].tokens
+    groups = plan_review_groups(files, token_budget=one_file * 2)
+    assert [len(g.units) for g in groups] == [2, 2, 2]
+    assert all(g.tokens <= one_file * 2 for g in groups)
+    assert sorted(f for g in groups for f in g.files) == sorted(f["file"] for f in files)
+
+
+def test_related_files_stay_together():
+    files = [
+        pr_file("src/parser.py", 400),
+        pr_file("lib/cache.py", 400),
+        pr_file("tests/test_parser.py", 400),
+        pr_file("lib/store.py", 400),
+    ]
+    one_file = plan_review_groups(files[:1], token_budget=10_000)[0].tokens
+    # Room for two files (paths differ in length), not three
+    groups = plan_review_groups(files, token_budget=one_file * 2 + 20)
+    # The module and its tests share a stem; the other two share a directory. Files keep PR order.
+    assert sorted(g.files for g in groups) == [["lib/cache.py", "lib/store.py"], ["src/parser.py", "tests/test_parser.py"]]
+
+
+def test_oversized_files_get_a_group_of_their_own():
+    files = [pr_file("a/small.py", 40), pr_file("a/huge.py", 4000), pr_file("b/small.py", 40)]
+    groups = plan_review_groups(files, token_budget=500)
+    assert groups[0].files == ["a/huge.py"]  # largest first
+    assert groups[0].tokens > 500
+    assert [g.files for g in groups[1:]] == [["a/small.py", "b/small.py"]]
+
+
+def test_alignment_inputs_within_budget():
+    files = [pr_file("big.py", 4000), pr_file("small.py", 40)]
+    inputs = alignment_inputs(files, token_budget=200, encoding="unified")
+    assert inputs["alignment_pr_files"] == "big.py (+1/-0) [diff not shown]\nsmall.py (+1/-0)"
+    assert "## small.py" in inputs["alignment_pr_diffs"]
+    assert "## big.py" not in inputs["alignment_pr_diffs"]
+
+
+def test_alignment_inputs_cut_the_listing():
+    files = [pr_file(f"module_{i:03}.py", 40) for i in range(200)]
+    listing = alignment_inputs(files, token_budget=100)["alignment_pr_files"].split("\n")
+    assert 1 < len(listing) < 200
+    assert listing[-1] == f"…and {200 - (len(listing) - 1)} more files"
+
+
+def test_alignment_inputs_without_files():
+    assert alignment_inputs([], encoding="json") == {"alignment_pr_files": "None.", "alignment_pr_diffs": "[]"}
+
+
+def test_merge_bug_outputs_dedupes_findings():
+    first = BugDetectionAgentOutput(has_bugs=True, findings=[bug("a.py", 1), bug("a.py", 2)], overall_assessment="Risky.")
+    second = BugDetectionAgentOutput(has_bugs=True, findings=[bug("a.py", 1), bug("b.py", 1)], overall_assessment="Risky.")
+    merged = merge_bug_outputs([first, second])
+    assert [(f.file, f.line_numbers) for f in merged.findings] == [("a.py", [1]), ("a.py", [2]), ("b.py", [1])]
+    assert merged.has_bugs
+    assert merged.overall_assessment == "Risky."
+
+
+def test_merge_code_quality_outputs_weights_scores():
+    outputs = [
+        CodeQualityAgentOutput(code_quality_score=90, suggestions=[], summary_comment="Clean."),
+        CodeQualityAgentOutput(code_quality_score=30, suggestions=[], summary_comment="Messy."),
+    ]
+    merged = merge_code_quality_outputs(outputs, weights=[3, 1])
+    assert merged.code_quality_score == 75
+    assert merged.summary_comment == "Clean.\n\nMessy."
+    assert merge_code_quality_outputs(outputs).code_quality_score == 60
+
+
+def test_merges_without_groups():
+    assert merge_bug_outputs([]).overall_assessment == NOTHING_TO_REVIEW
+    assert merge_code_quality_outputs([]).summary_comment == NOTHING_TO_REVIEW
+    empty_security = merge_security_outputs([])
+    assert not empty_security.has_security_vulnerabilities
+    assert empty_security.overall_security_assessment == NOTHING_TO_REVIEW
+
+
+def test_single_output_is_returned_as_is():
+    output = SecurityAgentOutput(has_security_vulnerabilities=False, findings=[])
+    assert merge_security_outputs([output]) is output
@@ -0,0 +1,49 @@
+from server.diff_parser import parse_patch
+from server.fetch_planner import (
+    FETCH, FROM_PATCH, SKIP, content_from_patch, patch_holds_whole_base, plan_base_fetch, summarize_plans
+)
+
+DELETION = "@@ -1,3 +0,0 @@\n-one\n-two\n-three"
+
+
+def plan(parsed=None, **file_info):
+    return plan_base_fetch({"filename": "src/app.py", **file_info}, parsed)
+
+
+def test_added_files_need_no_base():
+    assert plan(status="added").action == SKIP
+
+
+def test_deleted_files_are_rebuilt_from_a_complete_patch():
+    result = plan(parse_patch(DELETION), status="removed")
+    assert (result.action, result.base_path) == (FROM_PATCH, "src/app.py")
+    assert content_from_patch(parse_patch(DELETION)) == "one\ntwo\nthree\n"
+
+
+def test_deleted_files_without_a_complete_patch_are_downloaded():
+    assert plan(None, status="removed").action == FETCH
+    partial = parse_patch("@@ -2,2 +0,0 @@\n-two\n-three")
+    assert not patch_holds_whole_base(partial)
+    assert plan(partial, status="removed").action == FETCH
+
+
+def test_renamed_files_are_read_from_their_previous_path():
+    result = plan(status="renamed", previous_filename="src/old_app.py", changes=3)
+    assert (result.action, result.base_path) == (FETCH, "src/old_app.py")
+
+
+def test_modified_files():
+    assert plan(status="modified", changes=4).action == FETCH
+    assert plan(status="modified", changes=0).action == SKIP
+
+
+def test_patch_holds_whole_base():
+    assert patch_holds_whole_base(parse_patch(DELETION))
+    # Two hunks, or a hunk that keeps lines, never hold the whole file
+    assert not patch_holds_whole_base(parse_patch("@@ -1,2 +0,0 @@\n-a\n-b\n@@ -9 +0,0 @@\n-c"))
+    assert not patch_holds_whole_base(parse_patch("@@ -1,2 +1 @@\n-a\n b"))
+
+
+def test_summarize_plans():
+    plans = [plan(status="added"), plan(status="modified", changes=1), plan(parse_patch(DELETION), status="removed")]
+    assert summarize_plans(plans) == "1 to download, 1 rebuilt from patches, 1 not needed"
@@ -0,0 +1,162 @@
+import subprocess
+
+import pytest
+
+from server import git_mirror, rate_limiter, utils
+from server.git_mirror import GitMirror, find_readme_path
+
+
+def git(repo, *args):
+    return subprocess.run(["git", "-C", str(repo), "-c", "user.name=dev", "-c", "user.email=dev@example.com", *args],
+                          check=True, capture_output=True).stdout.decode().strip()
+
+
+def write(repo, path, text):
+    (repo / path).parent.mkdir(parents=True, exist_ok=True)
+    (repo / path).write_text(text)
+
+
+def commit(repo, message):
+    git(repo, "add", "-A")
+    git(repo, "commit", "-q", "-m", message)
+    return git(repo, "rev-parse", "HEAD")
+
+
+APP = "".join(f"def f{i}():\n    return {i}\n\n" for i in range(10))
+MOVED = "".join(f"LINE_{i} = {i}\n" for i in range(20))
+
+
+@pytest.fixture
+def origin(tmp_path, monkeypatch):
+    """
+    An `octo/demo` remote: main with a PR branch that modifies, adds, deletes and renames
+    files, and a later main commit so the base branch tip is past the merge base.
+    """
+    repo = tmp_path / "origin" / "octo" / "demo"
+    repo.mkdir(parents=True)
+    git(repo, "init", "-q", "-b", "main")
+    write(repo, "README.md", "# Demo\n")
+    write(repo, "app.py", APP)
+    write(repo, "old_name.py", MOVED)
+    write(repo, "gone.txt", "bye\n")
+    merge_base = commit(repo, "base")
+
+    git(repo, "checkout", "-q", "-b", "feature")
+    write(repo, "app.py", APP.replace("return 3", "return 33"))
+    write(repo, "src/new.py", "x = 1\n")
+    first_head = commit(repo, "modify and add")
+    (repo / "gone.txt").unlink()
+    git(repo, "mv", "old_name.py", "new_name.py")
+    write(repo, "new_name.py", MOVED.replace("LINE_5 = 5", "LINE_5 = 55"))
+    head = commit(repo, "delete and rename")
+    git(repo, "update-ref", "refs/pull/1/head", head)
+
+    git(repo, "checkout", "-q", "main")
+    write(repo, "app.py", APP.replace("return 8", "return 88"))
+    base = commit(repo, "main moves on")
+
+    monkeypatch.setattr(git_mirror, "GIT_MIRROR_DIR", str(tmp_path / "mirrors"))
+    monkeypatch.setattr(git_mirror, "GIT_MIRROR_REMOTE_TEMPLATE", str(tmp_path / "origin" / "{owner}" / "{repo}"))
+    monkeypatch.setattr(rate_limiter, "_scheduler", rate_limiter.GitHubRequestScheduler([]))
+    return {"repo": repo, "merge_base": merge_base, "first_head": first_head, "head": head, "base": base,
+            "pr": {"base": {"ref": "main", "sha": base}, "head": {"ref": "feature", "sha": head}}}
+
+
+def fetched_mirror(origin):
+    mirror = GitMirror("octo", "demo")
+    assert mirror.fetch_pull_request(1, "main") == (origin["base"], origin["head"])
+    return mirror
+
+
+def test_changed_files_reports_each_kind_of_change(origin):
+    mirror = fetched_mirror(origin)
+    assert mirror.merge_base(origin["base"], origin["head"]) == origin["merge_base"]
+    changes = sorted(mirror.changed_files(origin["merge_base"], origin["head"]), key=lambda f: f["filename"])
+    assert changes == [
+        {"status": "modified", "previous_filename": None, "filename": "app.py"},
+        {"status": "removed", "previous_filename": None, "filename": "gone.txt"},
+        {"status": "renamed", "previous_filename": "old_name.py", "filename": "new_name.py"},
+        {"status": "added", "previous_filename": None, "filename": "src/new.py"},
+    ]
+
+
+def test_tree_and_blob_reads(origin):
+    mirror = fetched_mirror(origin)
+    tree_sha, blobs = mirror.list_tree(origin["head"])
+    assert tree_sha == git(origin["repo"], "rev-parse", f"{origin['head']}^{{tree}}")
+    assert sorted(blobs) == ["README.md", "app.py", "new_name.py", "src/new.py"]
+    assert find_readme_path(blobs) == "README.md"
+
+    missing = "0" * 40
+    contents = mirror.read_blobs([blobs["app.py"], blobs["src/new.py"], missing, blobs["app.py"]])
+    assert contents == {blobs["app.py"]: APP.replace("return 3", "return 33").encode(), blobs["src/new.py"]: b"x = 1\n"}
+    assert mirror.blob_sizes([blobs["README.md"], missing]) == {blobs["README.md"]: len("# Demo\n")}
+
+
+def test_pr_ingest_reads_base_contents_at_the_merge_base(origin):
+    file_changes, snapshot = utils.ingest_pr_from_mirror("octo", "demo", 1, origin["pr"])
+    by_file = {fc["file"]: fc for fc in file_changes}
+    assert set(by_file) == {"app.py", "gone.txt", "new_name.py", "src/new.py"}
+
+    app = by_file["app.py"]
+    # Not the base branch tip, whose app.py returns 88
+    assert app["original_content"] == APP
+    assert (app["additions"], app["deletions"]) == (1, 1)
+    assert app["removed"] == [{"lines": [11], "code": "    return 3"}]
+    assert app["added"] == [{"lines": [11], "code": "    return 33"}]
+    renamed = by_file["new_name.py"]
+    assert (renamed["status"], renamed["previous_file"], renamed["original_content"]) == ("renamed", "old_name.py", MOVED)
+    assert by_file["src/new.py"]["original_content"] == ""
+
+    # The snapshot describes the base branch
+    assert snapshot["tree_sha"] == git(origin["repo"], "rev-parse", f"{origin['base']}^{{tree}}")
+    assert snapshot["repository_structure"].split("\n") == ["README.md", "app.py", "gone.txt", "old_name.py"]
+    assert snapshot["repository_contents"] == "README.md:\n# Demo\n\n\n"
+
+
+def test_push_ingest_covers_only_the_new_commits(origin):
+    changes = utils.ingest_push_from_mirror("octo", "demo", 1, origin["pr"], origin["first_head"])
+    assert sorted(fc["file"] for fc in changes) == ["gone.txt", "new_name.py"]
+    # A head that does not descend from the previous one (force-push) needs a full review
+    assert utils.ingest_push_from_mirror("octo", "demo", 1, origin["pr"], origin["base"]) is None
+
+
+def github_records(repo, base, head):
+    """The files-API listing GitHub would return for `base...head`."""
+    mirror = GitMirror("octo", "demo")
+    records = []
+    for change in mirror.changed_files(base, head):
+        paths = [p for p in (change["previous_filename"], change["filename"]) if p]
+        diff = git(repo, "diff", "-M", base, head, "--", *paths)
+        patch = diff[diff.index("@@"):] if "@@" in diff else None
+        counts = git(repo, "diff", "-M", "--numstat", base, head, "--", *paths).split("\t")
+        records.append({**change, "patch": patch, "additions": int(counts[0]), "deletions": int(counts[1]),
+                        "changes": int(counts[0]) + int(counts[1])})
+    return records
+
+
+def test_mirror_and_api_backends_build_the_same_file_changes(origin, monkeypatch):
+    mirror = fetched_mirror(origin)
+    base, head = origin["merge_base"], origin["head"]
+    _, base_blobs = mirror.list_tree(base)
+
+    def tree_blob_shas(owner, name, sha, token=None):
+        sizes = mirror.blob_sizes(base_blobs.values())
+        return base_blobs, {path: sizes[blob] for path, blob in base_blobs.items()}, False
+
+    def base_file_content(owner, name, sha, path, blob_shas, truncated=False, token=None):
+        return utils.decode_file_content(path, mirror.read_blobs([blob_shas[path]])[blob_shas[path]])
+
+    # The API backend, answered from the same repository
+    monkeypatch.setattr(utils, "get_tree_blob_shas", tree_blob_shas)
+    monkeypatch.setattr(utils, "load_base_file_content", base_file_content)
+    api = utils.ingest_file_records("octo", "demo", base, github_records(origin["repo"], base, head),
+                                    lambda: mirror.iter_diff_lines(base, head), "test")
+    local = utils.ingest_range_from_mirror(mirror, base, head)
+
+    def comparable(changes):
+        return sorted(({k: v for k, v in fc.items() if k != "content_fetch_seconds"} for fc in changes),
+                      key=lambda fc: fc["file"])
+
+    assert comparable(api) == comparable(local)
+    assert all(set(fc) == set(local[0]) for fc in api + local)
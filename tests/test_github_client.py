@@ -0,0 +1,70 @@
+import threading
+
+import pytest
+
+from server import github_client
+from server.github_client import HandleCache
+
+
+def test_handles_are_reused_until_they_expire(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(github_client.time, "monotonic", lambda: now[0])
+    cache = HandleCache(ttl_seconds=60)
+    loads = []
+
+    def load():
+        loads.append(1)
+        return len(loads)
+
+    assert cache.get_or_load(("repo", "o/r"), load) == 1
+    assert cache.get_or_load(("repo", "o/r"), load) == 1
+    now[0] += 61
+    assert cache.get_or_load(("repo", "o/r"), load) == 2
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_least_recently_used_handles_are_evicted():
+    cache = HandleCache(max_entries=2)
+    cache.get_or_load("a", lambda: "a")
+    cache.get_or_load("b", lambda: "b")
+    cache.get_or_load("a", lambda: "reloaded")
+    cache.get_or_load("c", lambda: "c")
+    assert cache.get_or_load("a", lambda: "reloaded") == "a"
+    assert cache.get_or_load("b", lambda: "reloaded") == "reloaded"
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["evictions"] == 2
+
+
+def test_concurrent_lookups_share_one_load():
+    cache = HandleCache()
+    release = threading.Event()
+    calls = []
+
+    def load():
+        calls.append(1)
+        release.wait(5)
+        return "pull"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load(("pull", "o/r", 1), load)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results == ["pull"] * 8
+    assert len(calls) == 1
+    assert cache._key_locks == {}
+
+
+def test_key_lock_is_dropped_after_a_failed_load():
+    cache = HandleCache()
+
+    def fail():
+        raise RuntimeError("404")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_load("missing", fail)
+    assert cache._key_locks == {}
+    assert cache.stats()["entries"] == 0
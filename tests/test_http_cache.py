@@ -0,0 +1,45 @@
+import requests
+
+from server.http_cache import ConditionalHTTPCache
+
+
+def github_response(url, body, **headers):
+    r = requests.Response()
+    r.status_code = 200
+    r.url = url
+    r._content = body
+    r.headers.update(headers)
+    return r
+
+
+def test_http_cache_round_trip(tmp_path):
+    cache = ConditionalHTTPCache(str(tmp_path))
+    url = "https://api.github.com/repos/o/r/pulls/1"
+    key = cache.make_key(url, {"per_page": 100})
+    assert key == cache.make_key(url, {"per_page": 100}) != cache.make_key(url, {"per_page": 50})
+
+    cache.put(key, github_response(url, b'{"number": 1}', ETag='"abc"', Link="<next>", Server="GitHub.com"))
+    cached = cache.get(key)
+    assert cached.etag == '"abc"'
+    assert cached.headers == {"ETag": '"abc"', "Link": "<next>"}
+    assert cached.to_response().json() == {"number": 1}
+    # The index is rebuilt from the directory
+    assert ConditionalHTTPCache(str(tmp_path)).get(key).body == b'{"number": 1}'
+
+
+def test_http_cache_skips_responses_without_validators(tmp_path):
+    cache = ConditionalHTTPCache(str(tmp_path))
+    cache.put("k", github_response("u", b"body"))
+    assert cache.get("k") is None
+
+
+def test_http_cache_evicts_least_recently_used(tmp_path):
+    cache = ConditionalHTTPCache(str(tmp_path), max_bytes=10)
+    for key in ("a", "b"):
+        cache.put(key, github_response(key, b"12345", ETag=key))
+    cache.touch("a")
+    cache.put("c", github_response("c", b"12345", ETag="c"))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 10
@@ -0,0 +1,71 @@
+from server.incremental import carry_forward, map_line, push_changes_by_previous_path
+from server.models import BugFinding
+
+
+def change(file="app.py", status="modified", added=(), removed=(), previous_file=None, **counts):
+    return {
+        "file": file,
+        "previous_file": previous_file,
+        "status": status,
+        "added": [{"lines": list(lines), "code": ""} for lines in added],
+        "removed": [{"lines": list(lines), "code": ""} for lines in removed],
+        **counts,
+    }
+
+
+def finding(file="app.py", lines=(5,)):
+    return BugFinding(file=file, line_numbers=list(lines), description="d", severity="High", suggested_fix="f")
+
+
+def test_map_line_without_changes_is_identity():
+    assert [map_line(n, change()) for n in (1, 7, 40)] == [1, 7, 40]
+
+
+def test_map_line_through_a_rewrite():
+    # Old line 3 is replaced by new lines 3-4: 1 2 [3] 4 5 -> 1 2 A B 4 5
+    rewrite = change(added=[range(3, 5)], removed=[range(3, 4)])
+    assert map_line(2, rewrite) == 2
+    assert map_line(3, rewrite) is None
+    assert map_line(4, rewrite) == 5
+    assert map_line(5, rewrite) == 6
+
+
+def test_map_line_through_insertions_and_deletions():
+    # Lines 2-3 deleted, then two lines inserted after old line 6 (new lines 5-6)
+    push = change(added=[range(5, 7)], removed=[range(2, 4)])
+    assert map_line(1, push) == 1
+    assert map_line(4, push) == 2
+    assert map_line(6, push) == 4
+    assert map_line(7, push) == 7
+    # Runs out of order are applied by position
+    shuffled = change(added=[range(10, 11), range(1, 3)])
+    assert map_line(1, shuffled) == 3
+    assert map_line(8, shuffled) == 11
+
+
+def test_carry_forward():
+    pushed = push_changes_by_previous_path([
+        change("app.py", added=[range(1, 3)]),
+        change("new_name.py", status="renamed", previous_file="old_name.py"),
+        change("gone.py", status="removed", removed=[range(1, 20)]),
+        change("rewritten.py", added=[range(5, 6)], removed=[range(5, 6)]),
+        change("triaged.py", additions=900, deletions=10),
+    ])
+    findings = [
+        finding("untouched.py", [3]),
+        finding("app.py", [5, 6]),
+        finding("old_name.py", [8]),
+        finding("gone.py", [2]),
+        finding("rewritten.py", [4, 5]),
+        finding("rewritten.py", [9]),
+        finding("triaged.py", [1]),
+    ]
+    carried = carry_forward(findings, pushed)
+    assert [(f.file, f.line_numbers) for f in carried] == [
+        ("untouched.py", [3]),
+        ("app.py", [7, 8]),
+        ("new_name.py", [8]),
+        ("rewritten.py", [9]),
+    ]
+    # The input findings are copied, not modified
+    assert findings[1].line_numbers == [5, 6]
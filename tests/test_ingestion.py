@@ -0,0 +1,139 @@
+import json
+import time
+import base64
+import asyncio
+import threading
+from urllib.parse import urlsplit
+
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+
+from server import blob_store, github_http, http_cache, rate_limiter, utils
+from server.payload_encoding import PAYLOAD_ENCODING
+from server.utils import cap_file_records
+
+
+def records(count, patch_size=100):
+    return [{"filename": f"file_{i}.py", "patch": "+" * patch_size} for i in range(count)]
+
+
+def test_cap_file_records_without_bounds():
+    listing = records(3)
+    assert cap_file_records(listing) == listing
+
+
+def test_cap_file_records_by_count_and_bytes():
+    listing = records(10)
+    size = len(json.dumps(listing[0]))
+    assert cap_file_records(listing, max_files=4) == listing[:4]
+    # Kept until the budget is reached, including the record that reaches it
+    assert cap_file_records(listing, max_bytes=size * 2 + 1) == listing[:3]
+    assert cap_file_records(listing, max_bytes=size * 2) == listing[:2]
+    assert cap_file_records(listing, max_files=1, max_bytes=size * 5) == listing[:1]
+
+
+def test_build_review_payload_sizes_only_the_encoding_in_use(monkeypatch):
+    def fail(pr_files):
+        raise AssertionError("every encoding was computed")
+
+    monkeypatch.setattr(utils, "compare_encodings", fail)
+    file_change = {"file": "app.py", "status": "modified", "added": [{"lines": [1], "code": "x = 1"}],
+                   "removed": [], "original_content": "x = 0\n", "base_spans": None}
+    payload = utils.build_review_payload([file_change])
+    assert list(payload["payload_tokens"]) == [PAYLOAD_ENCODING]
+    assert payload["skipped_pr_files"] == "None."
+
+
+class FakeGitHub(HTTPAdapter):
+    """Stub transport answering GitHub API paths with canned JSON after a short delay."""
+
+    def __init__(self, routes, delay=0.1):
+        super().__init__()
+        self.routes = routes
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.paths = []
+
+    def send(self, request, **kwargs):
+        path = urlsplit(request.url).path
+        with self.lock:
+            self.paths.append(path)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            body = self.routes.get(path)
+            response = requests.Response()
+            response.status_code = 200 if body is not None else 404
+            response._content = json.dumps(body if body is not None else {"message": "Not Found"}).encode("utf-8")
+            response.headers["Content-Type"] = "application/json"
+            response.url = request.url
+            response.request = request
+            return response
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def b64(text):
+    return base64.b64encode(text.encode("utf-8")).decode("ascii")
+
+
+REPO = "/repos/octo/demo"
+ROUTES = {
+    f"{REPO}/pulls/7": {
+        "body": "Bump x", "user": {"login": "dev"},
+        "base": {"sha": "base1", "ref": "main"}, "head": {"sha": "head1", "ref": "bump"},
+    },
+    f"{REPO}/issues/7/comments": [{"user": {"login": "reviewer"}, "body": "Looks fine"}],
+    f"{REPO}/compare/base1...head1": {
+        "merge_base_commit": {"sha": "base1"},
+        "files": [{"filename": "app.py", "status": "modified", "additions": 1, "deletions": 1, "changes": 2,
+                   "patch": "@@ -1 +1 @@\n-x = 0\n+x = 1"}],
+    },
+    f"{REPO}/git/trees/base1": {
+        "sha": "tree1",
+        "tree": [{"path": "README.md", "type": "blob", "sha": "readme1", "size": 6},
+                 {"path": "app.py", "type": "blob", "sha": "blob1", "size": 6}],
+    },
+    f"{REPO}/readme": {"content": b64("# Demo")},
+    f"{REPO}/git/blobs/blob1": {"encoding": "base64", "content": b64("x = 0\n")},
+}
+
+
+@pytest.fixture
+def fake_github(monkeypatch, tmp_path):
+    monkeypatch.setattr(utils, "INGESTION_BACKEND", "api")
+    monkeypatch.setattr(http_cache, "HTTP_CACHE_ENABLED", False)
+    monkeypatch.setattr(blob_store, "_store", blob_store.BlobStore(directory=str(tmp_path / "blobs")))
+    monkeypatch.setattr(rate_limiter, "_scheduler", rate_limiter.GitHubRequestScheduler(["token"]))
+    monkeypatch.setattr(github_http, "_session", None)
+    transport = FakeGitHub(ROUTES)
+    github_http.get_http_session().mount("https://", transport)
+    yield transport
+    github_http.close_http_session()
+
+
+def test_pr_sources_are_fetched_concurrently_over_one_session(fake_github):
+    sessions = set()
+    threads = [threading.Thread(target=lambda: sessions.add(id(github_http.get_http_session()))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(sessions) == 1
+
+    inputs = asyncio.run(utils.prepare_agent_inputs_from_pr_url("https://github.com/octo/demo/pull/7"))
+
+    assert (inputs["base_sha"], inputs["head_sha"], inputs["base_tree_sha"]) == ("base1", "head1", "tree1")
+    assert inputs["pr_conversation_initial_message"] == "Bump x"
+    assert inputs["pr_files"] == [{"file": "app.py", "added": [{"lines": [1], "code": "x = 1"}],
+                                   "removed": [{"lines": [1], "code": "x = 0"}], "content": "x = 0\n"}]
+    # Every call went through the shared session's transport, the PR object only once
+    assert fake_github.paths.count(f"{REPO}/pulls/7") == 1
+    assert set(fake_github.paths) == set(ROUTES)
+    # The conversation, compare and snapshot requests were in flight together
+    assert fake_github.max_in_flight >= 3
@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("crewai")
+
+from server import jobs
+from server.jobs import SUCCEEDED, ReviewJobManager
+from server.result_cache import ResultCache
+
+PR_URL = "https://github.com/octo/demo/pull/7"
+
+
+class StubReview:
+    """A review that blocks until released and reports the head it read in its "fetched" event."""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.reviewed_head = None
+
+    async def __call__(self, pr_url, on_progress=None, incremental=False, pr_data=None):
+        self.calls += 1
+        await self.release.wait()
+        on_progress("fetched", {"head_sha": self.reviewed_head or pr_data["head"]["sha"]})
+        return {"verdict": "Approved", "head": pr_data["head"]["sha"]}
+
+
+@pytest.fixture
+def pr(monkeypatch, tmp_path):
+    """The PR `fetch_pr_metadata_async` returns; tests move its head by editing it."""
+    pr_data = {"number": 7, "body": "Bump x", "base": {"sha": "base1", "ref": "main"}, "head": {"sha": "head1"}}
+
+    async def fetch_pr_metadata(owner, repo, pr_number, token=None):
+        return {**pr_data, "head": dict(pr_data["head"])}
+
+    cache = ResultCache("reports", directory=str(tmp_path))
+    monkeypatch.setattr(jobs, "fetch_pr_metadata_async", fetch_pr_metadata)
+    monkeypatch.setattr(jobs, "get_report_cache", lambda: cache)
+    return pr_data
+
+
+def run(scenario):
+    async def main():
+        review = StubReview()
+        manager = ReviewJobManager(review, workers=2)
+        try:
+            return await scenario(manager, review)
+        finally:
+            await manager.shutdown()
+    return asyncio.run(main())
+
+
+def test_concurrent_submissions_of_one_head_run_once(pr):
+    async def scenario(manager, review):
+        first, second = await asyncio.gather(manager.submit(PR_URL), manager.submit(PR_URL))
+        assert first is second and first.submissions == 2
+        review.release.set()
+        await first.wait()
+        assert (first.status, first.result) == (SUCCEEDED, {"verdict": "Approved", "head": "head1"})
+
+        # The finished report is now served from the cache without another run
+        again = await manager.submit(PR_URL)
+        assert again.cached and again.result == first.result
+        return review.calls, manager.stats()
+
+    calls, stats = run(scenario)
+    assert calls == 1
+    assert stats["coalesced_submissions"] == 1
+
+
+def test_a_new_head_is_a_separate_review(pr):
+    async def scenario(manager, review):
+        first = await manager.submit(PR_URL)
+        pr["head"]["sha"] = "head2"
+        second = await manager.submit(PR_URL)
+        assert first is not second and second.key.endswith("@head2")
+        review.release.set()
+        await asyncio.gather(first.wait(), second.wait())
+        return review.calls
+
+    assert run(scenario) == 2
+
+
+def test_cached_report_short_circuits_the_review(pr):
+    async def scenario(manager, review):
+        jobs.get_report_cache().put("octo/demo", jobs.report_cache_key_for(pr), {"verdict": "Cached"})
+        job = await manager.submit(PR_URL)
+        assert job.finished and job.cached and job.result == {"verdict": "Cached"}
+        assert [stage for stage, _ in job.events] == ["report"]
+        # `bypass_cache` reviews without reading the cached report
+        fresh = await manager.submit(PR_URL, bypass_cache=True)
+        review.release.set()
+        await fresh.wait()
+        assert not fresh.cached and fresh.result["verdict"] == "Approved"
+        return review.calls
+
+    assert run(scenario) == 1
+
+
+def test_report_of_a_moved_head_is_not_cached_under_the_old_key(pr):
+    async def scenario(manager, review):
+        review.reviewed_head = "head2"  # pushed between submission and fetch
+        job = await manager.submit(PR_URL)
+        review.release.set()
+        await job.wait()
+        assert job.status == SUCCEEDED
+        assert jobs.get_report_cache().get("octo/demo", jobs.report_cache_key_for(pr)) is None
+        rerun = await manager.submit(PR_URL)
+        assert not rerun.cached
+        await rerun.wait()
+        return review.calls
+
+    assert run(scenario) == 2
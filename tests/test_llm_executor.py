@@ -0,0 +1,61 @@
+import asyncio
+import threading
+
+from server import llm_executor
+from server.llm_executor import LLMAdmissionLimiter, parse_model_limits, run_llm_call
+
+
+def test_parse_model_limits():
+    assert parse_model_limits("a/flash=24, a/pro=0,broken,=3") == {"a/flash": 24, "a/pro": 1}
+
+
+def test_calls_over_the_limit_wait(monkeypatch):
+    limiter = LLMAdmissionLimiter(default_limit=2, model_limits={})
+    monkeypatch.setattr(llm_executor, "_limiter", limiter)
+    running, peak = 0, 0
+    lock = threading.Lock()
+
+    def kickoff():
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        threading.Event().wait(0.05)
+        with lock:
+            running -= 1
+        return "done"
+
+    async def main():
+        return await asyncio.gather(*[run_llm_call("model", kickoff) for _ in range(6)])
+
+    assert asyncio.run(main()) == ["done"] * 6
+    assert peak == 2
+    stats = limiter.stats()["models"]["model"]
+    assert (stats["admitted"], stats["in_flight"], stats["max_queued"]) == (6, 0, 4)
+
+
+def test_a_cancelled_call_keeps_its_slot_until_the_thread_finishes(monkeypatch):
+    limiter = LLMAdmissionLimiter(default_limit=1, model_limits={})
+    monkeypatch.setattr(llm_executor, "_limiter", limiter)
+    started, release = threading.Event(), threading.Event()
+
+    def kickoff():
+        started.set()
+        release.wait(5)
+        raise RuntimeError("the model call failed after the caller left")
+
+    async def main():
+        call = asyncio.create_task(run_llm_call("model", kickoff))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait)
+        call.cancel()
+        await asyncio.gather(call, return_exceptions=True)
+        # The kickoff thread is still running: the next call must not be admitted yet
+        second = asyncio.create_task(run_llm_call("model", lambda: "second"))
+        await asyncio.sleep(0.05)
+        assert not second.done()
+        assert limiter.stats()["models"]["model"]["in_flight"] == 1
+        release.set()
+        return await second
+
+    assert asyncio.run(main()) == "second"
+    assert limiter.stats()["models"]["model"]["in_flight"] == 0
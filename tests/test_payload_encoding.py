@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from server.payload_encoding import available_encodings, encode_payload, get_encoder, line_ranges
+
+PR_FILES = [{
+    "file": "src/app.py",
+    "added": [{"lines": [3, 4], "code": "x = 1\ny = 2"}],
+    "removed": [{"lines": [3], "code": "x = 0"}],
+    "content": "import os\n\nx = 0\n",
+}]
+
+
+def test_line_ranges():
+    assert line_ranges([]) == ""
+    assert line_ranges([7]) == "7"
+    assert line_ranges([3, 4, 5, 9, 11, 12]) == "3-5,9,11-12"
+
+
+def test_every_encoding_is_registered():
+    assert set(available_encodings()) >= {"json", "json-ranges", "unified", "unified-ranges"}
+
+
+def test_unknown_encoding_raises():
+    with pytest.raises(ValueError, match="Unknown payload encoding 'xml'"):
+        get_encoder("xml")
+
+
+def test_json_encodings():
+    assert json.loads(get_encoder("json").encode_diffs(PR_FILES)) == [
+        {"file": "src/app.py", "added": PR_FILES[0]["added"], "removed": PR_FILES[0]["removed"]}
+    ]
+    ranges = json.loads(get_encoder("json-ranges").encode_diffs(PR_FILES))
+    assert ranges[0]["added"] == [{"lines": "3-4", "code": "x = 1\ny = 2"}]
+    assert json.loads(get_encoder("json").encode_originals(PR_FILES)) == [
+        {"file": "src/app.py", "content": PR_FILES[0]["content"]}
+    ]
+
+
+def test_unified_encodings():
+    assert get_encoder("unified").encode_diffs(PR_FILES) == (
+        "## src/app.py\n"
+        "@@ -3,1 @@\n"
+        "3 - x = 0\n"
+        "@@ +3,2 @@\n"
+        "3 + x = 1\n"
+        "4 + y = 2"
+    )
+    assert get_encoder("unified-ranges").encode_diffs(PR_FILES) == (
+        "## src/app.py\n@@ -3,1 @@\n-x = 0\n@@ +3,2 @@\n+x = 1\n+y = 2"
+    )
+    assert get_encoder("unified").encode_originals(PR_FILES) == "## src/app.py\nimport os\n\nx = 0\n"
+
+
+def test_encode_payload():
+    payload = encode_payload(PR_FILES, "unified")
+    assert set(payload) == {"all_pr_diffs", "all_original_pr_files", "pr_payload_format"}
+    assert payload["pr_payload_format"] == get_encoder("unified").description
@@ -0,0 +1,95 @@
+import asyncio
+from collections import deque
+
+import pytest
+
+from server import pipeline
+from server.pipeline import CANCELLED, DONE, FAILED, Pipeline
+
+
+@pytest.fixture(autouse=True)
+def history(monkeypatch):
+    runs = deque(maxlen=5)
+    monkeypatch.setattr(pipeline, "_history", runs)
+    return runs
+
+
+def node(log, name, result=None, delay=0.0, error=None):
+    async def fn(**deps):
+        log.append(("start", name, deps))
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        log.append(("end", name))
+        return result
+    return fn
+
+
+def test_add_rejects_duplicates_and_undefined_dependencies():
+    p = Pipeline("review")
+    p.add("a", node([], "a"))
+    with pytest.raises(ValueError, match="already defined"):
+        p.add("a", node([], "a"))
+    with pytest.raises(ValueError, match="undefined node"):
+        p.add("b", node([], "b"), deps=["a", "missing"])
+
+
+def test_nodes_start_after_their_dependencies_with_their_results():
+    log = []
+    p = Pipeline("review")
+    p.add("metadata", node(log, "metadata", result="pr"))
+    p.add("diff", node(log, "diff", result="files"), deps=["metadata"])
+    p.add("snapshot", node(log, "snapshot", result="tree"), deps=["metadata"])
+    p.add("review", node(log, "review", result="report"), deps=["diff", "snapshot"])
+
+    results = asyncio.run(p.run())
+
+    assert results == {"metadata": "pr", "diff": "files", "snapshot": "tree", "review": "report"}
+    events = [(kind, name) for kind, name, *_ in log]
+    for dep, dependent in [("metadata", "diff"), ("metadata", "snapshot"), ("diff", "review"), ("snapshot", "review")]:
+        assert events.index(("end", dep)) < events.index(("start", dependent))
+    assert ("start", "review", {"diff": "files", "snapshot": "tree"}) in log
+    assert all(n["status"] == DONE for n in p.graph()["nodes"])
+
+
+def test_independent_nodes_overlap():
+    p = Pipeline("review")
+    p.add("conversation", node([], "conversation", delay=0.2))
+    p.add("diff", node([], "diff", delay=0.2))
+    asyncio.run(p.run())
+
+    graph = p.graph()
+    conversation, diff = graph["nodes"]
+    assert conversation["started_at"] < diff["finished_at"] and diff["started_at"] < conversation["finished_at"]
+    assert graph["total_seconds"] < 0.35
+
+
+def test_failure_cancels_running_nodes_and_skips_dependents(history):
+    log = []
+    p = Pipeline("review")
+    p.add("diff", node(log, "diff", delay=0.05, error=RuntimeError("diff too large")))
+    p.add("snapshot", node(log, "snapshot", delay=5))
+    p.add("review", node(log, "review"), deps=["diff", "snapshot"])
+
+    with pytest.raises(RuntimeError, match="diff too large"):
+        asyncio.run(p.run())
+
+    statuses = {n["name"]: (n["status"], n["error"]) for n in p.graph()["nodes"]}
+    assert statuses == {"diff": (FAILED, "diff too large"), "snapshot": (CANCELLED, None), "review": (CANCELLED, None)}
+    assert ("start", "review", {}) not in log and ("end", "snapshot") not in log
+    # Failed runs are recorded for timing analysis too
+    assert [n["status"] for n in history[-1]["nodes"]] == [FAILED, CANCELLED, CANCELLED]
+
+
+def test_critical_path_follows_the_dependency_waited_on(history):
+    p = Pipeline("review")
+    p.add("metadata", node([], "metadata", delay=0.01))
+    p.add("diff", node([], "diff", delay=0.15), deps=["metadata"])
+    p.add("conversation", node([], "conversation", delay=0.01), deps=["metadata"])
+    p.add("review", node([], "review", delay=0.01), deps=["conversation", "diff"])
+    assert p.critical_path() == []
+
+    asyncio.run(p.run())
+
+    assert p.critical_path() == ["metadata", "diff", "review"]
+    assert pipeline.recent_pipeline_runs()[0]["critical_path"] == ["metadata", "diff", "review"]
@@ -0,0 +1,114 @@
+import pytest
+import requests
+
+from server import rate_limiter
+from server.rate_limiter import GitHubRequestScheduler, RateLimitExceeded
+
+
+class FakeClock:
+    """Stands in for the `time` module: sleeping advances the clock instead of blocking."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, "time", clock)
+    return clock
+
+
+def response(status=200, text="", **headers):
+    r = requests.Response()
+    r.status_code = status
+    r._content = text.encode("utf-8")
+    r.headers.update({name.replace("_", "-"): str(value) for name, value in headers.items()})
+    return r
+
+
+def window(remaining, reset_at, limit=5000, status=200):
+    return response(status, X_RateLimit_Limit=limit, X_RateLimit_Remaining=remaining, X_RateLimit_Reset=reset_at)
+
+
+def test_calls_go_to_the_token_with_most_budget(clock):
+    scheduler = GitHubRequestScheduler(["a", "b"])
+    scheduler.update("a", window(10, clock.now + 60))
+    assert scheduler.best_token() == "b"
+    assert scheduler.acquire() == "b"
+    assert scheduler.acquire("a") == "a"  # a pinned token is used regardless
+
+
+def test_search_budget_is_not_scheduled(clock):
+    scheduler = GitHubRequestScheduler(["a"])
+    search = window(0, clock.now + 60)
+    search.headers["X-RateLimit-Resource"] = "search"
+    scheduler.update("a", search)
+    assert scheduler.stats()["tokens"][0]["remaining"] == 5000
+
+
+def test_low_budget_is_paced_until_the_reset(clock):
+    scheduler = GitHubRequestScheduler(["a"])
+    scheduler.update("a", window(4, clock.now + 20))
+    for _ in range(5):
+        assert scheduler.acquire() == "a"
+    # Four calls spread over the 20s left, then the fifth waits for the new window
+    assert clock.sleeps == [5, 5, 5, 5]
+    assert clock.now == 1020
+
+
+def test_waits_longer_than_the_maximum_raise(clock):
+    scheduler = GitHubRequestScheduler(["a"])
+    scheduler.update("a", window(0, clock.now + rate_limiter.GITHUB_RATE_LIMIT_MAX_WAIT + 10))
+    with pytest.raises(RateLimitExceeded):
+        scheduler.acquire()
+    assert clock.sleeps == []
+
+
+def test_is_rate_limited():
+    assert GitHubRequestScheduler.is_rate_limited(response(403, X_RateLimit_Remaining=0))
+    assert GitHubRequestScheduler.is_rate_limited(response(429, Retry_After=5))
+    assert GitHubRequestScheduler.is_rate_limited(response(403, "You have exceeded a secondary rate limit"))
+    assert not GitHubRequestScheduler.is_rate_limited(response(403, "Resource not accessible"))
+    assert not GitHubRequestScheduler.is_rate_limited(response(200, X_RateLimit_Remaining=0))
+
+
+def blocked_for(scheduler, token, clock):
+    state = scheduler._state(token)
+    return max(state.blocked_until, state.reset_at if state.available(clock.now) <= 0 else 0) - clock.now
+
+
+def test_penalize_honours_retry_after(clock):
+    scheduler = GitHubRequestScheduler(["a"])
+    scheduler.penalize("a", response(403, Retry_After=30))
+    assert blocked_for(scheduler, "a", clock) == 30
+
+
+def test_penalize_waits_for_the_reset_when_the_budget_is_spent(clock):
+    scheduler = GitHubRequestScheduler(["a"])
+    scheduler.penalize("a", response(403, X_RateLimit_Remaining=0, X_RateLimit_Reset=clock.now + 45))
+    assert blocked_for(scheduler, "a", clock) == 45
+
+
+def test_secondary_limit_backoff_doubles_until_a_success(clock, monkeypatch):
+    monkeypatch.setattr(rate_limiter, "GITHUB_SECONDARY_LIMIT_MAX_BACKOFF", 200)
+    scheduler = GitHubRequestScheduler(["a"])
+    secondary = response(403, "secondary rate limit")
+    backoffs = []
+    for _ in range(4):
+        scheduler.update("a", secondary)
+        scheduler.penalize("a", secondary)
+        backoffs.append(blocked_for(scheduler, "a", clock))
+    assert backoffs == [60, 120, 200, 200]
+
+    scheduler.update("a", response(200))
+    scheduler.penalize("a", secondary)
+    assert blocked_for(scheduler, "a", clock) == 60
@@ -0,0 +1,62 @@
+from server.models import (
+    AlignmentAgentOutput, BugDetectionAgentOutput, BugFinding, CodeQualityAgentOutput,
+    SecurityAgentOutput, SecurityFinding
+)
+from server.report_renderer import (
+    APPROVED, CHANGES_REQUESTED, NEEDS_MORE_REVIEW, REPORT_MIN_QUALITY_SCORE, compute_verdict
+)
+
+
+def bugs(*severities):
+    findings = [BugFinding(file="a.py", line_numbers=[1], description="d", severity=s, suggested_fix="f")
+                for s in severities]
+    return BugDetectionAgentOutput(has_bugs=bool(findings), findings=findings)
+
+
+def risks(*levels):
+    findings = [SecurityFinding(file="a.py", line_numbers=[1], title="t", explanation="e", risk_level=level,
+                                recommended_mitigation="m") for level in levels]
+    return SecurityAgentOutput(has_security_vulnerabilities=bool(findings), findings=findings)
+
+
+def quality(score=90):
+    return CodeQualityAgentOutput(code_quality_score=score, suggestions=[], summary_comment="")
+
+
+def alignment(score=90, nature="Bug Fix"):
+    return AlignmentAgentOutput(alignment_score=score, pr_nature_classification=nature, justification="",
+                                potential_misalignment_risks=[])
+
+
+def test_clean_pr_is_approved():
+    verdict, _ = compute_verdict(bugs("Low"), quality(), risks("Informational"), alignment())
+    assert verdict == APPROVED
+
+
+def test_blocking_findings_request_changes():
+    verdict, reason = compute_verdict(bugs("High", "Critical", "Low"), quality(), risks("High"), alignment())
+    assert verdict == CHANGES_REQUESTED
+    assert reason == "2 bugs (1 Critical, 1 High) and 1 security risk (1 High) must be fixed before merging"
+
+
+def test_blocking_findings_outrank_every_other_reason():
+    verdict, _ = compute_verdict(bugs("Critical"), quality(10), risks(), alignment(nature="Off-topic"), ["BugDetectionAgent"])
+    assert verdict == CHANGES_REQUESTED
+
+
+def test_medium_findings_need_more_review():
+    verdict, reason = compute_verdict(bugs("Medium"), quality(), risks("Medium", "Medium"), alignment())
+    assert verdict == NEEDS_MORE_REVIEW
+    assert reason == "1 medium-severity bug to confirm; 2 medium security risks to assess"
+
+
+def test_low_scores_need_more_review():
+    verdict, reason = compute_verdict(bugs(), quality(REPORT_MIN_QUALITY_SCORE - 1), risks(), alignment(10))
+    assert verdict == NEEDS_MORE_REVIEW
+    assert "code quality scored" in reason and "alignment with the project scored 10/100" in reason
+
+
+def test_off_topic_and_unparsed_agents_need_more_review():
+    verdict, reason = compute_verdict(bugs(), quality(), risks(), alignment(nature="Off-topic"), ["SecurityAgent"])
+    assert verdict == NEEDS_MORE_REVIEW
+    assert reason == "the SecurityAgent output could not be read; the change looks off-topic for this repository"
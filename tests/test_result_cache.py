@@ -0,0 +1,47 @@
+from server import result_cache
+from server.result_cache import ResultCache, stable_hash
+
+
+def test_stable_hash_ignores_key_order():
+    assert stable_hash({"a": 1, "b": [1, 2]}, "x") == stable_hash({"b": [1, 2], "a": 1}, "x")
+    assert stable_hash({"a": 1}) != stable_hash({"a": 2})
+
+
+def test_result_cache_round_trip(tmp_path):
+    cache = ResultCache("reports", directory=str(tmp_path))
+    assert cache.get("owner/repo", "k") is None
+    cache.put("owner/repo", "k", {"verdict": "Approved"})
+    assert cache.get("owner/repo", "k") == {"verdict": "Approved"}
+    # A fresh instance reads the entry back from disk
+    assert ResultCache("reports", directory=str(tmp_path)).get("owner/repo", "k") == {"verdict": "Approved"}
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_result_cache_expiry(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(result_cache.time, "time", lambda: now[0])
+    cache = ResultCache("reports", ttl_seconds=60, directory=str(tmp_path))
+    cache.put("g", "k", 1)
+    now[0] += 59
+    assert cache.get("g", "k") == 1
+    now[0] += 2
+    assert cache.get("g", "k") is None
+    assert not any(tmp_path.rglob("*.json"))  # expired entries are removed
+
+
+def test_result_cache_memory_is_bounded(tmp_path):
+    cache = ResultCache("reports", max_memory_entries=2, directory=str(tmp_path))
+    for key in ("a", "b", "c"):
+        cache.put("g", key, key)
+    assert cache.stats()["memory_entries"] == 2
+    assert cache.get("g", "a") == "a"  # evicted from memory, still on disk
+
+
+def test_result_cache_invalidate_group(tmp_path):
+    cache = ResultCache("reports", directory=str(tmp_path))
+    cache.put("owner/one", "a", 1)
+    cache.put("owner/one", "b", 2)
+    cache.put("owner/two", "a", 3)
+    assert cache.invalidate_group("owner/one") == 2
+    assert cache.get("owner/one", "a") is None
+    assert cache.get("owner/two", "a") == 3
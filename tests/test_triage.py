@@ -0,0 +1,76 @@
+import pytest
+
+from server.diff_parser import parse_patch
+from server.triage import FileTriage, parse_gitattributes, summarize_skipped
+
+
+@pytest.mark.parametrize("path, reason", [
+    ("package-lock.json", "lockfile"),
+    ("web/yarn.lock", "lockfile"),
+    ("static/app.min.js", "minified or source map"),
+    ("src/__snapshots__/view.test.js.snap", "test snapshot"),
+    ("vendor/lib/a.go", "vendored"),
+    ("pkg/vendor/lib/a.go", "vendored"),
+    ("frontend/node_modules/x/index.js", "vendored"),
+    ("api/service_pb2.py", "generated"),
+    ("dist/bundle.js", "generated"),
+    ("docs/Logo.PNG", "binary"),
+    ("src/app.py", None),
+    ("src/distance.py", None),
+    ("lib/dist/readme.md", None),  # "dist/**" is anchored at the root
+])
+def test_default_globs(path, reason):
+    assert FileTriage().path_reason(path) == reason
+
+
+def test_configured_globs():
+    triage = FileTriage(exclude_globs=[("migrations/**", "excluded by configuration"), ("*.sql", "sql")])
+    assert triage.path_reason("migrations/0001_initial.py") == "excluded by configuration"
+    assert triage.path_reason("app/migrations/0001_initial.py") is None
+    assert triage.path_reason("db/schema.sql") == "sql"
+
+
+def test_gitattributes_rules_override_globs():
+    triage = FileTriage.for_repository(
+        "# comment\n"
+        "api/*.py linguist-generated=true\n"
+        "api/handwritten.py -linguist-generated\n"
+        "dist/** -linguist-generated\n"
+        "assets/* binary\n"
+    )
+    assert triage.path_reason("api/models.py") == "generated (.gitattributes)"
+    assert triage.path_reason("api/handwritten.py") is None
+    assert triage.path_reason("dist/keep.js") is None  # unset attribute re-includes a default glob
+    assert triage.path_reason("assets/font.bin") == "binary (.gitattributes)"
+    # .gitattributes matching is case-sensitive, like git's
+    assert triage.path_reason("API/models.py") is None
+
+
+def test_parse_gitattributes_ignores_unrelated_attributes():
+    assert parse_gitattributes("*.sh text eol=lf\n*.pb.go linguist-generated\n") == [("*.pb.go", "generated")]
+
+
+def test_change_reasons():
+    triage = FileTriage(max_changed_lines=100, max_file_bytes=1000, max_line_length=50, max_average_line_length=30)
+    assert triage.change_reason("renamed", 0, None) == "renamed without content changes"
+    assert triage.change_reason("modified", 0, None) == "binary or mode-only change"
+    assert triage.change_reason("modified", 101, parse_patch("@@ -1 +1 @@\n-a\n+b")) == "too large to review (101 changed lines)"
+    assert triage.change_reason("modified", 2, parse_patch("@@ -1 +1 @@\n-a\n+b"), base_size=5000) == "base file too large (5000 bytes)"
+    # A new file has no base to download, whatever the size reported for its path
+    assert triage.change_reason("added", 1, parse_patch("@@ -0,0 +1 @@\n+b"), base_size=5000) is None
+
+    minified = parse_patch("@@ -0,0 +1 @@\n+" + "x" * 60)
+    assert triage.change_reason("added", 1, minified) == "looks minified or generated (lines up to 60 characters)"
+    long_on_average = parse_patch("@@ -0,0 +1,2 @@\n+" + "x" * 40 + "\n+" + "y" * 40)
+    assert triage.change_reason("added", 2, long_on_average).startswith("looks minified or generated")
+    assert triage.change_reason("modified", 2, parse_patch("@@ -1 +1 @@\n-a\n+b")) is None
+
+
+def test_exclusion_reason_checks_the_path_first():
+    triage = FileTriage()
+    assert triage.exclusion_reason("yarn.lock", "modified", 10 ** 6, None) == "lockfile"
+
+
+def test_summarize_skipped():
+    file_change = {"file": "yarn.lock", "status": "modified", "additions": 120, "deletions": 80, "skipped": "lockfile"}
+    assert summarize_skipped(file_change) == "yarn.lock (modified, +120/-80): not reviewed, lockfile"
@@ -0,0 +1,5 @@
+from dotenv import load_dotenv
+
+# The shared server modules (imported from the `server` package) read their settings on
+# import, so .env must be loaded first
+load_dotenv()
@@ -1,23 +1,28 @@
+import io
 import os
+import concurrent.futures
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, TextIO
 from dotenv import load_dotenv
-from github import Github, UnknownObjectException, GithubException
-from langchain_community.document_loaders import GithubFileLoader
-from pprint import pprint
+from github import UnknownObjectException, GithubException
 from utils.fetcher import fetch_pr_diff
 from utils.fetcher import fetch_pr_conversation
+from server.github_client import get_github_client as get_shared_github_client, get_repository, get_pull_request
+from server.github_http import fetch_git_blob
+from server.blob_store import get_blob_store
 import json
 
 # --- GitHub Client ---
+# Shared with the server: one pooled client per token and a TTL cache of repo/PR handles
 def get_github_client():
     load_dotenv()
-    token = os.getenv("GITHUB_TOKEN")
-    return Github(token) if token else Github()
+    return get_shared_github_client()
 
 # --- Get Repo Object ---
 def get_repo(repo_full_name: str):
     try:
-        client = get_github_client()
-        return client.get_repo(repo_full_name)
+        load_dotenv()
+        return get_repository(repo_full_name)
     except GithubException as e:
         raise Exception(f"Failed to access repository '{repo_full_name}': {e}")
     
@@ -27,7 +32,7 @@ def get_repo(repo_full_name: str):
 # --- Bug Risk Agent: Get PR Diffs and File Content ---
 def get_diff_for_pr(repo, pr_number: int):
     try:
-        pr = repo.get_pull(pr_number)
+        pr = get_pull_request(repo.full_name, pr_number)
         files = pr.get_files()
 
         diff_data = {}
@@ -49,48 +54,105 @@ def get_diff_for_pr(repo, pr_number: int):
         raise Exception(f"Error fetching PR #{pr_number}: {e}")
 
 # --- Codebase Review Agent: Get Full Codebase ---
-def get_full_codebase(owner: str, repo: str, branch: str = "main") -> str:
-    """Fetches repository structure and contents using GitHub API. Works for public and private repos."""
+CODEBASE_FILE_EXTENSIONS = ('.py', '.md', '.txt')
+# Files larger than this are listed in the structure but their content is not exported
+CODEBASE_MAX_FILE_BYTES = int(os.getenv("CODEBASE_MAX_FILE_BYTES", str(512 * 1024)))
+# The export stops (with a note) once this many content bytes have been written
+CODEBASE_MAX_TOTAL_BYTES = int(os.getenv("CODEBASE_MAX_TOTAL_BYTES", str(64 * 1024 * 1024)))
+CODEBASE_FETCH_CONCURRENCY = int(os.getenv("CODEBASE_FETCH_CONCURRENCY", "8"))
+
+def _resolve_codebase_tree(owner: str, repo: str, branch: str):
+    """Returns (branch, tree entries) for `branch`, falling back to the default branch."""
     try:
-        load_dotenv()
-        access_token = os.getenv("GITHUB_TOKEN")  # Optional for public repos
+        repo_obj = get_repository(f"{owner}/{repo}")
+    except UnknownObjectException:
+        raise ValueError(f"Repository {owner}/{repo} not found. Please check the owner and repo name.")
 
-        # If access_token is not set, use unauthenticated access (rate-limited)
-        g = Github(access_token) if access_token else Github()
-        
+    # Try to get the specified branch, fallback to default branch if not found
+    try:
+        branch_ref = repo_obj.get_branch(branch)
+    except:
+        default_branch = repo_obj.default_branch
+        branch = default_branch
+        branch_ref = repo_obj.get_branch(default_branch)
+
+    return branch, repo_obj.get_git_tree(sha=branch_ref.commit.sha, recursive=True).tree
+
+def iter_codebase_files(owner: str, repo: str, tree, branch: str,
+                        file_filter: Callable[[str], bool] = lambda path: path.endswith(CODEBASE_FILE_EXTENSIONS),
+                        max_file_bytes: int = CODEBASE_MAX_FILE_BYTES,
+                        max_concurrency: int = CODEBASE_FETCH_CONCURRENCY) -> Iterator[Dict[str, Any]]:
+    """
+    Yields one record per exported file ({"path", "source", "content"}) in tree order.
+    Contents are downloaded in parallel through the shared blob store, with at most
+    `max_concurrency` downloads in flight and a bounded read-ahead window, so memory
+    stays proportional to the window rather than to the repository.
+    """
+    entries = [e for e in tree if e.type == "blob" and file_filter(e.path)]
+    store = get_blob_store()
+
+    def load(entry) -> str:
+        data = store.get_or_fetch(entry.sha, lambda: fetch_git_blob(owner, repo, entry.sha))
+        return data.decode("utf-8", errors="replace")
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as pool:
+        pending = deque()
         try:
-            repo_obj = g.get_repo(f"{owner}/{repo}")
-        except UnknownObjectException:
-            raise ValueError(f"Repository {owner}/{repo} not found. Please check the owner and repo name.")
+            for entry in entries:
+                if entry.size is not None and entry.size > max_file_bytes:
+                    print(f"Note: Skipping {entry.path} ({entry.size} bytes > {max_file_bytes})")
+                    continue
+                pending.append((entry, pool.submit(load, entry)))
+                if len(pending) >= 2 * max_concurrency:
+                    yield _codebase_record(owner, repo, branch, *pending.popleft())
+            while pending:
+                yield _codebase_record(owner, repo, branch, *pending.popleft())
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+def _codebase_record(owner: str, repo: str, branch: str, entry, future) -> Dict[str, Any]:
+    return {
+        "path": entry.path,
+        "source": f"https://api.github.com/{owner}/{repo}/blob/{branch}/{entry.path}",
+        "content": future.result(),
+    }
+
+def write_full_codebase(owner: str, repo: str, out: TextIO, branch: str = "main",
+                        max_total_bytes: int = CODEBASE_MAX_TOTAL_BYTES) -> int:
+    """
+    Streams the repository structure and file contents to `out` (a file, `sys.stdout`,
+    or `socket.makefile("w")`) as they are downloaded. Returns the number of characters written.
+    """
+    load_dotenv()
+    branch, tree = _resolve_codebase_tree(owner, repo, branch)
 
-        # Try to get the specified branch, fallback to default branch if not found
-        try:
-            branch_ref = repo_obj.get_branch(branch)
-        except:
-            default_branch = repo_obj.default_branch
-            branch = default_branch
-            branch_ref = repo_obj.get_branch(default_branch)
-
-        tree = repo_obj.get_git_tree(sha=branch_ref.commit.sha, recursive=True).tree
-
-        repo_structure = "Repository Structure:\n"
-        for file in tree:
-            repo_structure += f"{file.path}\n"
-        
-        loader = GithubFileLoader(
-            repo=f"{owner}/{repo}",
-            access_token=access_token,  # Can be None for public repos
-            branch=branch,
-            github_api_url="https://api.github.com",
-            file_filter=lambda file_path: file_path.endswith(('.py', '.md', '.txt')),
-        )
-        
-        documents = loader.load()
-        repo_contents = "\nRepository Contents:\n"
-        for doc in documents:
-            repo_contents += f"\nFile: {doc.metadata['source']}\n{doc.page_content}\n{'-'*80}\n"
-        
-        return repo_structure + repo_contents
+    written = out.write("Repository Structure:\n")
+    for file in tree:
+        written += out.write(f"{file.path}\n")
+
+    written += out.write("\nRepository Contents:\n")
+    content_bytes = 0
+    files = iter_codebase_files(owner, repo, tree, branch)
+    try:
+        for record in files:
+            # The budget is in bytes like the blob sizes; non-ASCII text takes more than one per character
+            size = len(record["content"].encode("utf-8"))
+            if content_bytes + size > max_total_bytes:
+                written += out.write(f"\n[Export truncated: content budget of {max_total_bytes} bytes reached]\n")
+                break
+            content_bytes += size
+            written += out.write(f"\nFile: {record['source']}\n{record['content']}\n{'-'*80}\n")
+    finally:
+        files.close()
+    return written
+
+def get_full_codebase(owner: str, repo: str, branch: str = "main") -> str:
+    """Fetches repository structure and contents using GitHub API. Works for public and private repos."""
+    try:
+        buffer = io.StringIO()
+        write_full_codebase(owner, repo, buffer, branch)
+        return buffer.getvalue()
 
     except Exception as e:
         raise Exception(f"Error fetching repository: {str(e)}")
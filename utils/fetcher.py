@@ -1,11 +1,6 @@
 import re
-import requests
 from utils.chunker import chunk_diff
-import tempfile
-import subprocess
-
-
-GITHUB_API = "https://api.github.com"
+from server.github_http import GITHUB_API, github_get, iter_github_items
 
 def parse_github_pr_url(pr_url):
     """
@@ -19,23 +14,16 @@ def parse_github_pr_url(pr_url):
         raise ValueError("Invalid GitHub PR URL")
     return match.group("owner"), match.group("repo"), int(match.group("pr_number"))
 
-def fetch_pr_diff(repo_owner="", repo_name="", pr_number=1, token="", pr_url=None):
+def fetch_pr_diff(repo_owner="", repo_name="", pr_number=1, token="", pr_url=None, max_files=None, max_bytes=None):
     if pr_url:
         repo_owner, repo_name, pr_number = parse_github_pr_url(pr_url)
-    headers = {}
-    if token:
-        headers["Authorization"] = f"Bearer {token}"
     url = f"{GITHUB_API}/repos/{repo_owner}/{repo_name}/pulls/{pr_number}/files"
     # url = f"{GITHUB_API}/repos/{repo_owner}/{repo_name}/pulls/{pr_number}/commits"
 
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
-    files = response.json()
-    print(files)
-
     parsed_changes = []
 
-    for file in files:
+    # Records are streamed page by page, so chunking starts before the listing is complete
+    for file in iter_github_items(url, token=token, max_items=max_files, max_bytes=max_bytes):
         filename = file["filename"]
         patch = file.get("patch")
         print(f"{filename} with {patch}")
@@ -55,13 +43,8 @@ def fetch_pr_conversation(repo_owner="", repo_name="", pr_number=1, token="", pr
     if pr_url:
         repo_owner, repo_name, pr_number = parse_github_pr_url(pr_url)
 
-    headers = {}
-    if token:
-        headers["Authorization"] = f"Bearer {token}"
     url = f"{GITHUB_API}/repos/{repo_owner}/{repo_name}/pulls/{pr_number}"  
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
-    pr_data = response.json()
+    pr_data = github_get(url, token=token).json()
 
     conversations = []
 
@@ -74,12 +57,8 @@ def fetch_pr_conversation(repo_owner="", repo_name="", pr_number=1, token="", pr
 
     # Fetch issue comments
     url = f"{GITHUB_API}/repos/{repo_owner}/{repo_name}/issues/{pr_number}/comments"  
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
-    comments = response.json()
-
     # Append each comment
-    for comment in comments:
+    for comment in iter_github_items(url, token=token):
         conversations.append({
             "user": comment["user"]["login"],
             "created_at": comment.get("created_at", "N/A"),